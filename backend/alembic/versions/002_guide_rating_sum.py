@@ -0,0 +1,34 @@
+"""Running rating sum on build_guides
+
+Revision ID: 002_guide_rating_sum
+Revises: 001_initial
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_guide_rating_sum'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('build_guides', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=True))
+
+    # Заполнить агрегаты из существующих оценок
+    op.execute("""
+        UPDATE build_guides SET
+            rating_sum = COALESCE((SELECT SUM(r.rating) FROM guide_ratings r WHERE r.guide_id = build_guides.id), 0),
+            rating_count = (SELECT COUNT(r.id) FROM guide_ratings r WHERE r.guide_id = build_guides.id)
+    """)
+    op.execute("""
+        UPDATE build_guides SET
+            rating = CASE WHEN rating_count > 0 THEN CAST(rating_sum AS FLOAT) / rating_count ELSE 0 END
+    """)
+
+
+def downgrade():
+    op.drop_column('build_guides', 'rating_sum')
@@ -0,0 +1,36 @@
+"""Per-user guide likes
+
+Revision ID: 003_guide_likes
+Revises: 002_guide_rating_sum
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_guide_likes'
+down_revision = '002_guide_rating_sum'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Уже накопленные build_guides.likes остаются анонимными:
+    # восстановить, кто их поставил, невозможно
+    op.create_table('guide_likes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('guide_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['guide_id'], ['build_guides.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('guide_id', 'user_id', name='uq_guide_likes_guide_user')
+    )
+    op.create_index(op.f('ix_guide_likes_id'), 'guide_likes', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_guide_likes_id'), table_name='guide_likes')
+    op.drop_table('guide_likes')
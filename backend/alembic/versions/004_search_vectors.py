@@ -0,0 +1,72 @@
+"""Full-text search vectors and trigram indexes
+
+Revision ID: 004_search_vectors
+Revises: 003_guide_likes
+Create Date: 2024-02-05 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_search_vectors'
+down_revision = '003_guide_likes'
+branch_labels = None
+depends_on = None
+
+# Конфигурация 'simple' без стемминга: контент смешанный (русский/английский),
+# а имена героев и предметов не должны нормализоваться
+SEARCH_VECTORS = {
+    'heroes': (
+        "setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(specialty, '') || ' ' || coalesce(role, '')), 'B')"
+    ),
+    'build_guides': (
+        "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B')"
+    ),
+    'news': (
+        "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(summary, '')), 'B') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(content, '')), 'C')"
+    ),
+}
+
+# Триграммные индексы для нечеткого поиска и подстрок (ILIKE '%q%')
+TRIGRAM_INDEXES = [
+    ('ix_heroes_name_trgm', 'heroes', 'name'),
+    ('ix_build_guides_title_trgm', 'build_guides', 'title'),
+    ('ix_news_title_trgm', 'news', 'title'),
+    ('ix_users_username_trgm', 'users', 'username'),
+    ('ix_users_ign_trgm', 'users', 'ign'),
+]
+
+
+def upgrade():
+    # tsvector и pg_trgm есть только в PostgreSQL; на SQLite работает индекс в памяти
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    for table, expression in SEARCH_VECTORS.items():
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+            f"GENERATED ALWAYS AS ({expression}) STORED"
+        )
+        op.execute(f"CREATE INDEX ix_{table}_search_vector ON {table} USING gin (search_vector)")
+
+    for name, table, column in TRIGRAM_INDEXES:
+        op.execute(f"CREATE INDEX {name} ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for name, _, _ in TRIGRAM_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+    for table in SEARCH_VECTORS:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
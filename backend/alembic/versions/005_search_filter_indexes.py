@@ -0,0 +1,35 @@
+"""Composite indexes for search filters
+
+Revision ID: 005_search_filter_indexes
+Revises: 004_search_vectors
+Create Date: 2024-02-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_search_filter_indexes'
+down_revision = '004_search_vectors'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_heroes_role'), 'heroes', ['role'], unique=False)
+    op.create_index(op.f('ix_users_role'), 'users', ['role'], unique=False)
+    op.create_index(
+        'ix_build_guides_published_hero_rating', 'build_guides',
+        ['is_published', 'hero_id', 'rating'], unique=False
+    )
+    op.create_index(
+        'ix_build_guides_published_difficulty_style', 'build_guides',
+        ['is_published', 'difficulty', 'play_style'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_build_guides_published_difficulty_style', table_name='build_guides')
+    op.drop_index('ix_build_guides_published_hero_rating', table_name='build_guides')
+    op.drop_index(op.f('ix_users_role'), table_name='users')
+    op.drop_index(op.f('ix_heroes_role'), table_name='heroes')
@@ -0,0 +1,53 @@
+"""Keyset pagination indexes
+
+Revision ID: 006_keyset_pagination_indexes
+Revises: 005_search_filter_indexes
+Create Date: 2024-02-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_keyset_pagination_indexes'
+down_revision = '005_search_filter_indexes'
+branch_labels = None
+depends_on = None
+
+# (имя, таблица, колонки): фильтр на равенство, ключ сортировки, id
+KEYSET_INDEXES = [
+    ('ix_build_guides_published_hero_rating_id', 'build_guides', ['is_published', 'hero_id', 'rating', 'id']),
+    ('ix_build_guides_published_rating_id', 'build_guides', ['is_published', 'rating', 'id']),
+    ('ix_build_guides_published_views_likes_id', 'build_guides', ['is_published', 'views', 'likes', 'id']),
+    ('ix_build_guides_published_created_id', 'build_guides', ['is_published', 'created_at', 'id']),
+    ('ix_build_guides_author_created_id', 'build_guides', ['author_id', 'created_at', 'id']),
+    ('ix_news_published_created_id', 'news', ['is_published', 'created_at', 'id']),
+    ('ix_comments_guide_approved_created_id', 'comments', ['guide_id', 'is_approved', 'created_at', 'id']),
+]
+
+
+def upgrade():
+    # Сравнение кортежей (rating, id) < (:rating, :id) не работает с NULL,
+    # поэтому ключи сортировки гайдов становятся NOT NULL
+    for column, default in (('views', '0'), ('likes', '0'), ('rating', '0')):
+        op.execute(f"UPDATE build_guides SET {column} = {default} WHERE {column} IS NULL")
+        op.alter_column('build_guides', column, nullable=False, server_default=sa.text(default))
+
+    # Покрывается индексом с id на конце
+    op.drop_index('ix_build_guides_published_hero_rating', table_name='build_guides')
+
+    for name, table, columns in KEYSET_INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(KEYSET_INDEXES):
+        op.drop_index(name, table_name=table)
+
+    op.create_index(
+        'ix_build_guides_published_hero_rating', 'build_guides',
+        ['is_published', 'hero_id', 'rating'], unique=False
+    )
+
+    for column in ('views', 'likes', 'rating'):
+        op.alter_column('build_guides', column, nullable=True, server_default=None)
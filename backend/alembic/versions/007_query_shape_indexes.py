@@ -0,0 +1,85 @@
+"""Partial indexes for published content and unique guide ratings
+
+Revision ID: 007_query_shape_indexes
+Revises: 006_keyset_pagination_indexes
+Create Date: 2024-02-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_query_shape_indexes'
+down_revision = '006_keyset_pagination_indexes'
+branch_labels = None
+depends_on = None
+
+PUBLISHED = sa.text('is_published')
+FEATURED = sa.text('is_published AND is_featured')
+
+# Составные индексы с ведущим is_published заменяются частичными:
+# черновики в них не попадают, а порядок колонок совпадает с ORDER BY
+REPLACED_INDEXES = [
+    ('ix_build_guides_published_hero_rating_id', 'build_guides', ['is_published', 'hero_id', 'rating', 'id']),
+    ('ix_build_guides_published_rating_id', 'build_guides', ['is_published', 'rating', 'id']),
+    ('ix_build_guides_published_views_likes_id', 'build_guides', ['is_published', 'views', 'likes', 'id']),
+    ('ix_build_guides_published_created_id', 'build_guides', ['is_published', 'created_at', 'id']),
+    ('ix_build_guides_published_difficulty_style', 'build_guides', ['is_published', 'difficulty', 'play_style']),
+    ('ix_news_published_created_id', 'news', ['is_published', 'created_at', 'id']),
+]
+
+# (имя, таблица, колонки, условие)
+PARTIAL_INDEXES = [
+    ('ix_build_guides_hero_rating_published', 'build_guides',
+     ['hero_id', sa.text('rating DESC'), sa.text('id DESC')], PUBLISHED),
+    ('ix_build_guides_rating_published', 'build_guides',
+     [sa.text('rating DESC'), sa.text('id DESC')], PUBLISHED),
+    ('ix_build_guides_views_likes_published', 'build_guides',
+     [sa.text('views DESC'), sa.text('likes DESC'), sa.text('id DESC')], PUBLISHED),
+    ('ix_build_guides_created_published', 'build_guides',
+     [sa.text('created_at DESC'), sa.text('id DESC')], PUBLISHED),
+    ('ix_build_guides_difficulty_style_published', 'build_guides',
+     ['difficulty', 'play_style'], PUBLISHED),
+    ('ix_news_created_published', 'news',
+     [sa.text('created_at DESC'), sa.text('id DESC')], PUBLISHED),
+    ('ix_news_category_created_published', 'news',
+     ['category', sa.text('created_at DESC'), sa.text('id DESC')], PUBLISHED),
+    ('ix_news_featured_created_published', 'news',
+     [sa.text('created_at DESC')], FEATURED),
+]
+
+# Комментарии (guide_id, created_at) уже покрыты ix_comments_guide_approved_created_id (006)
+
+
+def upgrade():
+    for name, table, _ in REPLACED_INDEXES:
+        op.drop_index(name, table_name=table)
+
+    for name, table, columns, where in PARTIAL_INDEXES:
+        op.create_index(name, table, columns, unique=False, postgresql_where=where, sqlite_where=where)
+
+    # Повторные оценки одного пользователя: оставить последнюю
+    op.execute("""
+        DELETE FROM guide_ratings
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM guide_ratings GROUP BY guide_id, user_id
+        )
+    """)
+    # Агрегаты считались с учетом дублей — пересчитать
+    op.execute("""
+        UPDATE build_guides SET
+            rating_sum = COALESCE((SELECT SUM(r.rating) FROM guide_ratings r WHERE r.guide_id = build_guides.id), 0),
+            rating_count = (SELECT COUNT(*) FROM guide_ratings r WHERE r.guide_id = build_guides.id),
+            rating = COALESCE((SELECT AVG(r.rating) FROM guide_ratings r WHERE r.guide_id = build_guides.id), 0)
+    """)
+    op.create_unique_constraint('uq_guide_ratings_guide_user', 'guide_ratings', ['guide_id', 'user_id'])
+
+
+def downgrade():
+    op.drop_constraint('uq_guide_ratings_guide_user', 'guide_ratings', type_='unique')
+
+    for name, table, _, _ in reversed(PARTIAL_INDEXES):
+        op.drop_index(name, table_name=table)
+
+    for name, table, columns in REPLACED_INDEXES:
+        op.create_index(name, table, columns, unique=False)
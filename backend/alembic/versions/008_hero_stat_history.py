@@ -0,0 +1,48 @@
+"""Hero meta-stat snapshots and daily rollups
+
+Revision ID: 008_hero_stat_history
+Revises: 007_query_shape_indexes
+Create Date: 2024-02-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_hero_stat_history'
+down_revision = '007_query_shape_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('hero_stat_snapshots',
+        sa.Column('hero_id', sa.Integer(), nullable=False),
+        sa.Column('captured_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('win_rate', sa.Float(precision=24), nullable=False),
+        sa.Column('pick_rate', sa.Float(precision=24), nullable=False),
+        sa.Column('ban_rate', sa.Float(precision=24), nullable=False),
+        sa.Column('patch', sa.String(length=20), nullable=True),
+        sa.ForeignKeyConstraint(['hero_id'], ['heroes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('hero_id', 'captured_at')
+    )
+    op.create_index('ix_hero_stat_snapshots_captured_brin', 'hero_stat_snapshots', ['captured_at'],
+                    unique=False, postgresql_using='brin')
+
+    op.create_table('hero_stat_daily',
+        sa.Column('hero_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('samples', sa.Integer(), nullable=False),
+        sa.Column('win_rate', sa.Float(), nullable=False),
+        sa.Column('pick_rate', sa.Float(), nullable=False),
+        sa.Column('ban_rate', sa.Float(), nullable=False),
+        sa.Column('patch', sa.String(length=20), nullable=True),
+        sa.ForeignKeyConstraint(['hero_id'], ['heroes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('hero_id', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('hero_stat_daily')
+    op.drop_index('ix_hero_stat_snapshots_captured_brin', table_name='hero_stat_snapshots')
+    op.drop_table('hero_stat_snapshots')
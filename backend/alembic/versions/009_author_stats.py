@@ -0,0 +1,48 @@
+"""Per-author guide stats projection
+
+Revision ID: 009_author_stats
+Revises: 008_hero_stat_history
+Create Date: 2024-02-25 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_author_stats'
+down_revision = '008_hero_stat_history'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('author_stats',
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('guides_count', sa.Integer(), nullable=False),
+        sa.Column('total_views', sa.Integer(), nullable=False),
+        sa.Column('total_likes', sa.Integer(), nullable=False),
+        sa.Column('rated_guides', sa.Integer(), nullable=False),
+        sa.Column('rating_total', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('author_id')
+    )
+    op.create_index('ix_author_stats_views', 'author_stats',
+                    [sa.text('total_views DESC'), sa.text('author_id DESC')], unique=False)
+    op.create_index('ix_author_stats_likes', 'author_stats',
+                    [sa.text('total_likes DESC'), sa.text('author_id DESC')], unique=False)
+
+    # Заполнить проекцию по уже опубликованным гайдам
+    op.execute("""
+        INSERT INTO author_stats (author_id, guides_count, total_views, total_likes, rated_guides, rating_total)
+        SELECT author_id, COUNT(*), SUM(views), SUM(likes),
+               COUNT(*) FILTER (WHERE rating > 0), COALESCE(SUM(rating) FILTER (WHERE rating > 0), 0)
+        FROM build_guides
+        WHERE is_published
+        GROUP BY author_id
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_author_stats_likes', table_name='author_stats')
+    op.drop_index('ix_author_stats_views', table_name='author_stats')
+    op.drop_table('author_stats')
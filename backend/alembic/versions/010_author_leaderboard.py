@@ -0,0 +1,34 @@
+"""Ranked author leaderboard snapshot
+
+Revision ID: 010_author_leaderboard
+Revises: 009_author_stats
+Create Date: 2024-03-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_author_leaderboard'
+down_revision = '009_author_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Заполняется фоновой задачей app.core.leaderboard при старте приложения
+    op.create_table('author_leaderboard',
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('guides_count', sa.Integer(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('author_id')
+    )
+    op.create_index('ix_author_leaderboard_rank', 'author_leaderboard', ['rank'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_author_leaderboard_rank', table_name='author_leaderboard')
+    op.drop_table('author_leaderboard')
@@ -0,0 +1,85 @@
+"""Time-decayed trending scores for guides
+
+Revision ID: 011_guide_trending_scores
+Revises: 010_author_leaderboard
+Create Date: 2024-03-05 00:00:00.000000
+
+"""
+import math
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_guide_trending_scores'
+down_revision = '010_author_leaderboard'
+branch_labels = None
+depends_on = None
+
+PUBLISHED = sa.text('is_published')
+
+# Колонка -> период полураспада, сек (app.core.trending.WINDOWS)
+TRENDING_COLUMNS = [('trending_day', 24 * 3600), ('trending_week', 7 * 24 * 3600)]
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+guides = sa.table(
+    'build_guides',
+    sa.column('id', sa.Integer()),
+    sa.column('views', sa.Integer()),
+    sa.column('likes', sa.Integer()),
+    sa.column('rating_sum', sa.Integer()),
+    sa.column('created_at', sa.DateTime(timezone=True)),
+)
+
+
+def backfill_in_python(column, half_life):
+    """Тот же расчет без EXTRACT/TIMESTAMPTZ (SQLite и другие диалекты)"""
+    bind = op.get_bind()
+    now = datetime.now(timezone.utc)
+    rows = bind.execute(sa.select(guides)).all()
+    for row in rows:
+        created_at = row.created_at or now
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        score = (
+            math.log(10 + (row.views or 0) + 5 * (row.likes or 0) + 2 * (row.rating_sum or 0))
+            + math.log(2) * (created_at - EPOCH).total_seconds() / half_life
+        )
+        bind.execute(
+            sa.text(f"UPDATE build_guides SET {column} = :score WHERE id = :id"),
+            {"score": score, "id": row.id}
+        )
+
+
+def upgrade():
+    for column, half_life in TRENDING_COLUMNS:
+        op.add_column('build_guides', sa.Column(column, sa.Float(), server_default='0', nullable=False))
+
+        # Накопленная статистика считается одним событием в момент создания гайда
+        # (и для черновиков: 0 отстоял бы от текущих оценок дальше, чем допускает exp()):
+        # веса публикации/просмотра/лайка/балла оценки — 10/1/5/2, эпоха 2024-01-01 UTC
+        if op.get_bind().dialect.name != 'postgresql':
+            backfill_in_python(column, half_life)
+        else:
+            op.execute(f"""
+                UPDATE build_guides SET {column} =
+                    LN(10 + views + 5 * likes + 2 * COALESCE(rating_sum, 0))
+                    + LN(2) * (EXTRACT(EPOCH FROM COALESCE(created_at, NOW())) - EXTRACT(EPOCH FROM TIMESTAMPTZ '2024-01-01 00:00:00+00')) / {half_life}
+            """)
+        op.create_index(f'ix_build_guides_{column}_published', 'build_guides',
+                        [sa.text(f'{column} DESC'), sa.text('id DESC')], unique=False,
+                        postgresql_where=PUBLISHED, sqlite_where=PUBLISHED)
+
+    # Выдача трендов больше не сортирует по views/likes
+    op.drop_index('ix_build_guides_views_likes_published', table_name='build_guides')
+
+
+def downgrade():
+    op.create_index('ix_build_guides_views_likes_published', 'build_guides',
+                    [sa.text('views DESC'), sa.text('likes DESC'), sa.text('id DESC')], unique=False,
+                    postgresql_where=PUBLISHED, sqlite_where=PUBLISHED)
+
+    for column, _ in reversed(TRENDING_COLUMNS):
+        op.drop_index(f'ix_build_guides_{column}_published', table_name='build_guides')
+        op.drop_column('build_guides', column)
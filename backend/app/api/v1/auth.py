@@ -1,21 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from app.core.database import get_db
+from typing import Optional
+from app.core import tokens
+from app.core.rate_limit import form_field, query_param, rate_limit
+from app.core.database import get_session
 from app.core.config import settings
 from app.models import User
-from app.schemas.user import UserCreate, UserResponse, Token
-from app.crud import user as user_crud
-from app.core.security import verify_password, create_access_token, get_password_hash, oauth2_scheme, get_current_user
+from app.schemas.user import UserCreate, UserResponse, Token, RefreshTokenRequest
+from app.crud.aio import user as user_crud
+from app.core.security import (
+    create_access_token, get_password_hash_async, verify_password_async, oauth2_scheme, get_current_user, access_token_claims,
+    decode_token, get_credentials_exception
+)
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+# Токен необязателен: /logout без сессии
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
+
+def _issue_tokens(user: User, family: str) -> dict:
+    """Пара access/refresh-токенов сессии family"""
+    access_token = create_access_token(
+        data=access_token_claims(user, family),
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_access_token(
+        data=tokens.refresh_claims(user.username, family),
+        expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+@router.post(
+    "/register",
+    response_model=UserResponse,
+    dependencies=[Depends(rate_limit("register", ip_rate="RATE_LIMIT_REGISTER_IP"))]
+)
+async def register(user: UserCreate, db: Session = Depends(get_session)):
     """Регистрация нового пользователя"""
     # Проверить, существует ли пользователь с таким email
-    db_user = user_crud.get_user_by_email(db, email=user.email)
+    db_user = await user_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -23,36 +49,40 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Проверить, существует ли пользователь с таким username
-    db_user = user_crud.get_user_by_username(db, username=user.username)
+    db_user = await user_crud.get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Username already taken"
         )
     
-    # Создать нового пользователя
-    return user_crud.create_user(db=db, user=user)
+    # Создать нового пользователя; bcrypt — в отдельном пуле, не в потоке запроса к БД
+    hashed_password = await get_password_hash_async(user.password)
+    return await user_crud.create_user(db=db, user=user, hashed_password=hashed_password)
 
-@router.post("/login", response_model=Token)
+@router.post(
+    "/login",
+    response_model=Token,
+    dependencies=[Depends(rate_limit(
+        "login",
+        ip_rate="RATE_LIMIT_LOGIN_IP",
+        identity_rate="RATE_LIMIT_LOGIN_USERNAME",
+        identity=form_field("username")
+    ))]
+)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Аутентификация пользователя"""
-    user = user_crud.authenticate_user(
-        db, form_data.username, form_data.password
-    )
-    if not user:
+    user = await user_crud.get_user_by_username(db, username=form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return _issue_tokens(user, tokens.new_family())
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_user)):
@@ -60,23 +90,45 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(current_user: User = Depends(get_current_user)):
-    """Обновить токен доступа"""
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": current_user.username}, expires_delta=access_token_expires
+async def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_session)):
+    """Обменять refresh-токен на новую пару токенов"""
+    credentials_exception = get_credentials_exception()
+    payload = await run_in_threadpool(
+        decode_token, request.refresh_token, credentials_exception, "refresh"
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Одноразовость: повторный обмен того же токена отзывает всю сессию
+    if not await run_in_threadpool(tokens.consume_refresh, payload):
+        raise credentials_exception
+    
+    user = await user_crud.get_user_by_username(db, username=payload["sub"])
+    if user is None or not user.is_active:
+        raise credentials_exception
+    return _issue_tokens(user, payload["fam"])
 
 @router.post("/logout")
-async def logout():
-    """Выход из системы"""
+async def logout(token: Optional[str] = Depends(optional_oauth2_scheme)):
+    """Выход из системы: отзыв всех токенов текущей сессии"""
+    if token is not None:
+        try:
+            payload = await run_in_threadpool(decode_token, token, get_credentials_exception())
+        except HTTPException:
+            payload = None
+        if payload and payload.get("fam"):
+            await run_in_threadpool(tokens.revoke_family, payload["fam"])
     return {"message": "Successfully logged out"}
 
-@router.post("/forgot-password")
-async def forgot_password(email: str, db: Session = Depends(get_db)):
+@router.post(
+    "/forgot-password",
+    dependencies=[Depends(rate_limit(
+        "forgot-password",
+        ip_rate="RATE_LIMIT_FORGOT_PASSWORD_IP",
+        identity_rate="RATE_LIMIT_FORGOT_PASSWORD_EMAIL",
+        identity=query_param("email")
+    ))]
+)
+async def forgot_password(email: str, db: Session = Depends(get_session)):
     """Запрос на восстановление пароля"""
-    user = user_crud.get_user_by_email(db, email=email)
+    user = await user_crud.get_user_by_email(db, email=email)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -91,7 +143,7 @@ async def forgot_password(email: str, db: Session = Depends(get_db)):
 async def reset_password(
     token: str,
     new_password: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Сброс пароля по токену"""
     # Здесь должна быть логика проверки токена и сброса пароля
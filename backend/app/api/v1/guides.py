@@ -1,27 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.core.database import get_db
+from typing import List, Literal, Optional
+from app.core.cache import cached
+from app.core.database import get_session
+from app.core.pagination import set_next_cursor
+from app.core.view_counter import view_counter
 from app.models import BuildGuide, User
-from app.schemas.guide import GuideResponse, GuideCreate, GuideUpdate, GuideDetail
-from app.crud import guide as guide_crud
-from app.core.security import get_current_user
+from app.schemas.guide import GuideResponse, TrendingGuideResponse, GuideCreate, GuideUpdate, GuideDetail, GuideCommentResponse
+from app.crud.aio import guide as guide_crud
+from app.crud.guide import COMMENTS_ORDER, GUIDES_ORDER, LATEST_ORDER, TRENDING_ORDERS
+from app.core.security import get_token_user
+from app.core.stats import stats_registry
 
 router = APIRouter()
 
 @router.get("/", response_model=List[GuideResponse])
 async def get_guides(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor; заменяет skip"),
     hero_id: Optional[int] = Query(None),
     author_id: Optional[int] = Query(None),
     difficulty: Optional[str] = Query(None),
     play_style: Optional[str] = Query(None),
     tags: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Получить список гайдов с фильтрацией"""
-    guides = guide_crud.get_guides(
+    guides = await guide_crud.get_guides(
         db=db,
         skip=skip,
         limit=limit,
@@ -29,40 +36,62 @@ async def get_guides(
         author_id=author_id,
         difficulty=difficulty,
         play_style=play_style,
-        tags=tags
+        tags=tags,
+        cursor=cursor
     )
+    set_next_cursor(response, GUIDES_ORDER, guides, limit)
     return guides
 
 @router.post("/", response_model=GuideResponse)
 async def create_guide(
     guide: GuideCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_token_user)
 ):
     """Создать новый гайд"""
-    return guide_crud.create_guide(db=db, guide=guide, author_id=current_user.id)
+    return await guide_crud.create_guide(db=db, guide=guide, author_id=current_user.id)
+
+@router.get("/likes/me")
+async def get_my_likes(
+    guide_ids: List[int] = Query(..., max_length=100),
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_token_user)
+):
+    """Какие из гайдов на странице лайкнул текущий пользователь"""
+    liked = await guide_crud.get_liked_guide_ids(db=db, user_id=current_user.id, guide_ids=guide_ids)
+    return {"liked": sorted(liked)}
+
+@router.get("/stats/overview")
+async def get_guides_stats():
+    """Получить общую статистику по гайдам"""
+    return await stats_registry.get("guides")
 
 @router.get("/{guide_id}", response_model=GuideDetail)
-async def get_guide(guide_id: int, db: Session = Depends(get_db)):
+async def get_guide(guide_id: int, db: Session = Depends(get_session)):
     """Получить детальную информацию о гайде"""
-    guide = guide_crud.get_guide(db=db, guide_id=guide_id)
-    if not guide:
+    detail = await guide_crud.get_guide_detail(db=db, guide_id=guide_id)
+    if not detail:
         raise HTTPException(status_code=404, detail="Guide not found")
     
-    # Увеличить счетчик просмотров
-    guide_crud.increment_views(db=db, guide_id=guide_id)
+    # Просмотр учитывается в буфере и попадает в БД при очередном сбросе
+    await view_counter.hit("guide", guide_id)
     
-    return guide
+    guide, comments_count = detail
+    return GuideDetail.model_validate(guide).model_copy(update={
+        "hero_name": guide.hero.name,
+        "author_name": guide.author.username,
+        "comments_count": comments_count
+    })
 
 @router.put("/{guide_id}", response_model=GuideResponse)
 async def update_guide(
     guide_id: int,
     guide_update: GuideUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_token_user)
 ):
     """Обновить гайд"""
-    guide = guide_crud.get_guide(db=db, guide_id=guide_id)
+    guide = await guide_crud.get_guide(db=db, guide_id=guide_id)
     if not guide:
         raise HTTPException(status_code=404, detail="Guide not found")
     
@@ -70,16 +99,16 @@ async def update_guide(
     if guide.author_id != current_user.id and current_user.role not in ["Moderator", "Admin"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    return guide_crud.update_guide(db=db, guide_id=guide_id, guide_update=guide_update)
+    return await guide_crud.update_guide(db=db, guide_id=guide_id, guide_update=guide_update)
 
 @router.delete("/{guide_id}")
 async def delete_guide(
     guide_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_token_user)
 ):
     """Удалить гайд"""
-    guide = guide_crud.get_guide(db=db, guide_id=guide_id)
+    guide = await guide_crud.get_guide(db=db, guide_id=guide_id)
     if not guide:
         raise HTTPException(status_code=404, detail="Guide not found")
     
@@ -87,7 +116,7 @@ async def delete_guide(
     if guide.author_id != current_user.id and current_user.role not in ["Moderator", "Admin"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    success = guide_crud.delete_guide(db=db, guide_id=guide_id)
+    success = await guide_crud.delete_guide(db=db, guide_id=guide_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to delete guide")
     
@@ -98,18 +127,18 @@ async def rate_guide(
     guide_id: int,
     rating: int,
     review: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_token_user)
 ):
     """Оценить гайд"""
     if rating < 1 or rating > 5:
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
     
-    guide = guide_crud.get_guide(db=db, guide_id=guide_id)
+    guide = await guide_crud.get_guide(db=db, guide_id=guide_id)
     if not guide:
         raise HTTPException(status_code=404, detail="Guide not found")
     
-    return guide_crud.rate_guide(
+    return await guide_crud.rate_guide(
         db=db, 
         guide_id=guide_id, 
         user_id=current_user.id, 
@@ -120,52 +149,92 @@ async def rate_guide(
 @router.post("/{guide_id}/like")
 async def like_guide(
     guide_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_token_user)
 ):
     """Лайкнуть гайд"""
-    guide = guide_crud.get_guide(db=db, guide_id=guide_id)
+    guide = await guide_crud.get_guide(db=db, guide_id=guide_id)
+    if not guide:
+        raise HTTPException(status_code=404, detail="Guide not found")
+    
+    return await guide_crud.like_guide(db=db, guide_id=guide_id, user_id=current_user.id)
+
+@router.delete("/{guide_id}/like")
+async def unlike_guide(
+    guide_id: int,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_token_user)
+):
+    """Убрать лайк с гайда"""
+    guide = await guide_crud.get_guide(db=db, guide_id=guide_id)
     if not guide:
         raise HTTPException(status_code=404, detail="Guide not found")
     
-    return guide_crud.like_guide(db=db, guide_id=guide_id, user_id=current_user.id)
+    return await guide_crud.unlike_guide(db=db, guide_id=guide_id, user_id=current_user.id)
 
-@router.get("/{guide_id}/comments")
+@router.get("/{guide_id}/comments", response_model=List[GuideCommentResponse])
 async def get_guide_comments(
     guide_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_session)
 ):
     """Получить комментарии к гайду"""
-    guide = guide_crud.get_guide(db=db, guide_id=guide_id)
+    guide = await guide_crud.get_guide(db=db, guide_id=guide_id)
     if not guide:
         raise HTTPException(status_code=404, detail="Guide not found")
     
-    comments = guide_crud.get_guide_comments(
+    comments = await guide_crud.get_guide_comments(
         db=db, 
         guide_id=guide_id, 
         skip=skip, 
-        limit=limit
+        limit=limit,
+        cursor=cursor
     )
-    return comments
+    set_next_cursor(response, COMMENTS_ORDER, comments, limit)
+    return [
+        GuideCommentResponse(
+            id=comment.id,
+            content=comment.content,
+            author_id=comment.author_id,
+            author_name=comment.author.username,
+            likes=comment.likes or 0,
+            created_at=comment.created_at,
+            parent_id=comment.parent_id
+        )
+        for comment in comments
+    ]
+
+@cached("guides", ttl=60, response_model=List[TrendingGuideResponse])
+async def _get_trending_guides(skip: int, limit: int, cursor: Optional[str], window: str, db: Session):
+    return await guide_crud.get_trending_guides(db=db, skip=skip, limit=limit, cursor=cursor, window=window)
 
-@router.get("/trending/")
+@router.get("/trending/", response_model=List[TrendingGuideResponse])
 async def get_trending_guides(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    window: Literal["day", "week"] = Query("day", description="Период полураспада оценки: сутки или неделя"),
+    db: Session = Depends(get_session)
 ):
     """Получить популярные гайды"""
-    guides = guide_crud.get_trending_guides(db=db, skip=skip, limit=limit)
+    # Кэшируется только выборка: курсор строится и для ответа из кэша
+    guides = await _get_trending_guides(skip=skip, limit=limit, cursor=cursor, window=window, db=db)
+    set_next_cursor(response, TRENDING_ORDERS[window], guides, limit)
     return guides
 
 @router.get("/latest/")
 async def get_latest_guides(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_session)
 ):
     """Получить последние гайды"""
-    guides = guide_crud.get_latest_guides(db=db, skip=skip, limit=limit)
+    guides = await guide_crud.get_latest_guides(db=db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, LATEST_ORDER, guides, limit)
     return guides
\ No newline at end of file
@@ -1,23 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.core.database import get_db
-from app.models import Hero, HeroCounter, HeroSynergy
-from app.schemas.hero import HeroResponse, HeroDetail, HeroCounterResponse
-from app.crud import hero as hero_crud
+from app.core.cache import cached
+from app.core.database import get_session
+from app.core.draft import recommend
+from app.core.matchups import Matchup, hero_card, matchup_matrix
+from app.core.pagination import set_next_cursor
+from app.core.security import get_current_admin_user
+from app.core.stats import stats_registry
+from app.schemas.hero import (
+    HeroResponse, HeroDetail, HeroCounterResponse, HeroCounterPick, DraftRecommendRequest, DraftCandidate,
+    HeroStatSnapshotCreate, HeroStatPoint, HeroPatchStats
+)
+from app.models import User
+from app.crud.aio import hero as hero_crud
+from app.crud.guide import GUIDES_ORDER
 
 router = APIRouter()
 
+# Размер вражеской команды
+MAX_ENEMY_HEROES = 5
+# Замеров в одном запросе загрузки статистики
+MAX_STAT_SNAPSHOTS = 5000
+
+def _matchup_response(other: dict, relation_type: Optional[str], win_rate: Optional[float]) -> HeroCounterResponse:
+    """Карточка героя из пары контрпик/союзник (other — карточка из матрицы)"""
+    return HeroCounterResponse(**other, counter_type=relation_type, win_rate=win_rate)
+
 @router.get("/", response_model=List[HeroResponse])
+@cached("heroes", ttl=300, response_model=List[HeroResponse])
 async def get_heroes(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     role: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Получить список всех героев с фильтрацией"""
-    heroes = hero_crud.get_heroes(
+    heroes = await hero_crud.get_heroes(
         db=db, 
         skip=skip, 
         limit=limit, 
@@ -27,56 +47,120 @@ async def get_heroes(
     return heroes
 
 @router.get("/{hero_id}", response_model=HeroDetail)
-async def get_hero(hero_id: int, db: Session = Depends(get_db)):
+async def get_hero(hero_id: int, db: Session = Depends(get_session)):
     """Получить детальную информацию о герое"""
-    hero = hero_crud.get_hero(db=db, hero_id=hero_id)
+    hero = await hero_crud.get_hero(db=db, hero_id=hero_id)
     if not hero:
         raise HTTPException(status_code=404, detail="Hero not found")
     return hero
 
-@router.get("/{hero_id}/counters", response_model=List[HeroCounterResponse])
-async def get_hero_counters(hero_id: int, db: Session = Depends(get_db)):
-    """Получить контрпики для героя"""
-    hero = hero_crud.get_hero(db=db, hero_id=hero_id)
+@router.get("/counters/best", response_model=List[HeroCounterPick])
+async def get_best_counters(
+    # Optional: FastAPI 0.104 не может сериализовать ошибку пропущенного обязательного списка
+    enemy_ids: Optional[List[int]] = Query(None),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Лучшие контрпики против набора вражеских героев"""
+    if not enemy_ids or len(enemy_ids) > MAX_ENEMY_HEROES:
+        raise HTTPException(status_code=400, detail=f"Pass from 1 to {MAX_ENEMY_HEROES} enemy_ids")
+    await matchup_matrix.ensure_fresh()
+    return [
+        HeroCounterPick(**hero, score=score, matchups=matchups)
+        for hero, score, matchups in matchup_matrix.best_counters(enemy_ids, limit)
+    ]
+
+@router.post("/draft/recommend", response_model=List[DraftCandidate])
+async def recommend_draft_pick(draft: DraftRecommendRequest):
+    """Рекомендовать героев на следующий пик драфта"""
+    await matchup_matrix.ensure_fresh()
+    return recommend(matchup_matrix.snapshot, draft.allies, draft.enemies, draft.bans, draft.limit)
+
+async def _db_matchups(db: Session, hero_id: int, relation: str) -> List[Matchup]:
+    """Связи героя из БД, если его еще нет в снимке матриц"""
+    # Герой мог появиться после перестройки снимка (другой процесс, импорт)
+    hero = await hero_crud.get_hero(db=db, hero_id=hero_id)
     if not hero:
         raise HTTPException(status_code=404, detail="Hero not found")
+    matchup_matrix.mark_stale()
     
-    counters = hero_crud.get_hero_counters(db=db, hero_id=hero_id)
-    return counters
+    if relation == "counters":
+        counters = await hero_crud.get_hero_counters(db=db, hero_id=hero_id)
+        return [(hero_card(counter.counter_hero), counter.counter_type, counter.win_rate) for counter in counters]
+    synergies = await hero_crud.get_hero_synergies(db=db, hero_id=hero_id)
+    return [(hero_card(synergy.synergy_hero), synergy.synergy_type, synergy.win_rate) for synergy in synergies]
+
+@router.get("/{hero_id}/counters", response_model=List[HeroCounterResponse])
+async def get_hero_counters(hero_id: int, db: Session = Depends(get_session)):
+    """Получить контрпики для героя"""
+    await matchup_matrix.ensure_fresh()
+    counters = matchup_matrix.counters(hero_id)
+    if counters is None:
+        counters = await _db_matchups(db, hero_id, "counters")
+    return [_matchup_response(*counter) for counter in counters]
 
 @router.get("/{hero_id}/synergies", response_model=List[HeroCounterResponse])
-async def get_hero_synergies(hero_id: int, db: Session = Depends(get_db)):
+async def get_hero_synergies(hero_id: int, db: Session = Depends(get_session)):
     """Получить союзников для героя"""
-    hero = hero_crud.get_hero(db=db, hero_id=hero_id)
-    if not hero:
-        raise HTTPException(status_code=404, detail="Hero not found")
-    
-    synergies = hero_crud.get_hero_synergies(db=db, hero_id=hero_id)
-    return synergies
+    await matchup_matrix.ensure_fresh()
+    synergies = matchup_matrix.synergies(hero_id)
+    if synergies is None:
+        synergies = await _db_matchups(db, hero_id, "synergies")
+    return [_matchup_response(*synergy) for synergy in synergies]
 
 @router.get("/{hero_id}/guides")
 async def get_hero_guides(
     hero_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_session)
 ):
     """Получить гайды для героя"""
-    hero = hero_crud.get_hero(db=db, hero_id=hero_id)
+    hero = await hero_crud.get_hero(db=db, hero_id=hero_id)
     if not hero:
         raise HTTPException(status_code=404, detail="Hero not found")
     
-    guides = hero_crud.get_hero_guides(db=db, hero_id=hero_id, skip=skip, limit=limit)
+    guides = await hero_crud.get_hero_guides(db=db, hero_id=hero_id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, GUIDES_ORDER, guides, limit)
     return guides
 
 @router.get("/roles/list")
-async def get_hero_roles(db: Session = Depends(get_db)):
+async def get_hero_roles(db: Session = Depends(get_session)):
     """Получить список всех ролей героев"""
-    roles = hero_crud.get_hero_roles(db=db)
+    roles = await hero_crud.get_hero_roles(db=db)
     return {"roles": roles}
 
 @router.get("/stats/overview")
-async def get_heroes_stats(db: Session = Depends(get_db)):
+async def get_heroes_stats():
     """Получить общую статистику по героям"""
-    stats = hero_crud.get_heroes_stats(db=db)
-    return stats
\ No newline at end of file
+    return await stats_registry.get("heroes")
+
+@router.post("/stats/snapshots")
+async def ingest_hero_stats(
+    snapshots: List[HeroStatSnapshotCreate],
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Загрузить пакет замеров мета-статистики героев (только для администраторов)"""
+    if len(snapshots) > MAX_STAT_SNAPSHOTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STAT_SNAPSHOTS} snapshots per request")
+    return await hero_crud.ingest_hero_stats(db=db, snapshots=snapshots)
+
+@router.get("/{hero_id}/stats/history", response_model=List[HeroStatPoint])
+async def get_hero_stat_history(
+    hero_id: int,
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_session)
+):
+    """Дневная история win/pick/ban rate героя"""
+    return await hero_crud.get_hero_stat_history(db=db, hero_id=hero_id, days=days)
+
+@router.get("/{hero_id}/stats/patches", response_model=List[HeroPatchStats])
+async def get_hero_patch_stats(
+    hero_id: int,
+    limit: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_session)
+):
+    """Средние показатели героя за последние патчи"""
+    return await hero_crud.get_hero_patch_stats(db=db, hero_id=hero_id, limit=limit)
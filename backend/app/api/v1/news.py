@@ -1,50 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.cache import cached
+from app.core.database import get_session
+from app.core.pagination import set_next_cursor
+from app.core.view_counter import view_counter
 from app.models import News, User
 from app.schemas.news import NewsResponse, NewsCreate, NewsUpdate, NewsDetail
-from app.crud import news as news_crud
+from app.crud.aio import news as news_crud
+from app.crud.news import NEWS_ORDER
 from app.core.security import get_current_user, get_current_admin_user
+from app.core.stats import stats_registry
 
 router = APIRouter()
 
 @router.get("/", response_model=List[NewsResponse])
 async def get_news(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor; заменяет skip"),
     category: Optional[str] = Query(None),
     featured: Optional[bool] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Получить список новостей"""
-    news = news_crud.get_news(
+    news = await news_crud.get_news(
         db=db,
         skip=skip,
         limit=limit,
         category=category,
-        featured=featured
+        featured=featured,
+        cursor=cursor
     )
+    set_next_cursor(response, NEWS_ORDER, news, limit)
     return news
 
 @router.post("/", response_model=NewsResponse)
 async def create_news(
     news: NewsCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Создать новую новость (только для админов)"""
-    return news_crud.create_news(db=db, news=news, author_id=current_user.id)
+    return await news_crud.create_news(db=db, news=news, author_id=current_user.id)
+
+@router.get("/stats/overview")
+async def get_news_stats():
+    """Получить общую статистику по новостям"""
+    return await stats_registry.get("news")
 
 @router.get("/{news_id}", response_model=NewsDetail)
-async def get_news_detail(news_id: int, db: Session = Depends(get_db)):
+async def get_news_detail(news_id: int, db: Session = Depends(get_session)):
     """Получить детальную информацию о новости"""
-    news = news_crud.get_news_by_id(db=db, news_id=news_id)
+    news = await news_crud.get_news_by_id(db=db, news_id=news_id)
     if not news:
         raise HTTPException(status_code=404, detail="News not found")
     
-    # Увеличить счетчик просмотров
-    news_crud.increment_views(db=db, news_id=news_id)
+    # Просмотр учитывается в буфере и попадает в БД при очередном сбросе
+    await view_counter.hit("news", news_id)
     
     return news
 
@@ -52,11 +66,11 @@ async def get_news_detail(news_id: int, db: Session = Depends(get_db)):
 async def update_news(
     news_id: int,
     news_update: NewsUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Обновить новость (только для админов)"""
-    news = news_crud.update_news(db=db, news_id=news_id, news_update=news_update)
+    news = await news_crud.update_news(db=db, news_id=news_id, news_update=news_update)
     if not news:
         raise HTTPException(status_code=404, detail="News not found")
     
@@ -65,36 +79,40 @@ async def update_news(
 @router.delete("/{news_id}")
 async def delete_news(
     news_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Удалить новость (только для админов)"""
-    success = news_crud.delete_news(db=db, news_id=news_id)
+    success = await news_crud.delete_news(db=db, news_id=news_id)
     if not success:
         raise HTTPException(status_code=404, detail="News not found")
     
     return {"message": "News deleted successfully"}
 
 @router.get("/featured/", response_model=List[NewsResponse])
+@cached("news", ttl=120, response_model=List[NewsResponse])
 async def get_featured_news(
     limit: int = Query(5, ge=1, le=20),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Получить рекомендуемые новости"""
-    news = news_crud.get_featured_news(db=db, limit=limit)
+    news = await news_crud.get_featured_news(db=db, limit=limit)
     return news
 
 @router.get("/latest/", response_model=List[NewsResponse])
 async def get_latest_news(
+    response: Response,
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_session)
 ):
     """Получить последние новости"""
-    news = news_crud.get_latest_news(db=db, limit=limit)
+    news = await news_crud.get_latest_news(db=db, limit=limit, cursor=cursor)
+    set_next_cursor(response, NEWS_ORDER, news, limit)
     return news
 
 @router.get("/categories/list")
-async def get_news_categories(db: Session = Depends(get_db)):
+async def get_news_categories(db: Session = Depends(get_session)):
     """Получить список категорий новостей"""
-    categories = news_crud.get_news_categories(db=db)
+    categories = await news_crud.get_news_categories(db=db)
     return {"categories": categories}
\ No newline at end of file
@@ -1,72 +1,118 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.core.database import get_db
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+from app.core.autocomplete import autocomplete_index
+from app.core.config import settings
+from app.core.database import get_session, run_in_new_session
 from app.models import Hero, User, BuildGuide
-from app.crud import hero as hero_crud, user as user_crud, guide as guide_crud
+from app.crud import guide as sync_guide_crud, hero as sync_hero_crud, user as sync_user_crud
+from app.crud.aio import hero as hero_crud, user as user_crud, guide as guide_crud
+from app.schemas.search import GuideSearchFilters, HeroSearchFilters, UserSearchFilters
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+async def _run_source(name: str, fn: Callable, *args) -> Tuple[str, Optional[Any], float, Optional[str]]:
+    """Выполнить один источник в отдельной сессии с таймаутом; ошибка не валит весь поиск"""
+    start = time.perf_counter()
+    error = None
+    try:
+        result = await asyncio.wait_for(
+            run_in_new_session(fn, *args),
+            timeout=settings.SEARCH_SOURCE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Search source %s timed out after %.2fs", name, settings.SEARCH_SOURCE_TIMEOUT)
+        result, error = None, "timeout"
+    except Exception:
+        logger.exception("Search source %s failed", name)
+        result, error = None, "failed"
+    return name, result, round((time.perf_counter() - start) * 1000, 2), error
+
+async def _fan_out(sources: Dict[str, Tuple]) -> Tuple[Dict[str, Any], Dict[str, float], List[str], List[str]]:
+    """Параллельно выполнить источники; медленные и упавшие отбрасываются"""
+    outcomes = await asyncio.gather(*(
+        _run_source(name, fn, *args) for name, (fn, *args) in sources.items()
+    ))
+    results = {name: result for name, result, _, error in outcomes if error is None}
+    timings = {name: elapsed for name, _, elapsed, _ in outcomes}
+    timed_out = [name for name, _, _, error in outcomes if error == "timeout"]
+    failed = [name for name, _, _, error in outcomes if error == "failed"]
+    return results, timings, timed_out, failed
+
+# Источники сериализуют результат внутри своей сессии,
+# чтобы после ее закрытия не было ленивых загрузок
+
+def _hero_results(db: Session, q: str, limit: int) -> List[dict]:
+    return [
+        {
+            "id": hero.id,
+            "name": hero.name,
+            "role": hero.role,
+            "specialty": hero.specialty,
+            "avatar_url": hero.avatar_url
+        }
+        for hero in sync_hero_crud.search_heroes(db, q, limit)
+    ]
+
+def _guide_results(db: Session, q: str, limit: int) -> List[dict]:
+    return [
+        {
+            "id": guide.id,
+            "title": guide.title,
+            "description": guide.description,
+            "hero_id": guide.hero_id,
+            "author_id": guide.author_id,
+            "rating": guide.rating,
+            "views": guide.views
+        }
+        for guide in sync_guide_crud.search_guides(db, q, limit)
+    ]
+
+def _user_results(db: Session, q: str, limit: int) -> List[dict]:
+    return [
+        {
+            "id": user.id,
+            "username": user.username,
+            "ign": user.ign,
+            "role": user.role,
+            "current_rank": user.current_rank
+        }
+        for user in sync_user_crud.search_users(db, q, limit)
+    ]
+
 @router.get("/")
 async def search(
     q: str = Query(..., min_length=1, max_length=100),
     type: Optional[str] = Query(None, regex="^(hero|guide|user)$"),
-    limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=50)
 ):
     """Универсальный поиск по платформе"""
+    sources = {
+        "heroes": (_hero_results, q, limit),
+        "guides": (_guide_results, q, limit),
+        "users": (_user_results, q, limit)
+    }
+    if type:
+        source = {"hero": "heroes", "guide": "guides", "user": "users"}[type]
+        sources = {source: sources[source]}
+
+    found, timings, timed_out, failed = await _fan_out(sources)
     results = {
         "query": q,
         "total_results": 0,
-        "heroes": [],
-        "guides": [],
-        "users": []
+        "heroes": found.get("heroes", []),
+        "guides": found.get("guides", []),
+        "users": found.get("users", []),
+        "timings_ms": timings,
+        "timed_out": timed_out,
+        "failed": failed
     }
     
-    # Поиск героев
-    if not type or type == "hero":
-        heroes = hero_crud.search_heroes(db=db, query=q, limit=limit)
-        results["heroes"] = [
-            {
-                "id": hero.id,
-                "name": hero.name,
-                "role": hero.role,
-                "specialty": hero.specialty,
-                "avatar_url": hero.avatar_url
-            }
-            for hero in heroes
-        ]
-    
-    # Поиск гайдов
-    if not type or type == "guide":
-        guides = guide_crud.search_guides(db=db, query=q, limit=limit)
-        results["guides"] = [
-            {
-                "id": guide.id,
-                "title": guide.title,
-                "description": guide.description,
-                "hero_id": guide.hero_id,
-                "author_id": guide.author_id,
-                "rating": guide.rating,
-                "views": guide.views
-            }
-            for guide in guides
-        ]
-    
-    # Поиск пользователей
-    if not type or type == "user":
-        users = user_crud.search_users(db=db, query=q, limit=limit)
-        results["users"] = [
-            {
-                "id": user.id,
-                "username": user.username,
-                "ign": user.ign,
-                "role": user.role,
-                "current_rank": user.current_rank
-            }
-            for user in users
-        ]
-    
     # Подсчет общего количества результатов
     results["total_results"] = len(results["heroes"]) + len(results["guides"]) + len(results["users"])
     
@@ -76,15 +122,14 @@ async def search(
 async def search_heroes(
     q: str = Query(..., min_length=1, max_length=100),
     role: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Поиск героев"""
-    heroes = hero_crud.search_heroes(db=db, query=q, limit=limit)
-    
-    # Фильтрация по роли если указана
-    if role:
-        heroes = [hero for hero in heroes if hero.role == role]
+    heroes, total = await hero_crud.search_heroes_page(
+        db=db, query=q, filters=HeroSearchFilters(role=role), skip=skip, limit=limit
+    )
     
     return {
         "query": q,
@@ -106,7 +151,7 @@ async def search_heroes(
             }
             for hero in heroes
         ],
-        "total": len(heroes)
+        "total": total
     }
 
 @router.get("/guides")
@@ -115,29 +160,19 @@ async def search_guides(
     hero_id: Optional[int] = Query(None),
     difficulty: Optional[str] = Query(None),
     play_style: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Поиск гайдов"""
-    guides = guide_crud.search_guides(db=db, query=q, limit=limit)
-    
-    # Дополнительные фильтры
-    if hero_id:
-        guides = [guide for guide in guides if guide.hero_id == hero_id]
-    
-    if difficulty:
-        guides = [guide for guide in guides if guide.difficulty == difficulty]
-    
-    if play_style:
-        guides = [guide for guide in guides if guide.play_style == play_style]
+    filters = GuideSearchFilters(hero_id=hero_id, difficulty=difficulty, play_style=play_style)
+    guides, total = await guide_crud.search_guides_page(
+        db=db, query=q, filters=filters, skip=skip, limit=limit
+    )
     
     return {
         "query": q,
-        "filters": {
-            "hero_id": hero_id,
-            "difficulty": difficulty,
-            "play_style": play_style
-        },
+        "filters": filters.model_dump(),
         "results": [
             {
                 "id": guide.id,
@@ -154,22 +189,21 @@ async def search_guides(
             }
             for guide in guides
         ],
-        "total": len(guides)
+        "total": total
     }
 
 @router.get("/users")
 async def search_users(
     q: str = Query(..., min_length=1, max_length=100),
     role: Optional[str] = Query(None),
+    skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Поиск пользователей"""
-    users = user_crud.search_users(db=db, query=q, limit=limit)
-    
-    # Фильтрация по роли если указана
-    if role:
-        users = [user for user in users if user.role == role]
+    users, total = await user_crud.search_users_page(
+        db=db, query=q, filters=UserSearchFilters(role=role), skip=skip, limit=limit
+    )
     
     return {
         "query": q,
@@ -187,49 +221,18 @@ async def search_users(
             }
             for user in users
         ],
-        "total": len(users)
+        "total": total
     }
 
 @router.get("/suggestions")
 async def get_search_suggestions(
     q: str = Query(..., min_length=1, max_length=50),
-    limit: int = Query(5, ge=1, le=20),
-    db: Session = Depends(get_db)
+    limit: int = Query(5, ge=1, le=20)
 ):
     """Получить предложения для автодополнения поиска"""
-    suggestions = []
-    
-    # Предложения по героям
-    heroes = hero_crud.search_heroes(db=db, query=q, limit=limit)
-    for hero in heroes:
-        suggestions.append({
-            "type": "hero",
-            "id": hero.id,
-            "text": hero.name,
-            "subtitle": f"{hero.role} • {hero.specialty}"
-        })
-    
-    # Предложения по гайдам
-    guides = guide_crud.search_guides(db=db, query=q, limit=limit)
-    for guide in guides:
-        suggestions.append({
-            "type": "guide",
-            "id": guide.id,
-            "text": guide.title,
-            "subtitle": f"Guide by {guide.author_id}"
-        })
-    
-    # Предложения по пользователям
-    users = user_crud.search_users(db=db, query=q, limit=limit)
-    for user in users:
-        suggestions.append({
-            "type": "user",
-            "id": user.id,
-            "text": user.username,
-            "subtitle": f"{user.role} • {user.ign or 'No IGN'}"
-        })
+    await autocomplete_index.ensure_loaded()
     
     return {
         "query": q,
-        "suggestions": suggestions[:limit]
-    }
\ No newline at end of file
+        "suggestions": autocomplete_index.suggest(q, limit)
+    }
@@ -1,29 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.core.database import get_db
+from typing import List, Literal, Optional
+from app.core.database import get_session
+from app.core.pagination import set_next_cursor
 from app.models import User
-from app.schemas.user import UserResponse, UserProfile, UserStats, UserUpdate
-from app.crud import user as user_crud
-from app.core.security import get_current_user, get_current_admin_user
+from app.schemas.user import UserResponse, UserProfile, UserStats, UserUpdate, AuthorStatsResponse, LeaderboardEntry
+from app.crud.aio import user as user_crud, guide as guide_crud
+from app.crud.guide import LATEST_ORDER
+from app.crud.user import USERS_ORDER
+from app.core.security import get_current_admin_user, get_password_hash_async, get_token_user
+from app.core.stats import stats_registry
 
 router = APIRouter()
 
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor; заменяет skip"),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Получить список пользователей (только для админов)"""
-    users = user_crud.get_users(db=db, skip=skip, limit=limit)
+    users = await user_crud.get_users(db=db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, USERS_ORDER, users, limit)
     return users
 
+@router.get("/authors/top", response_model=List[AuthorStatsResponse])
+async def get_top_authors(
+    by: Literal["views", "likes", "guides", "rating"] = Query("views"),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_session)
+):
+    """Лучшие авторы гайдов"""
+    return await guide_crud.get_top_authors(db=db, by=by, limit=limit)
+
+@router.get("/leaderboard", response_model=List[LeaderboardEntry])
+async def get_leaderboard(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_session)
+):
+    """Рейтинг авторов (пересчитывается периодически)"""
+    return await guide_crud.get_leaderboard(db=db, skip=skip, limit=limit)
+
+@router.get("/leaderboard/me", response_model=LeaderboardEntry)
+async def get_my_leaderboard_entry(
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_token_user)
+):
+    """Место текущего пользователя в рейтинге авторов"""
+    entry = await guide_crud.get_leaderboard_entry(db=db, user_id=current_user.id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="User is not ranked")
+    return entry
+
 @router.get("/{user_id}", response_model=UserProfile)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, db: Session = Depends(get_session)):
     """Получить профиль пользователя"""
-    user = user_crud.get_user(db=db, user_id=user_id)
+    user = await user_crud.get_user(db=db, user_id=user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -34,15 +70,16 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_token_user)
 ):
     """Обновить профиль пользователя"""
     # Пользователь может обновлять только свой профиль, админы - любой
     if user_id != current_user.id and current_user.role not in ["Admin", "Moderator"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    user = user_crud.update_user(db=db, user_id=user_id, user_update=user_update)
+    hashed_password = await get_password_hash_async(user_update.password) if user_update.password else None
+    user = await user_crud.update_user(db=db, user_id=user_id, user_update=user_update, hashed_password=hashed_password)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -51,11 +88,11 @@ async def update_user(
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Удалить пользователя (только для админов)"""
-    success = user_crud.delete_user(db=db, user_id=user_id)
+    success = await user_crud.delete_user(db=db, user_id=user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -64,81 +101,45 @@ async def delete_user(
 @router.get("/{user_id}/guides")
 async def get_user_guides(
     user_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_session)
 ):
     """Получить гайды пользователя"""
-    user = user_crud.get_user(db=db, user_id=user_id)
+    user = await user_crud.get_user(db=db, user_id=user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Здесь нужно импортировать guide_crud
-    from app.crud import guide as guide_crud
-    guides = guide_crud.get_user_guides(db=db, user_id=user_id, skip=skip, limit=limit)
+    guides = await guide_crud.get_user_guides(db=db, user_id=user_id, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, LATEST_ORDER, guides, limit)
     return guides
 
 @router.get("/{user_id}/stats")
-async def get_user_stats(user_id: int, db: Session = Depends(get_db)):
+async def get_user_stats(user_id: int, db: Session = Depends(get_session)):
     """Получить статистику пользователя"""
-    user = user_crud.get_user(db=db, user_id=user_id)
-    if not user:
+    stats = await guide_crud.get_author_stats(db=db, author_id=user_id)
+    if stats is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Получаем реальную статистику пользователя
-    from app.models import BuildGuide
-    from sqlalchemy import func
-    
-    # Подсчет гайдов пользователя
-    guides_count = db.query(func.count(BuildGuide.id)).filter(
-        BuildGuide.author_id == user_id,
-        BuildGuide.is_published == True
-    ).scalar() or 0
-    
-    # Подсчет общего количества просмотров
-    total_views = db.query(func.sum(BuildGuide.views)).filter(
-        BuildGuide.author_id == user_id,
-        BuildGuide.is_published == True
-    ).scalar() or 0
-    
-    # Подсчет общего количества лайков
-    total_likes = db.query(func.sum(BuildGuide.likes)).filter(
-        BuildGuide.author_id == user_id,
-        BuildGuide.is_published == True
-    ).scalar() or 0
-    
-    # Средний рейтинг гайдов
-    average_rating = db.query(func.avg(BuildGuide.rating)).filter(
-        BuildGuide.author_id == user_id,
-        BuildGuide.is_published == True,
-        BuildGuide.rating > 0
-    ).scalar() or 0.0
-    
-    return {
-        "user_id": user_id,
-        "guides_count": guides_count,
-        "total_views": total_views,
-        "total_likes": total_likes,
-        "average_rating": round(float(average_rating), 2)
-    }
+    return {"user_id": user_id, **stats}
 
 @router.get("/stats/overview", response_model=UserStats)
 async def get_users_overview_stats(
-    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Получить общую статистику пользователей (только для админов)"""
-    stats = user_crud.get_user_stats(db=db)
-    return stats
+    return await stats_registry.get("users")
 
 @router.post("/{user_id}/verify")
 async def verify_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Верифицировать пользователя (только для админов)"""
-    success = user_crud.verify_user(db=db, user_id=user_id)
+    success = await user_crud.verify_user(db=db, user_id=user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -147,11 +148,11 @@ async def verify_user(
 @router.post("/{user_id}/deactivate")
 async def deactivate_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Деактивировать пользователя (только для админов)"""
-    success = user_crud.deactivate_user(db=db, user_id=user_id)
+    success = await user_crud.deactivate_user(db=db, user_id=user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -160,11 +161,11 @@ async def deactivate_user(
 @router.post("/{user_id}/activate")
 async def activate_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Активировать пользователя (только для админов)"""
-    success = user_crud.activate_user(db=db, user_id=user_id)
+    success = await user_crud.activate_user(db=db, user_id=user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -174,7 +175,7 @@ async def activate_user(
 async def change_user_role(
     user_id: int,
     new_role: str,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_admin_user)
 ):
     """Изменить роль пользователя (только для админов)"""
@@ -182,7 +183,7 @@ async def change_user_role(
     if new_role not in valid_roles:
         raise HTTPException(status_code=400, detail="Invalid role")
     
-    success = user_crud.change_user_role(db=db, user_id=user_id, new_role=new_role)
+    success = await user_crud.change_user_role(db=db, user_id=user_id, new_role=new_role)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     
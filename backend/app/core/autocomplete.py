@@ -0,0 +1,221 @@
+"""
+Префиксный индекс автодополнения для /api/v1/search/suggestions.
+
+Имена героев, заголовки опубликованных гайдов и имена пользователей хранятся
+в памяти процесса как отсортированный массив терминов (каждый суффикс текста,
+начинающийся с границы слова), поэтому поиск по префиксу — это bisect и
+короткий проход по диапазону без обращения к БД.
+
+Индекс загружается при старте, обновляется из CRUD при записи (через
+подписку на app.core.search) и полностью перестраивается раз в
+AUTOCOMPLETE_REFRESH_INTERVAL секунд, чтобы подхватить изменения
+популярности и записи из других воркеров.
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.search import add_document_listener, tokenize
+from app.models import BuildGuide, Hero, User
+
+logger = logging.getLogger(__name__)
+
+# Порядок типов в выдаче (как в прежних подсказках): герои, гайды, пользователи
+KIND_ORDER = {"hero": 0, "guide": 1, "user": 2}
+
+# Для коротких префиксов диапазон большой, поэтому top-k кэшируется
+SHORT_PREFIX_LENGTH = 3
+MAX_SUGGESTIONS = 20
+
+EntryKey = Tuple[str, int]
+
+def _normalize(text: Optional[str]) -> str:
+    return " ".join(tokenize(text))
+
+def _terms(text: str) -> List[str]:
+    """Суффиксы текста от начала каждого слова: 'a b c' -> ['a b c', 'b c', 'c']"""
+    words = text.split(" ")
+    return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+def _hero_entry(hero: Any) -> Dict[str, Any]:
+    return {
+        "type": "hero",
+        "id": hero.id,
+        "text": hero.name,
+        "subtitle": f"{hero.role} • {hero.specialty}",
+        "popularity": float(hero.pick_rate or 0)
+    }
+
+def _guide_entry(guide: Any) -> Dict[str, Any]:
+    return {
+        "type": "guide",
+        "id": guide.id,
+        "text": guide.title,
+        "subtitle": f"Guide by {guide.author_id}",
+        "popularity": float(guide.views or 0)
+    }
+
+def _user_entry(user: Any) -> Dict[str, Any]:
+    return {
+        "type": "user",
+        "id": user.id,
+        "text": user.username,
+        "subtitle": f"{user.role} • {user.ign or 'No IGN'}",
+        "popularity": 0.0
+    }
+
+def _rank(entry: Dict[str, Any]) -> tuple:
+    return (KIND_ORDER[entry["type"]], -entry["popularity"], entry["text"].lower())
+
+class AutocompleteIndex:
+    """Отсортированный массив терминов с ранжированием по популярности"""
+
+    def __init__(self):
+        self._terms: List[Tuple[str, str, int]] = []
+        self._entries: Dict[EntryKey, Dict[str, Any]] = {}
+        self._top: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.loaded = False
+
+    def load(self, db: Session):
+        """Полностью перестроить индекс из БД"""
+        entries = [_hero_entry(hero) for hero in db.query(
+            Hero.id, Hero.name, Hero.role, Hero.specialty, Hero.pick_rate
+        )]
+        entries += [_guide_entry(guide) for guide in db.query(
+            BuildGuide.id, BuildGuide.title, BuildGuide.author_id, BuildGuide.views
+        ).filter(BuildGuide.is_published == True)]
+        entries += [_user_entry(user) for user in db.query(
+            User.id, User.username, User.role, User.ign
+        )]
+
+        terms = sorted(
+            (term, entry["type"], entry["id"])
+            for entry in entries
+            for term in _terms(_normalize(entry["text"]))
+        )
+        with self._lock:
+            self._terms = terms
+            self._entries = {(entry["type"], entry["id"]): entry for entry in entries}
+            self._top = {}
+            self.loaded = True
+
+    def _remove_locked(self, key: EntryKey):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for term in _terms(_normalize(entry["text"])):
+            position = bisect.bisect_left(self._terms, (term, key[0], key[1]))
+            if position < len(self._terms) and self._terms[position] == (term, key[0], key[1]):
+                self._terms.pop(position)
+
+    def upsert(self, entry: Dict[str, Any]):
+        """Добавить или обновить запись"""
+        key = (entry["type"], entry["id"])
+        with self._lock:
+            self._remove_locked(key)
+            self._entries[key] = entry
+            for term in _terms(_normalize(entry["text"])):
+                bisect.insort(self._terms, (term, key[0], key[1]))
+            self._top = {}
+
+    def remove(self, kind: str, object_id: int):
+        """Удалить запись"""
+        with self._lock:
+            self._remove_locked((kind, object_id))
+            self._top = {}
+
+    def _scan(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        start = bisect.bisect_left(self._terms, (prefix,))
+        matches: Dict[EntryKey, Dict[str, Any]] = {}
+        for term, kind, object_id in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            matches[(kind, object_id)] = self._entries[(kind, object_id)]
+        return heapq.nsmallest(limit, matches.values(), key=_rank)
+
+    def suggest(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Подсказки по префиксу, отсортированные по типу и популярности"""
+        prefix = _normalize(query)
+        if not prefix:
+            return []
+
+        with self._lock:
+            if len(prefix) > SHORT_PREFIX_LENGTH:
+                ranked = self._scan(prefix, limit)
+            else:
+                ranked = self._top.get(prefix)
+                if ranked is None:
+                    ranked = self._top[prefix] = self._scan(prefix, MAX_SUGGESTIONS)
+
+        return [
+            {key: entry[key] for key in ("type", "id", "text", "subtitle")}
+            for entry in ranked[:limit]
+        ]
+
+    # Подписка на изменения документов из CRUD (app.core.search)
+
+    def document_changed(self, kind: str, obj: Any):
+        if kind == "hero":
+            self.upsert(_hero_entry(obj))
+        elif kind == "guide":
+            if obj.is_published:
+                self.upsert(_guide_entry(obj))
+            else:
+                self.remove("guide", obj.id)
+        elif kind == "user":
+            self.upsert(_user_entry(obj))
+
+    def document_removed(self, kind: str, object_id: int):
+        if kind in KIND_ORDER:
+            self.remove(kind, object_id)
+
+    def refresh(self):
+        """Перестроить индекс в отдельной сессии"""
+        db = SessionLocal()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+
+    async def ensure_loaded(self):
+        """Загрузить индекс, если он еще не построен"""
+        if not self.loaded:
+            await run_in_threadpool(self.refresh)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.AUTOCOMPLETE_REFRESH_INTERVAL)
+            try:
+                await run_in_threadpool(self.refresh)
+            except Exception:
+                logger.exception("Autocomplete index refresh failed")
+
+    async def start(self):
+        """Загрузить индекс и запустить периодическую перестройку (startup)"""
+        try:
+            await run_in_threadpool(self.refresh)
+        except Exception:
+            # Индекс будет построен при первом запросе подсказок
+            logger.exception("Autocomplete index load failed")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую задачу (shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+autocomplete_index = AutocompleteIndex()
+add_document_listener(autocomplete_index)
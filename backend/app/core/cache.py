@@ -0,0 +1,261 @@
+"""
+Кэш ответов для читающих эндпоинтов.
+
+Ключ строится из пространства имен, версии пространства, имени эндпоинта и
+параметров запроса. Инвалидация — увеличение версии пространства имен
+(cache.invalidate("heroes")), поэтому она выполняется за O(1), а старые
+ключи просто истекают по TTL.
+"""
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.redis_client import get_redis, redis
+
+logger = logging.getLogger(__name__)
+
+class MemoryBackend:
+    """In-process LRU с TTL (для тестов и запуска без Redis)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            _, value = self._data.get(key, (None, b"0"))
+            value = str(int(value) + 1).encode()
+            self._data[key] = (None, value)
+            return int(value)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class RedisBackend:
+    """Обертка над клиентом Redis с тем же интерфейсом"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        self.client.set(key, value, ex=ttl)
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(key)
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+class ResponseCache:
+    """Кэш с версионируемыми пространствами имен"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _version_key(self, namespace: str) -> str:
+        return f"cache:{namespace}:version"
+
+    def version(self, namespace: str) -> int:
+        raw_version = self.backend.get(self._version_key(namespace))
+        return int(raw_version) if raw_version else 0
+
+    def build_key(self, namespace: str, name: str, params: Dict[str, Any]) -> str:
+        version = self.version(namespace)
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return f"cache:{namespace}:v{version}:{name}:{digest}"
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.backend.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: int):
+        self.backend.set(key, json.dumps(value).encode(), ttl)
+
+    def delete(self, key: str):
+        self.backend.delete(key)
+
+    def invalidate(self, *namespaces: str):
+        for namespace in namespaces:
+            self.backend.incr(self._version_key(namespace))
+
+_cache: Optional[ResponseCache] = None
+_memory_cache: Optional[ResponseCache] = None
+
+def get_cache() -> Optional[ResponseCache]:
+    """Текущий кэш: Redis, если доступен, иначе in-process"""
+    global _cache, _memory_cache
+
+    if settings.CACHE_BACKEND == "none":
+        return None
+
+    if settings.CACHE_BACKEND == "redis":
+        if _cache is None:
+            client = get_redis()
+            if client is not None:
+                _cache = ResponseCache(RedisBackend(client))
+        if _cache is not None:
+            return _cache
+
+    if _memory_cache is None:
+        _memory_cache = ResponseCache(MemoryBackend(settings.CACHE_MEMORY_MAX_ENTRIES))
+    return _memory_cache
+
+def is_shared() -> bool:
+    """Кэш общий для всех воркеров (Redis), а не in-process"""
+    cache = get_cache()
+    return cache is not None and isinstance(cache.backend, RedisBackend)
+
+def invalidate(*namespaces: str):
+    """Сбросить кэш пространств имен (вызывается из CRUD после commit)"""
+    cache = get_cache()
+    if cache is None:
+        return
+    try:
+        cache.invalidate(*namespaces)
+    except _cache_errors() as e:
+        logger.warning("Cache invalidation failed for %s: %s", namespaces, e)
+
+def namespace_version(namespace: str) -> Optional[int]:
+    """Текущая версия пространства имен (меняется при каждой записи) или None без кэша"""
+    cache = get_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.version(namespace)
+    except _cache_errors() as e:
+        logger.warning("Cache version lookup failed for %s: %s", namespace, e)
+        return None
+
+def get_value(key: str) -> Optional[Any]:
+    """Значение произвольного ключа (вне пространств имен) или None"""
+    cache = get_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.get(key)
+    except _cache_errors() as e:
+        logger.warning("Cache lookup failed for %s: %s", key, e)
+        return None
+
+def set_value(key: str, value: Any, ttl: int):
+    """Сохранить JSON-совместимое значение с TTL"""
+    cache = get_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(key, value, ttl)
+    except _cache_errors() as e:
+        logger.warning("Cache store failed for %s: %s", key, e)
+
+def delete_value(*keys: str):
+    """Удалить ключи"""
+    cache = get_cache()
+    if cache is None:
+        return
+    try:
+        for key in keys:
+            cache.delete(key)
+    except _cache_errors() as e:
+        logger.warning("Cache delete failed for %s: %s", keys, e)
+
+def _cache_errors() -> tuple:
+    return (redis.RedisError,) if redis is not None else ()
+
+def _lookup(namespace: str, name: str, params: Dict[str, Any]) -> Tuple[Optional[str], Optional[Any]]:
+    cache = get_cache()
+    if cache is None:
+        return None, None
+    try:
+        key = cache.build_key(namespace, name, params)
+        return key, cache.get(key)
+    except _cache_errors() as e:
+        logger.warning("Cache lookup failed: %s", e)
+        return None, None
+
+def _store(key: str, value: Any, ttl: int):
+    cache = get_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(key, value, ttl)
+    except _cache_errors() as e:
+        logger.warning("Cache store failed: %s", e)
+
+def cached(namespace: str, ttl: Optional[int] = None, response_model: Any = None) -> Callable:
+    """Кэшировать ответ async-эндпоинта по параметрам запроса.
+
+    Результат сериализуется через response_model (ORM-объекты допускаются),
+    поэтому в кэш попадает готовый JSON, а не объекты сессии.
+    """
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+    ttl = ttl or settings.CACHE_DEFAULT_TTL
+
+    def decorator(endpoint: Callable) -> Callable:
+        name = endpoint.__name__
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            params = {
+                key: value for key, value in kwargs.items()
+                if not isinstance(value, (Session, AsyncSession))
+            }
+            key, hit = await run_in_threadpool(_lookup, namespace, name, params)
+            if hit is not None:
+                return hit
+
+            result = await endpoint(*args, **kwargs)
+            if adapter is not None:
+                payload = adapter.dump_python(
+                    adapter.validate_python(result, from_attributes=True), mode="json"
+                )
+            else:
+                payload = jsonable_encoder(result)
+
+            if key is not None:
+                await run_in_threadpool(_store, key, payload, ttl)
+            return payload
+
+        return wrapper
+
+    return decorator
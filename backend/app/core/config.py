@@ -6,14 +6,57 @@ import os
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "postgresql://ml_user:ml_password@db:5432/ml_community"
+    # Асинхронный драйвер (asyncpg); если не задан, выводится из DATABASE_URL
+    ASYNC_DATABASE_URL: str = ""
+    DB_ASYNC: bool = False
+    
+    # Database pool (размеры на один воркер uvicorn)
+    DB_POOL_SIZE: int = Field(default=10, ge=1)
+    DB_MAX_OVERFLOW: int = Field(default=20, ge=0)
+    DB_POOL_TIMEOUT: float = Field(default=30.0, gt=0)
+    DB_POOL_RECYCLE: int = 1800  # секунд, -1 отключает пересоздание соединений
+    DB_POOL_PRE_PING: str = "idle"  # always | idle | never
+    DB_POOL_PRE_PING_IDLE_SECONDS: int = Field(default=60, ge=0)
+    DB_ISOLATED_MAX_THREADS: int = Field(default=8, ge=1)  # потоки для параллельных запросов в отдельных сессиях
     
     # Redis
     REDIS_URL: str = "redis://redis:6379"
     
+    # Cache
+    CACHE_BACKEND: str = "redis"  # redis | memory | none
+    CACHE_DEFAULT_TTL: int = Field(default=60, ge=1)
+    CACHE_MEMORY_MAX_ENTRIES: int = Field(default=10000, ge=1)
+    
+    # View counters (write-behind)
+    VIEW_COUNTER_FLUSH_INTERVAL: float = Field(default=10.0, gt=0)  # секунд
+    VIEW_COUNTER_MAX_LAG: int = Field(default=1000, ge=1)  # накопленных просмотров до досрочного сброса
+    
+    # Search
+    SEARCH_BACKEND: str = "auto"  # auto | postgres | memory (auto: по диалекту БД)
+    SEARCH_INDEX_REFRESH_INTERVAL: int = Field(default=300, ge=1)  # секунд, полная перестройка индекса в памяти
+    SEARCH_SOURCE_TIMEOUT: float = Field(default=1.0, gt=0)  # секунд на один источник в общем поиске
+    AUTOCOMPLETE_REFRESH_INTERVAL: float = Field(default=300.0, gt=0)  # секунд, перестройка индекса подсказок
+    MATCHUPS_REFRESH_INTERVAL: float = Field(default=30.0, gt=0)  # секунд, проверка версии матрицы контрпиков
+    STATS_CHECK_INTERVAL: float = Field(default=10.0, gt=0)  # секунд, проверка записей для пересчета сводок
+    STATS_REFRESH_INTERVAL: float = Field(default=300.0, gt=0)  # секунд, плановый пересчет сводок
+    LEADERBOARD_REFRESH_INTERVAL: float = Field(default=600.0, gt=0)  # секунд, пересчет рейтинга авторов
+    
     # Security
     SECRET_KEY: str = Field(default="your-secret-key-change-in-production", min_length=32)
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=30, ge=1, le=1440)
+    REFRESH_TOKEN_EXPIRE_DAYS: int = Field(default=14, ge=1)
+    AUTH_USER_CACHE_TTL: int = Field(default=60, ge=0)  # секунд, кэш пользователя по токену (только в Redis); 0 — выключен
+    AUTH_TOKEN_CLAIMS: bool = False  # id/роль/активность в JWT: проверки записи без запроса пользователя
+    PASSWORD_HASH_WORKERS: int = Field(default=2, ge=1)  # потоки bcrypt на воркер
+    PASSWORD_HASH_QUEUE: int = Field(default=32, ge=0)  # ожидающих проверок сверх потоков, дальше 429
+    # Лимиты эндпоинтов аутентификации, "N/секунд" (app.core.rate_limit)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_LOGIN_IP: str = "20/60"
+    RATE_LIMIT_LOGIN_USERNAME: str = "5/60"
+    RATE_LIMIT_REGISTER_IP: str = "5/3600"
+    RATE_LIMIT_FORGOT_PASSWORD_IP: str = "5/3600"
+    RATE_LIMIT_FORGOT_PASSWORD_EMAIL: str = "3/3600"
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8001", "http://127.0.0.1:3000", "http://127.0.0.1:8001"]
@@ -34,6 +77,38 @@ class Settings(BaseSettings):
             raise ValueError("SECRET_KEY must be at least 32 characters long")
         return v
     
+    @field_validator("DB_POOL_PRE_PING")
+    @classmethod
+    def validate_pre_ping(cls, v):
+        if v not in ("always", "idle", "never"):
+            raise ValueError("DB_POOL_PRE_PING must be always, idle or never")
+        return v
+    
+    @field_validator("CACHE_BACKEND")
+    @classmethod
+    def validate_cache_backend(cls, v):
+        if v not in ("redis", "memory", "none"):
+            raise ValueError("CACHE_BACKEND must be redis, memory or none")
+        return v
+    
+    @field_validator(
+        "RATE_LIMIT_LOGIN_IP", "RATE_LIMIT_LOGIN_USERNAME", "RATE_LIMIT_REGISTER_IP",
+        "RATE_LIMIT_FORGOT_PASSWORD_IP", "RATE_LIMIT_FORGOT_PASSWORD_EMAIL"
+    )
+    @classmethod
+    def validate_rate_limit(cls, v):
+        limit, _, window = v.partition("/")
+        if not (limit.isdigit() and window.isdigit() and int(limit) > 0 and int(window) > 0):
+            raise ValueError("Rate limit must look like N/seconds, e.g. 5/60")
+        return v
+    
+    @field_validator("SEARCH_BACKEND")
+    @classmethod
+    def validate_search_backend(cls, v):
+        if v not in ("auto", "postgres", "memory"):
+            raise ValueError("SEARCH_BACKEND must be auto, postgres or memory")
+        return v
+    
     # File Upload
     MAX_FILE_SIZE: int = 10485760  # 10MB
     UPLOAD_DIRECTORY: str = "/app/static/uploads"
@@ -1,26 +1,261 @@
-from sqlalchemy import create_engine
+import math
+import threading
+import time
+import anyio
+from typing import Any, Callable, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
 from app.core.config import settings
 
+class PoolStats:
+    """Счетчики ожидания соединений из пула"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / attempts * 1000, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3)
+            }
+
+class _TimedCheckoutMixin:
+    """Замер времени ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncPool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _engine_options(url: str, poolclass: type) -> dict:
+    """Параметры пула соединений из настроек"""
+    options = {
+        "echo": settings.DEBUG,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always",
+    }
+    # SQLite в памяти использует собственный однопоточный пул
+    if make_url(url).database in (None, "", ":memory:"):
+        return options
+
+    options.update(
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+def _ping_idle_connections(sync_engine):
+    """Pre-ping только для соединений, простаивавших дольше порога"""
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None:
+            return
+        if time.monotonic() - checked_in_at < settings.DB_POOL_PRE_PING_IDLE_SECONDS:
+            return
+
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception as e:
+            # Пул выбросит соединение и повторит checkout
+            raise exc.DisconnectionError() from e
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.DEBUG
+    **_engine_options(settings.DATABASE_URL, InstrumentedQueuePool)
 )
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def get_async_database_url() -> str:
+    """URL для асинхронного движка (asyncpg / aiosqlite)"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+
+    url = settings.DATABASE_URL
+    for sync_prefix, async_prefix in (
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+# Асинхронный движок создается только при DB_ASYNC, чтобы asyncpg
+# не был обязательной зависимостью для синхронного режима
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DB_ASYNC:
+    async_engine = create_async_engine(
+        get_async_database_url(),
+        **_engine_options(get_async_database_url(), InstrumentedAsyncPool)
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+def _register_sqlite_functions(sync_engine):
+    """ln/exp для SQLite, собранного без математических функций (app.core.trending)"""
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("ln", 1, math.log, deterministic=True)
+        dbapi_connection.create_function("exp", 1, math.exp, deterministic=True)
+
+if engine.dialect.name == "sqlite":
+    _register_sqlite_functions(engine)
+if async_engine is not None and async_engine.dialect.name == "sqlite":
+    _register_sqlite_functions(async_engine.sync_engine)
+
+if settings.DB_POOL_PRE_PING == "idle":
+    _ping_idle_connections(engine)
+    if async_engine is not None:
+        _ping_idle_connections(async_engine.sync_engine)
+
+def _describe_pool(pool: Pool) -> dict:
+    """Состояние пула: занятые, свободные и overflow-соединения"""
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__, "status": pool.status()}
+
+    stats: Optional[PoolStats] = getattr(pool, "stats", None)
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "wait": stats.snapshot() if stats else PoolStats().snapshot()
+    }
+
+def get_pool_status() -> dict:
+    """Метрики пулов соединений текущего воркера"""
+    status = {"sync": _describe_pool(engine.pool)}
+    if async_engine is not None:
+        status["async"] = _describe_pool(async_engine.sync_engine.pool)
+    return status
+
 # Create Base class
 class Base(DeclarativeBase):
     pass
 
+def dialect_insert(db: Session, table):
+    """INSERT с поддержкой ON CONFLICT для текущего диалекта (PostgreSQL / SQLite)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT is not supported for {dialect}")
+    return insert(table)
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Зависимость для роутеров: AsyncSession при DB_ASYNC, иначе обычная Session
+get_session = get_async_db if settings.DB_ASYNC else get_db
+
+async def run_db(db: Any, fn: Callable, *args, **kwargs) -> Any:
+    """Выполнить синхронную CRUD-функцию, не блокируя event loop.
+
+    Для AsyncSession запросы идут через драйвер asyncpg (run_sync),
+    для обычной Session функция выполняется в пуле потоков.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+_isolated_limiter: Optional[anyio.CapacityLimiter] = None
+
+def _get_isolated_limiter() -> anyio.CapacityLimiter:
+    # CapacityLimiter привязан к event loop, поэтому создается лениво
+    global _isolated_limiter
+    if _isolated_limiter is None:
+        _isolated_limiter = anyio.CapacityLimiter(settings.DB_ISOLATED_MAX_THREADS)
+    return _isolated_limiter
+
+async def run_in_new_session(fn: Callable, *args, **kwargs) -> Any:
+    """Выполнить CRUD-функцию в собственной сессии.
+
+    Нужна для параллельных запросов: одну Session нельзя использовать
+    из нескольких задач одновременно. Синхронные сессии работают в
+    отдельном ограниченном пуле потоков, чтобы не занимать общий.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(lambda sync_session: fn(sync_session, *args, **kwargs))
+
+    def call():
+        session = SessionLocal()
+        try:
+            return fn(session, *args, **kwargs)
+        finally:
+            session.close()
+
+    return await anyio.to_thread.run_sync(call, limiter=_get_isolated_limiter())
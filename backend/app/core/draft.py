@@ -0,0 +1,65 @@
+"""
+Подбор героя на текущем шаге драфта.
+
+Оценка считается векторно сразу для всех героев по снимку матриц
+app.core.matchups, поэтому один вызов занимает доли миллисекунды и его можно
+повторять на каждом пике и бане. Составляющие оценки (все в п.п. винрейта):
+
+- counter — среднее преимущество кандидата против уже выбранных врагов;
+- synergy — средний прирост винрейта в паре с уже выбранными союзниками;
+- role — бонус, если роль кандидата еще не закрыта союзниками;
+- meta — популярность героя в текущей мете (pick_rate и ban_rate).
+"""
+from typing import Any, Dict, List, Sequence
+import numpy as np
+
+# Веса составляющих итоговой оценки
+COUNTER_WEIGHT = 1.0
+SYNERGY_WEIGHT = 0.7
+ROLE_BONUS = 3.0
+PICK_RATE_WEIGHT = 0.1
+BAN_RATE_WEIGHT = 0.05
+
+def _mean_known(values: np.ndarray) -> np.ndarray:
+    """Среднее по строке без NaN (0 для строк без известных значений)"""
+    known = ~np.isnan(values)
+    count = known.sum(axis=1)
+    total = np.where(known, values, 0.0).sum(axis=1)
+    return np.divide(total, count, out=np.zeros(len(values), dtype=np.float64), where=count > 0)
+
+def recommend(
+    snapshot: Any,
+    allies: Sequence[int],
+    enemies: Sequence[int],
+    bans: Sequence[int] = (),
+    limit: int = 10
+) -> List[Dict[str, Any]]:
+    """Кандидаты на следующий пик, отсортированные по убыванию оценки"""
+    taken = snapshot.positions_of([*allies, *enemies, *bans])
+    allies = snapshot.positions_of(allies)
+    enemies = snapshot.positions_of(enemies)
+    size = len(snapshot.ids)
+
+    counter = _mean_known(snapshot.advantage[:, enemies]) if len(enemies) else np.zeros(size)
+    synergy = _mean_known(snapshot.synergy[:, allies]) if len(allies) else np.zeros(size)
+    covered = np.isin(snapshot.roles, snapshot.roles[allies])
+    role = np.where(covered, 0.0, ROLE_BONUS)
+    meta = PICK_RATE_WEIGHT * snapshot.pick_rates + BAN_RATE_WEIGHT * snapshot.ban_rates
+    score = COUNTER_WEIGHT * counter + SYNERGY_WEIGHT * synergy + role + meta
+
+    available = np.ones(size, dtype=bool)
+    available[taken] = False
+    positions = np.flatnonzero(available)
+    top = positions[np.lexsort((positions, -score[positions]))[:limit]]
+
+    return [
+        {
+            **snapshot.card(position),
+            "score": round(float(score[position]), 2),
+            "counter": round(float(counter[position]), 2),
+            "synergy": round(float(synergy[position]), 2),
+            "role_bonus": float(role[position]),
+            "meta": round(float(meta[position]), 2)
+        }
+        for position in top
+    ]
@@ -0,0 +1,99 @@
+"""
+Отдельный ограниченный пул потоков для bcrypt.
+
+Хеширование и проверка пароля занимают 100-300 мс CPU. Внутри CRUD-функции
+они выполнялись бы в общем пуле потоков или, при DB_ASYNC, прямо в потоке
+event loop (AsyncSession.run_sync) и останавливали бы все остальные запросы
+воркера. Здесь они выполняются в PASSWORD_HASH_WORKERS потоках (bcrypt
+отпускает GIL). Если занятых и ожидающих задач больше, чем
+PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE, запрос сразу получает 429:
+волна логинов ждет в очереди ограниченной длины, а не вытесняет чтение.
+Счетчики очереди отдаются в /api/metrics.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from fastapi import HTTPException, status
+from app.core.config import settings
+
+class HashingPool:
+    """Пул потоков bcrypt с ограниченной очередью"""
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0  # выполняются и ждут в очереди
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix="bcrypt"
+                )
+            return self._executor
+
+    def _call(self, submitted_at: float, fn: Callable, *args) -> Any:
+        wait = time.perf_counter() - submitted_at
+        with self._lock:
+            self.running += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Выполнить fn в пуле; 429, если очередь заполнена"""
+        limit = settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE
+        with self._lock:
+            if self.pending >= limit:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many authentication requests, try again later",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), self._call, time.perf_counter(), fn, *args
+            )
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def snapshot(self) -> dict:
+        """Метрики очереди для /api/metrics"""
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "workers": settings.PASSWORD_HASH_WORKERS,
+                "max_queue": settings.PASSWORD_HASH_QUEUE,
+                "running": self.running,
+                "queued": self.pending - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / started * 1000, 3) if started else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3)
+            }
+
+    def shutdown(self):
+        """Остановить потоки (shutdown)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+hashing_pool = HashingPool()
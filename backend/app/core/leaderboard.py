@@ -0,0 +1,71 @@
+"""
+Рейтинг авторов гайдов.
+
+Оценка автора (app.crud.guide.recompute_leaderboard) складывается из
+просмотров, лайков и оценок его опубликованных гайдов с затуханием по
+возрасту гайда. Пересчет — один проход по таблице гайдов раз в
+LEADERBOARD_REFRESH_INTERVAL секунд; результат хранится в author_leaderboard
+с уникальным индексом по месту, поэтому страница рейтинга и место
+конкретного автора читаются по индексу за O(log n) без сортировки.
+
+Время последнего расчета хранится в самой таблице: если снимок уже
+пересчитан другим воркером, фоновая задача пропускает пересчет.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.crud import guide as guide_crud
+
+logger = logging.getLogger(__name__)
+
+class Leaderboard:
+    """Периодический пересчет рейтинга авторов"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def refresh(self, force: bool = False) -> bool:
+        """Пересчитать рейтинг, если снимок старше интервала; True, если пересчитан"""
+        db = SessionLocal()
+        try:
+            if not force:
+                computed_at = guide_crud.get_leaderboard_computed_at(db)
+                if computed_at is not None:
+                    if computed_at.tzinfo is None:
+                        computed_at = computed_at.replace(tzinfo=timezone.utc)
+                    age = (datetime.now(timezone.utc) - computed_at).total_seconds()
+                    if age < settings.LEADERBOARD_REFRESH_INTERVAL:
+                        return False
+            authors = guide_crud.recompute_leaderboard(db)
+        finally:
+            db.close()
+        logger.info("Leaderboard recomputed: %d authors", authors)
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await run_in_threadpool(self.refresh)
+            except Exception:
+                logger.exception("Leaderboard refresh failed")
+            await asyncio.sleep(settings.LEADERBOARD_REFRESH_INTERVAL)
+
+    async def start(self):
+        """Запустить фоновый пересчет (startup)"""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую задачу (shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+leaderboard = Leaderboard()
@@ -0,0 +1,300 @@
+"""
+Матрица контрпиков и союзников в памяти процесса.
+
+Таблицы hero_counters и hero_synergies для ~120 героев умещаются в несколько
+сотен КБ, поэтому они целиком загружаются в массивы NumPy, индексированные
+id героев: [hero_id, other_id] -> тип связи и винрейт. Эндпоинты контрпиков,
+союзников и подбора контрпиков против набора врагов отвечают из памяти без
+обращения к БД.
+
+Матрицы индексируются плотной позицией героя (_Snapshot.positions), а не его
+id: пропуски в последовательности id не увеличивают их размер.
+
+Матрица загружается при старте и перестраивается лениво после записи
+(invalidate()). Версия хранится в Redis (matchups:version): фоновая задача
+раз в MATCHUPS_REFRESH_INTERVAL секунд сверяет ее и подхватывает изменения,
+сделанные другими воркерами или скриптами импорта. Без Redis версией служит
+отпечаток таблиц в БД (число строк, max(id), max(updated_at), суммы винрейтов).
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_client import get_redis, redis
+from app.models import Hero, HeroCounter, HeroSynergy
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "matchups:version"
+
+# Код отсутствующей связи в матрице типов
+NO_RELATION = -1
+
+Matchup = Tuple[Dict[str, Any], Optional[str], Optional[float]]
+
+def hero_card(hero: Any) -> Dict[str, Any]:
+    """Карточка героя в ответах контрпиков и драфта"""
+    return {
+        "id": hero.id,
+        "name": hero.name,
+        "role": hero.role,
+        "specialty": hero.specialty,
+        "avatar_url": hero.avatar_url
+    }
+
+class _Relation:
+    """Матрицы одной таблицы связей: код типа и винрейт"""
+
+    def __init__(self, size: int, rows: Sequence[Tuple[int, int, Optional[str], Optional[float]]]):
+        self.type_names: List[Optional[str]] = sorted({row[2] for row in rows}, key=lambda name: name or "")
+        codes = {name: code for code, name in enumerate(self.type_names)}
+
+        self.types = np.full((size, size), NO_RELATION, dtype=np.int8)
+        self.win_rates = np.full((size, size), np.nan, dtype=np.float64)
+        for hero_id, other_id, relation_type, win_rate in rows:
+            self.types[hero_id, other_id] = codes[relation_type]
+            if win_rate is not None:
+                self.win_rates[hero_id, other_id] = win_rate
+
+    def row(self, position: int) -> List[Tuple[int, Optional[str], Optional[float]]]:
+        others = np.flatnonzero(self.types[position] != NO_RELATION)
+        win_rates = self.win_rates[position, others]
+        return [
+            (int(other), self.type_names[self.types[position, other]], None if np.isnan(win_rate) else float(win_rate))
+            for other, win_rate in zip(others, win_rates)
+        ]
+
+class _Snapshot:
+    """Неизменяемый снимок матриц; заменяется целиком при перестройке"""
+
+    def __init__(self, heroes: List[Any], counters: list, synergies: list):
+        heroes = sorted(heroes, key=lambda hero: hero.id)
+        size = len(heroes)
+        self.heroes: Dict[int, Dict[str, Any]] = {hero.id: hero_card(hero) for hero in heroes}
+        # Позиция в матрицах -> id героя и обратно
+        self.ids = np.array([hero.id for hero in heroes], dtype=np.int64)
+        self.positions: Dict[int, int] = {hero.id: position for position, hero in enumerate(heroes)}
+
+        # Мета-показатели и роли для подбора в драфте (app.core.draft)
+        self.role_names: List[str] = sorted({hero.role for hero in heroes})
+        role_codes = {role: code for code, role in enumerate(self.role_names)}
+        self.roles = np.full(size, -1, dtype=np.int16)
+        self.pick_rates = np.zeros(size, dtype=np.float64)
+        self.ban_rates = np.zeros(size, dtype=np.float64)
+        for position, hero in enumerate(heroes):
+            self.roles[position] = role_codes[hero.role]
+            self.pick_rates[position] = hero.pick_rate or 0.0
+            self.ban_rates[position] = hero.ban_rate or 0.0
+
+        # Связи с удаленными героями (без FK ON DELETE) пропускаются
+        def valid(rows):
+            return [
+                (self.positions[hero_id], self.positions[other_id], relation_type, win_rate)
+                for hero_id, other_id, relation_type, win_rate in rows
+                if hero_id in self.positions and other_id in self.positions
+            ]
+
+        self.counters = _Relation(size, valid(counters))
+        self.synergies = _Relation(size, valid(synergies))
+
+        # advantage[a, b] — на сколько п.п. винрейт a против b выше 50%.
+        # win_rate пары (hero, counter_hero) — винрейт hero против counter_hero;
+        # для обратной пары без собственной записи берется зеркальное значение.
+        direct = self.counters.win_rates - 50.0
+        self.advantage = np.where(np.isnan(direct), -direct.T, direct)
+        # synergy[a, b] — то же для пары союзников; связь симметрична
+        paired = self.synergies.win_rates - 50.0
+        self.synergy = np.where(np.isnan(paired), paired.T, paired)
+
+    def positions_of(self, hero_ids: Iterable[int]) -> np.ndarray:
+        """Отсортированные позиции известных героев из hero_ids"""
+        return np.array(
+            sorted({self.positions[hero_id] for hero_id in hero_ids if hero_id in self.positions}),
+            dtype=np.intp
+        )
+
+    def card(self, position: int) -> Dict[str, Any]:
+        """Карточка героя по позиции в матрицах"""
+        return self.heroes[int(self.ids[position])]
+
+class MatchupMatrix:
+    """Матрицы контрпиков и союзников с версионированной перезагрузкой"""
+
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        self._version: Optional[int] = None
+        self._stale = True
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def load(self, db: Session):
+        """Перестроить матрицы из БД"""
+        heroes = db.query(
+            Hero.id, Hero.name, Hero.role, Hero.specialty, Hero.avatar_url, Hero.pick_rate, Hero.ban_rate
+        ).all()
+        counters = db.query(
+            HeroCounter.hero_id, HeroCounter.counter_hero_id, HeroCounter.counter_type, HeroCounter.win_rate
+        ).all()
+        synergies = db.query(
+            HeroSynergy.hero_id, HeroSynergy.synergy_hero_id, HeroSynergy.synergy_type, HeroSynergy.win_rate
+        ).all()
+        self._snapshot = _Snapshot(heroes, counters, synergies)
+
+    def _db_version(self) -> Tuple[Any, ...]:
+        """Отпечаток таблиц героев и связей; меняется при любой их записи"""
+        db = SessionLocal()
+        try:
+            aggregates = [
+                func.count(Hero.id), func.max(Hero.id), func.max(Hero.updated_at),
+                func.sum(Hero.pick_rate), func.sum(Hero.ban_rate),
+                func.count(HeroCounter.id), func.max(HeroCounter.id), func.sum(HeroCounter.win_rate),
+                func.count(HeroSynergy.id), func.max(HeroSynergy.id), func.sum(HeroSynergy.win_rate),
+            ]
+            return tuple(db.execute(select(*(select(value).scalar_subquery() for value in aggregates))).one())
+        finally:
+            db.close()
+
+    def _remote_version(self) -> Any:
+        client = get_redis()
+        if client is None:
+            return self._db_version()
+        try:
+            raw = client.get(VERSION_KEY)
+        except redis.RedisError as e:
+            logger.warning("Matchup version check failed: %s", e)
+            return self._db_version()
+        return int(raw) if raw else 0
+
+    def _reload_locked(self):
+        # Версия читается до загрузки: запись, пришедшая во время
+        # загрузки, вызовет еще одну перестройку, а не потеряется
+        version = self._remote_version()
+        self._stale = False
+        db = SessionLocal()
+        try:
+            self.load(db)
+        except Exception:
+            self._stale = True
+            raise
+        finally:
+            db.close()
+        self._version = version
+
+    def refresh(self):
+        """Перестроить матрицы в отдельной сессии"""
+        with self._lock:
+            self._reload_locked()
+
+    def _refresh_if_stale(self):
+        with self._lock:
+            # Параллельные запросы ждут одну перестройку, а не запускают свои
+            if self._stale or self._snapshot is None:
+                self._reload_locked()
+
+    def mark_stale(self):
+        """Перестроить матрицы этого воркера при следующем запросе"""
+        self._stale = True
+
+    def invalidate(self):
+        """Отметить матрицы устаревшими (вызывается после записи героев и связей)"""
+        self._stale = True
+        client = get_redis()
+        if client is not None:
+            try:
+                client.incr(VERSION_KEY)
+            except redis.RedisError as e:
+                logger.warning("Matchup version bump failed: %s", e)
+
+    async def ensure_fresh(self):
+        """Перестроить матрицы, если они не загружены или устарели"""
+        if self._stale or self._snapshot is None:
+            await run_in_threadpool(self._refresh_if_stale)
+
+    # Запросы (после ensure_fresh)
+
+    @property
+    def snapshot(self) -> _Snapshot:
+        """Текущий снимок матриц"""
+        return self._snapshot
+
+    def _matchups(self, relation: str, hero_id: int) -> Optional[List[Matchup]]:
+        snapshot = self._snapshot
+        position = snapshot.positions.get(hero_id)
+        if position is None:
+            return None
+        return [
+            (snapshot.card(other), relation_type, win_rate)
+            for other, relation_type, win_rate in getattr(snapshot, relation).row(position)
+        ]
+
+    def counters(self, hero_id: int) -> Optional[List[Matchup]]:
+        """Контрпики героя или None, если героя нет в снимке"""
+        return self._matchups("counters", hero_id)
+
+    def synergies(self, hero_id: int) -> Optional[List[Matchup]]:
+        """Союзники героя или None, если героя нет в снимке"""
+        return self._matchups("synergies", hero_id)
+
+    def best_counters(self, enemy_ids: Sequence[int], limit: int = 10) -> List[Tuple[Dict[str, Any], float, int]]:
+        """Герои с наибольшим суммарным преимуществом против набора врагов.
+
+        Возвращает (карточка героя, преимущество в п.п. винрейта, число
+        врагов с известной статистикой); учитываются только герои, у которых
+        известна хотя бы одна пара с врагами.
+        """
+        snapshot = self._snapshot
+        enemies = snapshot.positions_of(enemy_ids)
+        if not len(enemies):
+            return []
+
+        advantage = snapshot.advantage[:, enemies]
+        known = ~np.isnan(advantage)
+        scores = np.where(known, advantage, 0.0).sum(axis=1)
+        coverage = known.sum(axis=1)
+
+        candidates = coverage > 0
+        candidates[enemies] = False
+        positions = np.flatnonzero(candidates)
+        # Позиции упорядочены по id, поэтому ничьи разрешаются по id героя
+        order = np.lexsort((positions, -coverage[positions], -scores[positions]))[:limit]
+        return [
+            (snapshot.card(position), round(float(scores[position]), 2), int(coverage[position]))
+            for position in positions[order]
+        ]
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.MATCHUPS_REFRESH_INTERVAL)
+            try:
+                version = await run_in_threadpool(self._remote_version)
+                if self._stale or version != self._version:
+                    await run_in_threadpool(self.refresh)
+            except Exception:
+                logger.exception("Matchup matrix refresh failed")
+
+    async def start(self):
+        """Загрузить матрицы и запустить проверку версии (startup)"""
+        try:
+            await run_in_threadpool(self.refresh)
+        except Exception:
+            # Матрицы будут загружены при первом запросе
+            logger.exception("Matchup matrix load failed")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую задачу (shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+matchup_matrix = MatchupMatrix()
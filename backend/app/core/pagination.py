@@ -0,0 +1,100 @@
+"""
+Keyset-пагинация (курсоры) для списочных эндпоинтов.
+
+Курсор — непрозрачная base64-строка со значениями ключа сортировки и id
+последней строки страницы. Следующая страница выбирается условием
+(key, ..., id) < (:key, ..., :id) по составному индексу, поэтому ее стоимость
+не зависит от глубины, а новые записи не сдвигают уже выданные страницы.
+Следующий курсор возвращается в заголовке X-Next-Cursor.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+def _bind_value(value: Any, dialect: str) -> Any:
+    # SQLite хранит server_default CURRENT_TIMESTAMP как текст без долей секунды,
+    # а SQLAlchemy передает datetime с ".000000" — строки сравнивались бы неверно
+    if dialect == "sqlite" and isinstance(value, datetime) and not value.microsecond:
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+class KeysetOrder:
+    """Сортировка (ключи..., id) с одинаковым направлением для всех колонок"""
+
+    def __init__(self, name: str, *columns, descending: bool = True):
+        self.name = name
+        self.columns = columns
+        self.descending = descending
+
+    def _values(self, item: Any) -> List[Any]:
+        # Элементы — ORM-объекты или уже сериализованные словари (кэш ответов)
+        if isinstance(item, dict):
+            return [item[column.key] for column in self.columns]
+        return [getattr(item, column.key) for column in self.columns]
+
+    def encode(self, item: Any) -> str:
+        """Курсор, указывающий на позицию сразу после item"""
+        payload = {"k": self.name, "v": [_encode_value(value) for value in self._values(item)]}
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode(self, cursor: str) -> List[Any]:
+        """Значения ключа из курсора; 400 при чужом или поврежденном курсоре"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            values = [_decode_value(value) for value in payload["v"]]
+            valid = payload["k"] == self.name and len(values) == len(self.columns)
+        except (ValueError, KeyError, TypeError):
+            valid = False
+        if not valid or any(value is None for value in values):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        return values
+
+    def apply(self, query: Query, cursor: Optional[str] = None) -> Query:
+        """Добавить сортировку и, если есть курсор, условие продолжения"""
+        if cursor:
+            dialect = query.session.get_bind().dialect.name
+            position = tuple_(*self.columns)
+            values = tuple_(*(_bind_value(value, dialect) for value in self.decode(cursor)))
+            query = query.filter(position < values if self.descending else position > values)
+        order = [column.desc() if self.descending else column.asc() for column in self.columns]
+        return query.order_by(*order)
+
+    def next_cursor(self, items: Sequence[Any], limit: int) -> Optional[str]:
+        """Курсор следующей страницы или None, если страница последняя"""
+        if len(items) < limit or not items:
+            return None
+        return self.encode(items[-1])
+
+def paginate(query: Query, order: KeysetOrder, skip: int, limit: int, cursor: Optional[str] = None) -> Query:
+    """Курсор, если передан, иначе прежний offset"""
+    query = order.apply(query, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def set_next_cursor(response: Response, order: KeysetOrder, items: Sequence[Any], limit: int):
+    """Записать курсор следующей страницы в заголовок ответа"""
+    cursor = order.next_cursor(items, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -0,0 +1,56 @@
+"""
+Перехват SQL-запросов движка для проверок производительности.
+
+capture_queries() собирает все выполненные statement вместе с параметрами;
+используется в scripts/check_query_plans.py, чтобы прогнать реальные
+CRUD-запросы через EXPLAIN. assert_num_queries() фиксирует точное число
+запросов эндпоинта или CRUD-функции и ловит N+1 от ленивых загрузок
+(scripts/check_query_counts.py).
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, Union
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core import database
+
+@dataclass
+class CapturedQuery:
+    statement: str
+    parameters: Any
+
+    @property
+    def is_select(self) -> bool:
+        return self.statement.lstrip().upper().startswith(("SELECT", "WITH"))
+
+@contextmanager
+def capture_queries(bind: Optional[Union[Engine, AsyncEngine]] = None) -> Iterator[List[CapturedQuery]]:
+    """Собрать запросы, выполненные движком внутри блока with"""
+    queries: List[CapturedQuery] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(CapturedQuery(statement, parameters))
+
+    # События вешаются на синхронный движок; по умолчанию слушаем оба движка приложения
+    binds = [bind] if bind is not None else [database.engine, database.async_engine]
+    engines = [
+        item.sync_engine if isinstance(item, AsyncEngine) else item
+        for item in binds if item is not None
+    ]
+    for item in engines:
+        event.listen(item, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        for item in engines:
+            event.remove(item, "before_cursor_execute", _before_cursor_execute)
+
+@contextmanager
+def assert_num_queries(expected: int, bind: Optional[Union[Engine, AsyncEngine]] = None) -> Iterator[List[CapturedQuery]]:
+    """Проверить, что внутри блока выполнено ровно expected запросов"""
+    with capture_queries(bind) as queries:
+        yield queries
+    if len(queries) != expected:
+        statements = "\n".join(f"  {query.statement}" for query in queries)
+        raise AssertionError(f"Expected {expected} queries, got {len(queries)}:\n{statements}")
@@ -0,0 +1,133 @@
+"""
+Ограничение частоты запросов к эндпоинтам аутентификации.
+
+Счетчик — скользящее окно по двум фиксированным интервалам: число запросов
+оценивается как current + previous * (доля окна, еще не прошедшая с начала
+текущего интервала). Это O(1) памяти на ключ без хранения отметок времени
+каждого запроса. Счетчики хранятся в Redis (INCR + EXPIRE в одном pipeline,
+общие для всех воркеров), без Redis — в памяти процесса.
+
+Лимиты задаются в настройках строкой "N/секунд" отдельно для каждого
+маршрута и ключа (IP клиента, логин или email) и проверяются зависимостью
+rate_limit(...) до тела эндпоинта, то есть до проверки пароля.
+"""
+import logging
+import math
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.redis_client import get_redis, redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit"
+MAX_IDENTITY_LENGTH = 100
+
+Identity = Callable[[Request], Awaitable[Optional[str]]]
+
+def parse_rate(value: str) -> Tuple[int, int]:
+    """'N/секунд' -> (N, секунд)"""
+    limit, window = value.split("/", 1)
+    return int(limit), int(window)
+
+class _MemoryCounters:
+    """Счетчики интервалов в памяти процесса"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[int, int, int]] = {}  # ключ -> (интервал, текущий, предыдущий)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, bucket: int) -> Tuple[int, int]:
+        with self._lock:
+            last_bucket, current, previous = self._data.get(key, (bucket, 0, 0))
+            if last_bucket != bucket:
+                previous = current if last_bucket == bucket - 1 else 0
+                current = 0
+            current += 1
+            self._data[key] = (bucket, current, previous)
+            if len(self._data) > 100000:
+                # Ключи, не обновлявшиеся два интервала, больше не влияют на лимит
+                self._data = {k: v for k, v in self._data.items() if v[0] >= bucket - 1}
+            return current, previous
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+_memory = _MemoryCounters()
+
+def _hit(key: str, bucket: int, window: int) -> Tuple[int, int]:
+    """Учесть запрос; вернуть счетчики текущего и предыдущего интервалов"""
+    client = get_redis()
+    if client is not None:
+        current_key = f"{key}:{bucket}"
+        try:
+            pipe = client.pipeline()
+            pipe.incr(current_key)
+            pipe.expire(current_key, window * 2)
+            pipe.get(f"{key}:{bucket - 1}")
+            current, _, previous = pipe.execute()
+            return int(current), int(previous or 0)
+        except redis.RedisError as e:
+            logger.warning("Rate limit counter failed: %s", e)
+    return _memory.hit(key, bucket)
+
+def check(key: str, rate: str) -> Optional[int]:
+    """Учесть запрос по ключу; None, если лимит не превышен, иначе секунды до повтора"""
+    limit, window = parse_rate(rate)
+    now = time.time()
+    bucket = int(now // window)
+    elapsed = now / window - bucket
+    current, previous = _hit(f"{KEY_PREFIX}:{key}", bucket, window)
+    if current + previous * (1 - elapsed) <= limit:
+        return None
+    return max(1, math.ceil((1 - elapsed) * window))
+
+def client_ip(request: Request) -> Optional[str]:
+    """IP клиента (с учетом --proxy-headers uvicorn)"""
+    return request.client.host if request.client else None
+
+def form_field(name: str) -> Identity:
+    """Ключ из поля формы (логин в OAuth2PasswordRequestForm)"""
+    async def identity(request: Request) -> Optional[str]:
+        value = (await request.form()).get(name)
+        return value if isinstance(value, str) else None
+    return identity
+
+def query_param(name: str) -> Identity:
+    """Ключ из параметра запроса"""
+    async def identity(request: Request) -> Optional[str]:
+        return request.query_params.get(name)
+    return identity
+
+def rate_limit(scope: str, ip_rate: Optional[str] = None, identity_rate: Optional[str] = None,
+               identity: Optional[Identity] = None) -> Callable:
+    """Зависимость маршрута: 429, если превышен лимит по IP или по identity.
+
+    ip_rate и identity_rate — имена настроек со строкой "N/секунд".
+    """
+    async def dependency(request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        keys = []
+        ip = client_ip(request)
+        if ip_rate and ip:
+            keys.append((f"{scope}:ip:{ip}", getattr(settings, ip_rate)))
+        if identity_rate and identity is not None:
+            value = await identity(request)
+            if value:
+                keys.append((f"{scope}:id:{value.strip().lower()[:MAX_IDENTITY_LENGTH]}", getattr(settings, identity_rate)))
+
+        for key, rate in keys:
+            retry_after = await run_in_threadpool(check, key, rate)
+            if retry_after is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests, try again later",
+                    headers={"Retry-After": str(retry_after)},
+                )
+
+    return dependency
@@ -0,0 +1,59 @@
+"""
+Общее подключение к Redis.
+
+Все подсистемы (кэш, счетчики, лимиты) получают клиент через get_redis().
+Если Redis недоступен, возвращается None и подсистема переключается на
+in-process реализацию; повторная попытка подключения — не чаще RETRY_INTERVAL.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+from app.core.config import settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis входит в requirements.txt
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+RETRY_INTERVAL = 30.0
+
+_client = None
+_last_attempt = 0.0
+_lock = threading.Lock()
+
+def get_redis() -> Optional["redis.Redis"]:
+    """Получить клиент Redis или None, если он недоступен"""
+    global _client, _last_attempt
+
+    if _client is not None or redis is None or not settings.REDIS_URL:
+        return _client
+
+    with _lock:
+        if _client is not None or time.monotonic() - _last_attempt < RETRY_INTERVAL:
+            return _client
+        _last_attempt = time.monotonic()
+
+        client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=1,
+            health_check_interval=30
+        )
+        try:
+            client.ping()
+        except redis.RedisError as e:
+            logger.warning("Redis is unavailable (%s), using in-process fallback", e)
+            return None
+
+        _client = client
+        return _client
+
+def reset_redis():
+    """Сбросить клиент (после ошибки соединения или в тестах)"""
+    global _client, _last_attempt
+    with _lock:
+        _client = None
+        _last_attempt = 0.0
@@ -0,0 +1,241 @@
+"""
+Полнотекстовый поиск по героям, гайдам, новостям и пользователям.
+
+Бэкенд добавляет в ORM-запрос условие совпадения и сортировку по
+релевантности, поэтому CRUD-функции могут дополнять его своими фильтрами:
+
+- PostgresSearchBackend: сгенерированные колонки search_vector (tsvector + GIN,
+  миграция 004) и триграммы pg_trgm как запасной вариант для опечаток
+  и коротких фрагментов;
+- MemorySearchBackend: инвертированный индекс в памяти процесса для SQLite
+  и тестов, обновляется из CRUD при записи.
+"""
+import bisect
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import case, func, literal_column, or_
+from sqlalchemy.orm import Query, Session
+from app.core.config import settings
+from app.models import BuildGuide, Hero, News, User
+
+# Поля документа для каждого типа; первое поле — основное для триграмм
+SEARCH_FIELDS: Dict[str, Tuple[Any, Tuple[str, ...]]] = {
+    "hero": (Hero, ("name", "specialty", "role")),
+    "guide": (BuildGuide, ("title", "description")),
+    "news": (News, ("title", "summary", "content")),
+    "user": (User, ("username", "ign")),
+}
+
+# Типы, для которых в PostgreSQL есть колонка search_vector
+FULLTEXT_KINDS = {"hero", "guide", "news"}
+
+# Верхняя граница кандидатов из индекса в памяти (размер IN-списка)
+MAX_CANDIDATES = 5000
+
+# Та же конфигурация, что в выражениях search_vector (миграция 004)
+TS_CONFIG = literal_column("'simple'::regconfig")
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Разбить текст на нормализованные токены"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+class PostgresSearchBackend:
+    """tsvector + GIN с триграммным fallback"""
+
+    def apply(self, db: Session, kind: str, query: Query, text: str) -> Query:
+        model, fields = SEARCH_FIELDS[kind]
+        tokens = tokenize(text)
+        if not tokens:
+            return query.filter(False)
+
+        primary = getattr(model, fields[0])
+        if kind not in FULLTEXT_KINDS:
+            # Пользователи: подстрока по username/ign через триграммный GIN-индекс
+            pattern = f"%{_escape_like(text)}%"
+            return query.filter(or_(
+                *(getattr(model, field).ilike(pattern, escape="\\") for field in fields)
+            )).order_by(func.similarity(primary, text).desc())
+
+        vector = literal_column(f"{model.__table__.name}.search_vector")
+        # Префиксный поиск по каждому слову: "lay bui" -> lay:* & bui:*
+        tsquery = func.to_tsquery(TS_CONFIG, " & ".join(f"{token}:*" for token in tokens))
+        return query.filter(or_(
+            vector.op("@@")(tsquery),
+            primary.op("%")(text)
+        )).order_by((func.ts_rank(vector, tsquery) + func.similarity(primary, text)).desc())
+
+    def document_changed(self, kind: str, obj: Any):
+        # search_vector — сгенерированная колонка, PostgreSQL обновляет ее сам
+        pass
+
+    def document_removed(self, kind: str, object_id: int):
+        pass
+
+class _InvertedIndex:
+    """Токен -> {id: число вхождений} с отсортированным словарем для префиксов"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.terms: List[str] = []
+        self.documents: Dict[int, Counter] = {}
+        self.built_at = time.monotonic()
+
+    def add(self, object_id: int, text: str):
+        self.remove(object_id)
+        counts = Counter(tokenize(text))
+        self.documents[object_id] = counts
+        for term, n in counts.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                bisect.insort(self.terms, term)
+            self.postings[term][object_id] = n
+
+    def remove(self, object_id: int):
+        counts = self.documents.pop(object_id, None)
+        if not counts:
+            return
+        for term in counts:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(object_id, None)
+            if not postings:
+                del self.postings[term]
+                self.terms.pop(bisect.bisect_left(self.terms, term))
+
+    def match_prefix(self, prefix: str) -> Dict[int, int]:
+        """Документы, содержащие слово с данным префиксом, и вес совпадения"""
+        matches: Dict[int, int] = {}
+        start = bisect.bisect_left(self.terms, prefix)
+        for term in self.terms[start:]:
+            if not term.startswith(prefix):
+                break
+            # Точное совпадение слова весит больше префиксного
+            weight = 2 if term == prefix else 1
+            for object_id, n in self.postings[term].items():
+                matches[object_id] = matches.get(object_id, 0) + n * weight
+        return matches
+
+    def search(self, tokens: List[str]) -> List[int]:
+        scores: Optional[Dict[int, int]] = None
+        for token in tokens:
+            matches = self.match_prefix(token)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    object_id: score + matches[object_id]
+                    for object_id, score in scores.items() if object_id in matches
+                }
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [object_id for object_id, _ in ranked[:MAX_CANDIDATES]]
+
+class MemorySearchBackend:
+    """Инвертированный индекс в памяти (SQLite и тесты)"""
+
+    def __init__(self):
+        self._indexes: Dict[str, _InvertedIndex] = {}
+        self._lock = threading.Lock()
+
+    def _document_text(self, kind: str, obj: Any) -> str:
+        _, fields = SEARCH_FIELDS[kind]
+        return " ".join(str(getattr(obj, field) or "") for field in fields)
+
+    def _get_index(self, db: Session, kind: str) -> _InvertedIndex:
+        index = self._indexes.get(kind)
+        if index is not None and time.monotonic() - index.built_at < settings.SEARCH_INDEX_REFRESH_INTERVAL:
+            return index
+
+        model, fields = SEARCH_FIELDS[kind]
+        rows = db.query(model.id, *(getattr(model, field) for field in fields)).all()
+        index = _InvertedIndex()
+        for row in rows:
+            index.add(row[0], " ".join(str(value or "") for value in row[1:]))
+        with self._lock:
+            self._indexes[kind] = index
+        return index
+
+    def apply(self, db: Session, kind: str, query: Query, text: str) -> Query:
+        model, _ = SEARCH_FIELDS[kind]
+        tokens = tokenize(text)
+        if not tokens:
+            return query.filter(False)
+
+        index = self._get_index(db, kind)
+        # document_changed меняет словарь и postings из других потоков
+        with self._lock:
+            ids = index.search(tokens)
+        if not ids:
+            return query.filter(False)
+        ranking = case({object_id: position for position, object_id in enumerate(ids)}, value=model.id)
+        return query.filter(model.id.in_(ids)).order_by(ranking)
+
+    def document_changed(self, kind: str, obj: Any):
+        with self._lock:
+            index = self._indexes.get(kind)
+            if index is not None:
+                index.add(obj.id, self._document_text(kind, obj))
+
+    def document_removed(self, kind: str, object_id: int):
+        with self._lock:
+            index = self._indexes.get(kind)
+            if index is not None:
+                index.remove(object_id)
+
+_postgres_backend = PostgresSearchBackend()
+_memory_backend = MemorySearchBackend()
+
+# Другие индексы, которым нужны изменения документов (автодополнение)
+_listeners: List[Any] = []
+
+def add_document_listener(listener: Any):
+    """Подписать объект с методами document_changed/document_removed"""
+    _listeners.append(listener)
+
+def get_search_backend(db: Session):
+    """Бэкенд поиска для диалекта текущей сессии"""
+    if settings.SEARCH_BACKEND == "memory":
+        return _memory_backend
+    if settings.SEARCH_BACKEND == "postgres" or db.get_bind().dialect.name == "postgresql":
+        return _postgres_backend
+    return _memory_backend
+
+def apply_search(db: Session, kind: str, query: Query, text: str) -> Query:
+    """Ограничить запрос документами, подходящими под text, по релевантности"""
+    return get_search_backend(db).apply(db, kind, query, text)
+
+def fetch_page(query: Query, skip: int, limit: int) -> Tuple[List[Any], int]:
+    """Страница результатов и общее число совпадений одним запросом.
+
+    Количество считается оконной функцией count(*) OVER () по всей
+    отфильтрованной выборке, до применения LIMIT/OFFSET.
+    """
+    rows = query.add_columns(func.count().over().label("total")).offset(skip).limit(limit).all()
+    if rows:
+        return [row[0] for row in rows], rows[0][-1]
+    if skip == 0:
+        return [], 0
+    # Страница за пределами выборки: окно не вернуло строк, считаем отдельно
+    return [], query.order_by(None).count()
+
+def document_changed(db: Session, kind: str, obj: Any):
+    """Обновить документ в индексе после записи (вызывается из CRUD)"""
+    get_search_backend(db).document_changed(kind, obj)
+    for listener in _listeners:
+        listener.document_changed(kind, obj)
+
+def document_removed(db: Session, kind: str, object_id: int):
+    """Удалить документ из индекса (вызывается из CRUD)"""
+    get_search_backend(db).document_removed(kind, object_id)
+    for listener in _listeners:
+        listener.document_removed(kind, object_id)
@@ -1,14 +1,18 @@
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Any, Dict, Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import DateTime
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from app.core import cache, tokens
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_session, run_db
+from app.core.hashing import hashing_pool
 from app.models import User
-from app.crud import user as user_crud
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -24,6 +28,14 @@ def get_password_hash(password: str) -> str:
     """Получить хеш пароля"""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Проверить пароль в пуле bcrypt (app.core.hashing), не блокируя event loop"""
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Получить хеш пароля в пуле bcrypt (app.core.hashing)"""
+    return await hashing_pool.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Создать токен доступа"""
     to_encode = data.copy()
@@ -35,34 +47,115 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str, credentials_exception):
-    """Проверить токен"""
+def access_token_claims(user: User, family: Optional[str] = None) -> Dict[str, Any]:
+    """Данные токена доступа; family — сессия (app.core.tokens),
+    при AUTH_TOKEN_CLAIMS — еще id, роль и активность"""
+    claims: Dict[str, Any] = {"sub": user.username}
+    if family is not None:
+        claims["fam"] = family
+    if settings.AUTH_TOKEN_CLAIMS:
+        claims.update(uid=user.id, role=user.role, active=bool(user.is_active))
+    return claims
+
+def decode_token(token: str, credentials_exception, token_type: str = "access") -> Dict[str, Any]:
+    """Проверить токен (подпись, срок, тип, отзыв сессии) и вернуть его данные"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        return username
     except JWTError:
         raise credentials_exception
+    if payload.get("sub") is None or payload.get("type", "access") != token_type:
+        raise credentials_exception
+    if tokens.is_revoked(payload):
+        raise credentials_exception
+    return payload
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Получить текущего пользователя по токену"""
-    credentials_exception = HTTPException(
+def verify_token(token: str, credentials_exception):
+    """Проверить токен"""
+    return decode_token(token, credentials_exception)["sub"]
+
+def get_credentials_exception() -> HTTPException:
+    """Ответ 401 для неверного или отозванного токена"""
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    username = verify_token(token, credentials_exception)
-    user = user_crud.get_user_by_username(db, username=username)
+
+# Кэш пользователя по subject токена: без хеша пароля, сбрасывается CRUD при изменении
+
+def _user_cache_key(username: str) -> str:
+    return f"auth:user:{username}"
+
+def _user_cache_enabled() -> bool:
+    # In-process кэш сбрасывается только в текущем воркере: деактивация или
+    # смена роли не дошла бы до остальных, поэтому без Redis пользователь не кэшируется
+    return bool(settings.AUTH_USER_CACHE_TTL) and cache.is_shared()
+
+def _cached_user(username: str) -> Optional[User]:
+    if not _user_cache_enabled():
+        return None
+    data = cache.get_value(_user_cache_key(username))
+    if data is None:
+        return None
+    for column in User.__table__.columns:
+        if isinstance(column.type, DateTime) and data.get(column.key) is not None:
+            data[column.key] = datetime.fromisoformat(data[column.key])
+    # Отдельный объект на запрос: вне сессии, изменения не сохраняются
+    return User(**data)
+
+def _store_user(user: User):
+    if not _user_cache_enabled():
+        return
+    data = {
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns
+        if column.key != "hashed_password"
+    }
+    cache.set_value(_user_cache_key(user.username), jsonable_encoder(data), settings.AUTH_USER_CACHE_TTL)
+
+def invalidate_user_cache(*usernames: str):
+    """Сбросить кэш пользователя (вызывается из CRUD после commit)"""
+    cache.delete_value(*(_user_cache_key(username) for username in usernames))
+
+async def _load_user(username: str, db: Session, credentials_exception) -> User:
+    # Кэш может быть в Redis, поэтому обращения к нему — в пуле потоков
+    user = await run_in_threadpool(_cached_user, username)
+    if user is not None:
+        return user
+
+    # Ленивый импорт: app.crud.user импортирует хеширование паролей отсюда
+    from app.crud import user as user_crud
+
+    user = await run_db(db, user_crud.get_user_by_username, username=username)
     if user is None:
         raise credentials_exception
+    await run_in_threadpool(_store_user, user)
     return user
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session)
+) -> User:
+    """Получить текущего пользователя по токену"""
+    credentials_exception = get_credentials_exception()
+    username = await run_in_threadpool(verify_token, token, credentials_exception)
+    return await _load_user(username, db, credentials_exception)
+
+async def get_token_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session)
+) -> User:
+    """Текущий пользователь для проверок по id и роли.
+
+    При AUTH_TOKEN_CLAIMS берется из данных токена без обращения к БД и кэшу;
+    смена роли или деактивация учитываются после перевыпуска токена.
+    """
+    credentials_exception = get_credentials_exception()
+    payload = await run_in_threadpool(decode_token, token, credentials_exception)
+    if settings.AUTH_TOKEN_CLAIMS and {"uid", "role", "active"} <= payload.keys():
+        return User(id=payload["uid"], username=payload["sub"], role=payload["role"], is_active=payload["active"])
+    return await _load_user(payload["sub"], db, credentials_exception)
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Получить активного пользователя"""
     if not current_user.is_active:
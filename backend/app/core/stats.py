@@ -0,0 +1,110 @@
+"""
+Предвычисленные сводки для эндпоинтов /stats/overview.
+
+Каждая сводка считается CRUD-функцией (несколько агрегирующих запросов) в
+фоне и хранится в памяти процесса, поэтому эндпоинт отвечает за константное
+время независимо от размера таблиц. Сводка пересчитывается:
+
+- после записи — фоновая задача раз в STATS_CHECK_INTERVAL секунд сверяет
+  версию пространства имен кэша (app.core.cache), которую CRUD увеличивает
+  при каждом изменении, в том числе в других воркерах;
+- по расписанию раз в STATS_REFRESH_INTERVAL секунд — для значений, которые
+  меняются без записи (новые пользователи за сегодня) или пишутся в обход
+  CRUD (пакетный сброс просмотров).
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.core import cache
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+class _Summary:
+    def __init__(self, namespace: str, compute: Callable[[Session], Dict[str, Any]]):
+        self.namespace = namespace
+        self.compute = compute
+        self.value: Optional[Dict[str, Any]] = None
+        self.version: Optional[int] = None
+        self.computed_at = 0.0
+
+class StatsRegistry:
+    """Сводки с фоновым пересчетом"""
+
+    def __init__(self):
+        self._summaries: Dict[str, _Summary] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, namespace: str, compute: Callable[[Session], Dict[str, Any]]):
+        """Зарегистрировать сводку; namespace — пространство кэша, сигнализирующее о записи"""
+        self._summaries[name] = _Summary(namespace, compute)
+
+    def _refresh(self, summary: _Summary, version: Optional[int]):
+        db = SessionLocal()
+        try:
+            summary.value = summary.compute(db)
+        finally:
+            db.close()
+        summary.version = version
+        summary.computed_at = time.monotonic()
+
+    def _refresh_now(self, summary: _Summary):
+        self._refresh(summary, cache.namespace_version(summary.namespace))
+
+    def refresh_due(self, force: bool = False) -> int:
+        """Пересчитать устаревшие сводки; возвращает число пересчитанных"""
+        refreshed = 0
+        now = time.monotonic()
+        for name, summary in self._summaries.items():
+            # Версия читается до пересчета: запись во время пересчета вызовет еще один
+            version = cache.namespace_version(summary.namespace)
+            due = (
+                force
+                or summary.value is None
+                or version != summary.version
+                or now - summary.computed_at >= settings.STATS_REFRESH_INTERVAL
+            )
+            if not due:
+                continue
+            try:
+                self._refresh(summary, version)
+                refreshed += 1
+            except Exception:
+                logger.exception("Stats refresh failed for %s", name)
+        return refreshed
+
+    async def get(self, name: str) -> Dict[str, Any]:
+        """Текущая сводка; до первого пересчета считается синхронно"""
+        summary = self._summaries[name]
+        if summary.value is None:
+            await run_in_threadpool(self._refresh_now, summary)
+        return summary.value
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.STATS_CHECK_INTERVAL)
+            try:
+                await run_in_threadpool(self.refresh_due)
+            except Exception:
+                logger.exception("Stats refresh loop failed")
+
+    async def start(self):
+        """Посчитать сводки и запустить фоновый пересчет (startup)"""
+        await run_in_threadpool(self.refresh_due, True)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую задачу (shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+stats_registry = StatsRegistry()
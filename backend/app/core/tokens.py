@@ -0,0 +1,109 @@
+"""
+Refresh-токены и отзыв сессий.
+
+Логин открывает сессию — семейство токенов с общим идентификатором fam:
+короткоживущий access-токен и refresh-токен со своим jti. Обмен refresh-токена
+(/auth/refresh) выдает новую пару того же семейства, а старый refresh-токен
+помечается использованным (SET NX): повторное предъявление уже обмененного
+токена означает утечку, и все семейство отзывается.
+
+Отозванные семейства хранятся в Redis (auth:revoked:<fam>) до истечения
+последнего токена семейства; проверка в get_current_user — один GET по ключу.
+Без Redis используется in-process хранилище: отзыв действует в пределах
+воркера.
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.redis_client import get_redis, redis
+
+logger = logging.getLogger(__name__)
+
+REVOKED_PREFIX = "auth:revoked:"
+USED_PREFIX = "auth:refresh-used:"
+
+class _MemoryStore:
+    """Ключи с TTL в памяти процесса"""
+
+    def __init__(self):
+        self._data: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float):
+        for key in [key for key, expires_at in self._data.items() if expires_at <= now]:
+            del self._data[key]
+
+    def add(self, key: str, ttl: int) -> bool:
+        """Добавить ключ; False, если он уже есть"""
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._data.get(key)
+            if expires_at is not None and expires_at > now:
+                return False
+            if len(self._data) > 10000:
+                self._purge(now)
+            self._data[key] = now + ttl
+            return True
+
+    def exists(self, key: str) -> bool:
+        with self._lock:
+            expires_at = self._data.get(key)
+            return expires_at is not None and expires_at > time.monotonic()
+
+_memory = _MemoryStore()
+
+def _ttl() -> int:
+    return int(timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS).total_seconds())
+
+def _add(key: str) -> bool:
+    client = get_redis()
+    if client is not None:
+        try:
+            return bool(client.set(key, 1, nx=True, ex=_ttl()))
+        except redis.RedisError as e:
+            logger.warning("Token store write failed: %s", e)
+    return _memory.add(key, _ttl())
+
+def _exists(key: str) -> bool:
+    client = get_redis()
+    if client is not None:
+        try:
+            return bool(client.exists(key))
+        except redis.RedisError as e:
+            logger.warning("Token store lookup failed: %s", e)
+    return _memory.exists(key)
+
+def new_family() -> str:
+    """Идентификатор новой сессии"""
+    return uuid.uuid4().hex
+
+def refresh_claims(username: str, family: str) -> Dict[str, Any]:
+    """Данные нового refresh-токена семейства"""
+    return {"sub": username, "type": "refresh", "fam": family, "jti": uuid.uuid4().hex}
+
+def revoke_family(family: str):
+    """Отозвать все токены сессии (logout, повторное использование refresh-токена)"""
+    _add(REVOKED_PREFIX + family)
+
+def is_revoked(payload: Dict[str, Any]) -> bool:
+    """Отозван ли токен; токены без семейства (выданные до refresh-токенов) не отзываются"""
+    family = payload.get("fam")
+    return family is not None and _exists(REVOKED_PREFIX + family)
+
+def consume_refresh(payload: Dict[str, Any]) -> bool:
+    """Пометить refresh-токен использованным; False, если токен уже был обменян или отозван"""
+    family = payload.get("fam")
+    jti = payload.get("jti")
+    if payload.get("type") != "refresh" or not family or not jti:
+        return False
+    if is_revoked(payload):
+        return False
+    if not _add(USED_PREFIX + jti):
+        logger.warning("Refresh token reuse detected, revoking session %s", family)
+        revoke_family(family)
+        return False
+    return True
@@ -0,0 +1,65 @@
+"""
+Затухающая оценка популярности гайдов для /guides/trending/.
+
+Каждое событие (публикация, просмотры, лайк, новая оценка) добавляет к оценке
+гайда вес w, который затем убывает вдвое за период полураспада окна: сутки
+для "day", неделю для "week". Текущая оценка sum(w_i * 2^(-(now - t_i) / T))
+меняется со временем у всех гайдов одинаково, поэтому их порядок совпадает
+с порядком sum(w_i * e^(λ * t_i)), λ = ln 2 / T, где t_i отсчитывается от
+фиксированной эпохи. Эта сумма не зависит от текущего момента: она хранится
+в индексированной колонке, событие прибавляется к ней одним UPDATE строки
+гайда, а выдача трендов — чтение диапазона индекса.
+
+Чтобы e^(λt) не переполнялось, колонка хранит логарифм суммы, а прибавление
+выполняется как logaddexp(a, b) = max(a, b) + ln(1 + e^(-|a - b|)).
+Отмена лайка оценку не уменьшает: вклад лайка и так затухает.
+"""
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from sqlalchemy import case, func
+
+# Начало отсчета времени событий; менять нельзя без пересчета колонок
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Окно -> (колонка build_guides, период полураспада в секундах)
+WINDOWS = {
+    "day": ("trending_day", 24 * 3600.0),
+    "week": ("trending_week", 7 * 24 * 3600.0),
+}
+
+# Веса событий
+PUBLISH_WEIGHT = 10.0
+VIEW_WEIGHT = 1.0
+LIKE_WEIGHT = 5.0
+RATING_WEIGHT = 2.0  # за балл оценки
+
+def event_scores(weight: float, at: Optional[datetime] = None) -> Dict[str, float]:
+    """Логарифм вклада события в каждую колонку трендов"""
+    at = at or datetime.now(timezone.utc)
+    elapsed = (at - EPOCH).total_seconds()
+    return {
+        column: math.log(weight) + math.log(2) * elapsed / half_life
+        for column, half_life in WINDOWS.values()
+    }
+
+def initial_score(column: str) -> float:
+    """Начальное значение колонки для новой строки: вклад одного просмотра в момент создания"""
+    return event_scores(VIEW_WEIGHT)[column]
+
+# Порог разницы логарифмов: e^(-700) уже не влияет на сумму, а float8 exp()
+# в PostgreSQL падает с underflow при аргументе меньше ~-745
+MAX_LOG_GAP = 700.0
+
+def _logaddexp(a: Any, b: Any) -> Any:
+    gap = func.abs(a - b)
+    gap = case((gap > MAX_LOG_GAP, MAX_LOG_GAP), else_=gap)
+    return case((a > b, a), else_=b) + func.ln(1 + func.exp(-gap))
+
+def add_event(table: Any, scores: Dict[str, Any]) -> Dict[str, Any]:
+    """Значения UPDATE, прибавляющие событие к колонкам трендов.
+
+    scores — результат event_scores() или bindparam с такими значениями
+    для executemany.
+    """
+    return {column: _logaddexp(table.c[column], score) for column, score in scores.items()}
@@ -0,0 +1,154 @@
+"""
+Буферизованные счетчики просмотров (write-behind).
+
+Просмотр страницы только увеличивает счетчик в памяти или в Redis (HINCRBY),
+а фоновая задача раз в VIEW_COUNTER_FLUSH_INTERVAL секунд (или досрочно,
+после VIEW_COUNTER_MAX_LAG просмотров) сбрасывает накопленное в БД одним
+пакетом атомарных UPDATE ... SET views = views + n.
+"""
+import asyncio
+import logging
+import threading
+import uuid
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_client import get_redis, redis
+
+logger = logging.getLogger(__name__)
+
+# HGETALL и DEL одной командой: ключ забирает ровно один сброс, даже если
+# хвосты прошлых попыток подбирают несколько процессов одновременно
+TAKE_HASH_SCRIPT = "local stored = redis.call('HGETALL', KEYS[1]) redis.call('DEL', KEYS[1]) return stored"
+
+class ViewCounter:
+    """Накопитель просмотров с периодическим сбросом в БД"""
+
+    def __init__(self):
+        self._flushers: Dict[str, Callable[[Session, Dict[int, int]], int]] = {}
+        self._buffer: Dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, kind: str, flusher: Callable[[Session, Dict[int, int]], int]):
+        """Зарегистрировать тип объекта и функцию пакетной записи"""
+        self._flushers[kind] = flusher
+
+    def _key(self, kind: str) -> str:
+        return f"views:{kind}"
+
+    def record(self, kind: str, object_id: int, n: int = 1):
+        """Учесть просмотр (без обращения к БД)"""
+        client = get_redis()
+        if client is not None:
+            try:
+                client.hincrby(self._key(kind), object_id, n)
+            except redis.RedisError as e:
+                logger.warning("Redis view counter failed, buffering locally: %s", e)
+                client = None
+        if client is None:
+            with self._lock:
+                self._buffer[kind][object_id] += n
+
+        with self._lock:
+            self._pending += n
+            wake = self._pending >= settings.VIEW_COUNTER_MAX_LAG
+        if wake and self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def hit(self, kind: str, object_id: int):
+        """Асинхронный вариант record для обработчиков запросов"""
+        await run_in_threadpool(self.record, kind, object_id)
+
+    def _drain(self, kind: str) -> Dict[int, int]:
+        """Забрать накопленные значения (память и Redis).
+
+        Ошибка Redis не теряет уже забранное: локальные значения и прочитанные
+        хеши сбрасываются, а непрочитанные ключи :flushing:* остаются в Redis
+        и подбираются следующим сбросом (в том числе другим процессом).
+        """
+        with self._lock:
+            counts = Counter(self._buffer[kind])
+            self._buffer[kind].clear()
+
+        client = get_redis()
+        if client is None:
+            return dict(counts)
+        try:
+            # RENAME атомарно отделяет накопленное от новых HINCRBY
+            try:
+                client.rename(self._key(kind), f"{self._key(kind)}:flushing:{uuid.uuid4().hex}")
+            except redis.ResponseError:
+                pass  # новых просмотров нет
+            for flushing_key in client.scan_iter(match=f"{self._key(kind)}:flushing:*"):
+                stored = client.eval(TAKE_HASH_SCRIPT, 1, flushing_key)
+                for object_id, n in zip(stored[::2], stored[1::2]):
+                    counts[int(object_id)] += int(n)
+        except redis.RedisError as e:
+            logger.warning("Redis view counter drain failed, leftovers are retried on next flush: %s", e)
+        return dict(counts)
+
+    def _restore(self, kind: str, counts: Dict[int, int]):
+        """Вернуть значения в буфер после неудачного сброса"""
+        with self._lock:
+            self._buffer[kind].update(counts)
+
+    def flush(self) -> int:
+        """Сбросить все накопленные просмотры в БД"""
+        with self._lock:
+            self._pending = 0
+
+        flushed = 0
+        db = SessionLocal()
+        try:
+            for kind, flusher in self._flushers.items():
+                counts: Dict[int, int] = {}
+                try:
+                    counts = self._drain(kind)
+                    if not counts:
+                        continue
+                    flushed += flusher(db, counts)
+                except Exception:
+                    db.rollback()
+                    self._restore(kind, counts)
+                    logger.exception("Failed to flush %s views", kind)
+        finally:
+            db.close()
+        return flushed
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.VIEW_COUNTER_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception:
+                logger.exception("View counter flush failed")
+
+    def start(self):
+        """Запустить фоновый сброс (startup приложения)"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Остановить фоновую задачу и сбросить остаток (shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await run_in_threadpool(self.flush)
+
+view_counter = ViewCounter()
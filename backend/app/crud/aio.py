@@ -0,0 +1,39 @@
+"""
+Асинхронные варианты CRUD-функций.
+
+Каждая функция модулей app.crud.* доступна здесь как корутина с той же
+сигнатурой: запрос описывается один раз, а выполняется либо на AsyncSession
+(asyncpg), либо на обычной Session в пуле потоков — см. app.core.database.run_db.
+"""
+from types import ModuleType
+from typing import Callable
+from app.core.database import run_db
+from app.crud import guide as _guide, hero as _hero, news as _news, user as _user
+
+class AsyncCRUD:
+    """Асинхронная обертка над CRUD-модулем"""
+
+    def __init__(self, module: ModuleType):
+        self._module = module
+
+    def __getattr__(self, name: str) -> Callable:
+        fn = getattr(self._module, name)
+        if not callable(fn):
+            return fn
+
+        async def call(*args, **kwargs):
+            if "db" in kwargs:
+                db = kwargs.pop("db")
+            else:
+                db, args = args[0], args[1:]
+            return await run_db(db, fn, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = fn.__doc__
+        setattr(self, name, call)
+        return call
+
+guide = AsyncCRUD(_guide)
+hero = AsyncCRUD(_hero)
+news = AsyncCRUD(_news)
+user = AsyncCRUD(_user)
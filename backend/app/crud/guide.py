@@ -1,13 +1,64 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
-from app.models import BuildGuide, GuideRating, Comment
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Float, bindparam, case, cast, delete, func, desc, insert, select, update
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from app.core import cache, trending
+from app.core.search import apply_search, document_changed, document_removed, fetch_page
+from app.core.database import dialect_insert
+from app.core.pagination import KeysetOrder, paginate
+from app.models import AuthorLeaderboard, AuthorStats, BuildGuide, GuideLike, GuideRating, Comment, Hero, User
 from app.schemas.guide import GuideCreate, GuideUpdate
+from app.schemas.search import GuideSearchFilters
+
+# Порядки сортировки для курсорной пагинации (app.core.pagination)
+GUIDES_ORDER = KeysetOrder("guides", BuildGuide.rating, BuildGuide.id)
+# Окно трендов -> сортировка по колонке затухающей оценки (app.core.trending)
+TRENDING_ORDERS = {
+    window: KeysetOrder(f"guides_trending_{window}", getattr(BuildGuide, column), BuildGuide.id)
+    for window, (column, _) in trending.WINDOWS.items()
+}
+LATEST_ORDER = KeysetOrder("guides_latest", BuildGuide.created_at, BuildGuide.id)
+COMMENTS_ORDER = KeysetOrder("comments", Comment.created_at, Comment.id)
+
+AUTHOR_STATS_COLUMNS = ["author_id", "guides_count", "total_views", "total_likes", "rated_guides", "rating_total"]
+# Оценка автора в рейтинге (app.core.leaderboard): просмотры, лайки и оценки
+# гайдов, вклад каждого гайда вдвое меньше каждые LEADERBOARD_HALF_LIFE_DAYS дней
+LEADERBOARD_VIEW_WEIGHT = 1.0
+LEADERBOARD_LIKE_WEIGHT = 10.0
+LEADERBOARD_RATING_WEIGHT = 4.0  # за балл каждой оценки
+LEADERBOARD_HALF_LIFE_DAYS = 30.0
+
+# Сортировки рейтинга авторов (app.api.v1.users: /authors/top)
+AUTHOR_ORDERS = {
+    "views": AuthorStats.total_views,
+    "likes": AuthorStats.total_likes,
+    "guides": AuthorStats.guides_count,
+    "rating": case((AuthorStats.rated_guides > 0, AuthorStats.rating_total / AuthorStats.rated_guides), else_=0.0),
+}
 
 def get_guide(db: Session, guide_id: int) -> Optional[BuildGuide]:
     """Получить гайд по ID"""
     return db.query(BuildGuide).filter(BuildGuide.id == guide_id).first()
 
+def get_guide_detail(db: Session, guide_id: int) -> Optional[Tuple[BuildGuide, int]]:
+    """Гайд с героем, автором и числом комментариев одним запросом"""
+    comments_count = (
+        select(func.count(Comment.id))
+        .where(Comment.guide_id == BuildGuide.id, Comment.is_approved == True)
+        .scalar_subquery()
+    )
+    row = (
+        db.query(BuildGuide, comments_count)
+        .options(
+            joinedload(BuildGuide.hero).load_only(Hero.name),
+            joinedload(BuildGuide.author).load_only(User.username)
+        )
+        .filter(BuildGuide.id == guide_id)
+        .first()
+    )
+    return tuple(row) if row else None
+
 def get_guides(
     db: Session,
     skip: int = 0,
@@ -16,7 +67,8 @@ def get_guides(
     author_id: Optional[int] = None,
     difficulty: Optional[str] = None,
     play_style: Optional[str] = None,
-    tags: Optional[str] = None
+    tags: Optional[str] = None,
+    cursor: Optional[str] = None
 ) -> List[BuildGuide]:
     """Получить список гайдов с фильтрацией"""
     query = db.query(BuildGuide).filter(BuildGuide.is_published == True)
@@ -37,7 +89,7 @@ def get_guides(
         # Поиск по тегам (упрощенная версия)
         query = query.filter(BuildGuide.tags.contains([tags]))
     
-    return query.order_by(desc(BuildGuide.rating)).offset(skip).limit(limit).all()
+    return paginate(query, GUIDES_ORDER, skip, limit, cursor).all()
 
 def create_guide(db: Session, guide: GuideCreate, author_id: int) -> BuildGuide:
     """Создать новый гайд"""
@@ -46,8 +98,14 @@ def create_guide(db: Session, guide: GuideCreate, author_id: int) -> BuildGuide:
     
     db_guide = BuildGuide(**guide_data)
     db.add(db_guide)
+    db.flush()
+    if db_guide.is_published:
+        _bump_trending(db, db_guide.id, trending.PUBLISH_WEIGHT)
+        refresh_author_stats(db, [author_id])
     db.commit()
+    cache.invalidate("guides")
     db.refresh(db_guide)
+    document_changed(db, "guide", db_guide)
     return db_guide
 
 def update_guide(db: Session, guide_id: int, guide_update: GuideUpdate) -> Optional[BuildGuide]:
@@ -57,11 +115,19 @@ def update_guide(db: Session, guide_id: int, guide_update: GuideUpdate) -> Optio
         return None
     
     update_data = guide_update.model_dump(exclude_unset=True)
+    was_published = db_guide.is_published
     for field, value in update_data.items():
         setattr(db_guide, field, value)
     
+    if "is_published" in update_data:
+        db.flush()
+        if db_guide.is_published and not was_published:
+            _bump_trending(db, guide_id, trending.PUBLISH_WEIGHT)
+        refresh_author_stats(db, [db_guide.author_id])
     db.commit()
+    cache.invalidate("guides")
     db.refresh(db_guide)
+    document_changed(db, "guide", db_guide)
     return db_guide
 
 def delete_guide(db: Session, guide_id: int) -> bool:
@@ -71,18 +137,62 @@ def delete_guide(db: Session, guide_id: int) -> bool:
         return False
     
     db.delete(db_guide)
+    db.flush()
+    refresh_author_stats(db, [db_guide.author_id])
     db.commit()
+    cache.invalidate("guides")
+    document_removed(db, "guide", guide_id)
     return True
 
-def increment_views(db: Session, guide_id: int) -> bool:
-    """Увеличить счетчик просмотров"""
-    db_guide = get_guide(db, guide_id)
-    if not db_guide:
-        return False
+def increment_views(db: Session, counts: Dict[int, int]) -> int:
+    """Атомарно прибавить накопленные просмотры: views = views + n"""
+    if not counts:
+        return 0
     
-    db_guide.views += 1
+    table = BuildGuide.__table__
+    columns = [column for column, _ in trending.WINDOWS.values()]
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            views=func.coalesce(table.c.views, 0) + bindparam("b_views"),
+            **trending.add_event(table, {column: bindparam(f"b_{column}") for column in columns})
+        )
+    )
+    now = datetime.now(timezone.utc)
+    params = []
+    for object_id, n in counts.items():
+        scores = trending.event_scores(n * trending.VIEW_WEIGHT, now)
+        params.append({
+            "b_id": object_id,
+            "b_views": n,
+            **{f"b_{column}": score for column, score in scores.items()}
+        })
+    db.execute(stmt, params)
+    _add_author_counters(db, "total_views", counts)
     db.commit()
-    return True
+    return len(counts)
+
+def _apply_rating_delta(db: Session, guide_id: int, sum_delta: int, count_delta: int):
+    """Атомарно скорректировать сумму, количество и среднее оценок гайда"""
+    table = BuildGuide.__table__
+    new_sum = func.coalesce(table.c.rating_sum, 0) + sum_delta
+    new_count = func.coalesce(table.c.rating_count, 0) + count_delta
+    db.execute(
+        update(table)
+        .where(table.c.id == guide_id)
+        .values(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            rating=case((new_count > 0, cast(new_sum, Float) / new_count), else_=0.0)
+        )
+    )
+
+def _lock_user_rating(db: Session, guide_id: int, user_id: int) -> Optional[GuideRating]:
+    return db.query(GuideRating).filter(
+        GuideRating.guide_id == guide_id,
+        GuideRating.user_id == user_id
+    ).with_for_update().first()
 
 def rate_guide(
     db: Session, 
@@ -93,90 +203,184 @@ def rate_guide(
 ) -> dict:
     """Оценить гайд"""
     # Проверить, не оценивал ли пользователь уже этот гайд
-    existing_rating = db.query(GuideRating).filter(
-        GuideRating.guide_id == guide_id,
-        GuideRating.user_id == user_id
-    ).first()
+    existing_rating = _lock_user_rating(db, guide_id, user_id)
+    
+    if existing_rating is None:
+        # uq_guide_ratings_guide_user: параллельная первая оценка не создаст дубль
+        inserted = db.execute(
+            dialect_insert(db, GuideRating.__table__)
+            .values(guide_id=guide_id, user_id=user_id, rating=rating, review=review)
+            .on_conflict_do_nothing(index_elements=["guide_id", "user_id"])
+        ).rowcount
+        if inserted:
+            sum_delta, count_delta = rating, 1
+        else:
+            existing_rating = _lock_user_rating(db, guide_id, user_id)
     
-    if existing_rating:
-        # Обновить существующую оценку
+    if existing_rating is not None:
+        # Обновить существующую оценку: агрегат меняется на разницу
+        sum_delta, count_delta = rating - existing_rating.rating, 0
         existing_rating.rating = rating
         existing_rating.review = review
-        db.commit()
-    else:
-        # Создать новую оценку
-        new_rating = GuideRating(
-            guide_id=guide_id,
-            user_id=user_id,
-            rating=rating,
-            review=review
-        )
-        db.add(new_rating)
-        db.commit()
-    
-    # Пересчитать средний рейтинг гайда
-    guide = get_guide(db, guide_id)
-    if guide:
-        ratings = db.query(GuideRating).filter(GuideRating.guide_id == guide_id).all()
-        if ratings:
-            avg_rating = sum(r.rating for r in ratings) / len(ratings)
-            guide.rating = avg_rating
-            guide.rating_count = len(ratings)
-            db.commit()
+    
+    _apply_rating_delta(db, guide_id, sum_delta, count_delta)
+    if count_delta:
+        # В тренды идут только новые оценки: изменение своей оценки не событие
+        _bump_trending(db, guide_id, rating * trending.RATING_WEIGHT)
+    _refresh_guide_author(db, guide_id)
+    db.commit()
+    cache.invalidate("guides")
     
     return {"message": "Guide rated successfully", "rating": rating}
 
+def reconcile_guide_ratings(db: Session) -> int:
+    """Пересчитать агрегаты оценок из guide_ratings (исправление расхождений)"""
+    table = BuildGuide.__table__
+    totals = (
+        select(
+            GuideRating.guide_id.label("guide_id"),
+            func.sum(GuideRating.rating).label("rating_sum"),
+            func.count(GuideRating.id).label("rating_count")
+        )
+        .group_by(GuideRating.guide_id)
+        .subquery()
+    )
+    
+    # Гайды с оценками, у которых агрегат разошелся с таблицей оценок
+    updated = db.execute(
+        update(table)
+        .where(
+            table.c.id == totals.c.guide_id,
+            (func.coalesce(table.c.rating_sum, -1) != totals.c.rating_sum) |
+            (func.coalesce(table.c.rating_count, -1) != totals.c.rating_count)
+        )
+        .values(
+            rating_sum=totals.c.rating_sum,
+            rating_count=totals.c.rating_count,
+            rating=cast(totals.c.rating_sum, Float) / totals.c.rating_count
+        )
+    ).rowcount
+    
+    # Гайды без оценок
+    has_ratings = select(GuideRating.id).where(GuideRating.guide_id == table.c.id).exists()
+    updated += db.execute(
+        update(table)
+        .where(
+            ~has_ratings,
+            (func.coalesce(table.c.rating_sum, 0) != 0) |
+            (func.coalesce(table.c.rating_count, 0) != 0) |
+            (func.coalesce(table.c.rating, 0) != 0)
+        )
+        .values(rating_sum=0, rating_count=0, rating=0.0)
+    ).rowcount
+    
+    if updated:
+        refresh_author_stats(db)
+    db.commit()
+    if updated:
+        cache.invalidate("guides")
+    return updated
+
+def _add_likes(db: Session, guide_id: int, delta: int) -> int:
+    """Атомарно изменить счетчик лайков и вернуть новое значение"""
+    table = BuildGuide.__table__
+    return db.execute(
+        update(table)
+        .where(table.c.id == guide_id)
+        .values(likes=func.coalesce(table.c.likes, 0) + delta)
+        .returning(table.c.likes)
+    ).scalar()
+
+def _bump_trending(db: Session, guide_id: int, weight: float):
+    """Прибавить событие с весом weight к затухающим оценкам гайда"""
+    table = BuildGuide.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == guide_id)
+        .values(**trending.add_event(table, trending.event_scores(weight)))
+    )
+
 def like_guide(db: Session, guide_id: int, user_id: int) -> dict:
-    """Лайкнуть гайд"""
-    guide = get_guide(db, guide_id)
-    if not guide:
-        return {"error": "Guide not found"}
-    
-    # Проверить, не лайкал ли пользователь уже этот гайд
-    # В реальном приложении здесь должна быть таблица лайков
-    # Пока что просто увеличиваем счетчик
-    guide.likes += 1
+    """Лайкнуть гайд (повторный лайк того же пользователя игнорируется)"""
+    inserted = db.execute(
+        dialect_insert(db, GuideLike.__table__)
+        .values(guide_id=guide_id, user_id=user_id)
+        .on_conflict_do_nothing(index_elements=["guide_id", "user_id"])
+    ).rowcount
+    
+    if inserted:
+        likes = _add_likes(db, guide_id, 1)
+        _bump_trending(db, guide_id, trending.LIKE_WEIGHT)
+        _add_author_counters(db, "total_likes", {guide_id: 1})
+    else:
+        likes = db.query(BuildGuide.likes).filter(BuildGuide.id == guide_id).scalar()
+    db.commit()
+    
+    return {"message": "Guide liked successfully", "liked": True, "likes": likes or 0}
+
+def unlike_guide(db: Session, guide_id: int, user_id: int) -> dict:
+    """Убрать лайк с гайда"""
+    deleted = db.execute(
+        delete(GuideLike.__table__).where(
+            GuideLike.guide_id == guide_id,
+            GuideLike.user_id == user_id
+        )
+    ).rowcount
+    
+    if deleted:
+        likes = _add_likes(db, guide_id, -1)
+        _add_author_counters(db, "total_likes", {guide_id: -1})
+    else:
+        likes = db.query(BuildGuide.likes).filter(BuildGuide.id == guide_id).scalar()
     db.commit()
     
-    return {"message": "Guide liked successfully", "likes": guide.likes}
+    return {"message": "Guide unliked successfully", "liked": False, "likes": likes or 0}
+
+def get_liked_guide_ids(db: Session, user_id: int, guide_ids: List[int]) -> Set[int]:
+    """Какие из переданных гайдов лайкнул пользователь (один запрос)"""
+    if not guide_ids:
+        return set()
+    rows = db.query(GuideLike.guide_id).filter(
+        GuideLike.user_id == user_id,
+        GuideLike.guide_id.in_(guide_ids)
+    ).all()
+    return {row[0] for row in rows}
 
 def get_guide_comments(
     db: Session, 
     guide_id: int, 
     skip: int = 0, 
-    limit: int = 20
+    limit: int = 20,
+    cursor: Optional[str] = None
 ) -> List[Comment]:
     """Получить комментарии к гайду"""
-    return (
+    query = (
         db.query(Comment)
+        .options(joinedload(Comment.author).load_only(User.username))
         .filter(Comment.guide_id == guide_id, Comment.is_approved == True)
-        .order_by(desc(Comment.created_at))
-        .offset(skip)
-        .limit(limit)
-        .all()
     )
+    return paginate(query, COMMENTS_ORDER, skip, limit, cursor).all()
 
-def get_trending_guides(db: Session, skip: int = 0, limit: int = 10) -> List[BuildGuide]:
-    """Получить популярные гайды"""
-    return (
-        db.query(BuildGuide)
-        .filter(BuildGuide.is_published == True)
-        .order_by(desc(BuildGuide.views), desc(BuildGuide.likes))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+def get_trending_guides(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    window: str = "day"
+) -> List[BuildGuide]:
+    """Получить популярные гайды за окно day/week (затухающая оценка)"""
+    query = db.query(BuildGuide).filter(BuildGuide.is_published == True)
+    return paginate(query, TRENDING_ORDERS[window], skip, limit, cursor).all()
 
-def get_latest_guides(db: Session, skip: int = 0, limit: int = 10) -> List[BuildGuide]:
+def get_latest_guides(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None
+) -> List[BuildGuide]:
     """Получить последние гайды"""
-    return (
-        db.query(BuildGuide)
-        .filter(BuildGuide.is_published == True)
-        .order_by(desc(BuildGuide.created_at))
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+    query = db.query(BuildGuide).filter(BuildGuide.is_published == True)
+    return paginate(query, LATEST_ORDER, skip, limit, cursor).all()
 
 def get_guides_by_hero(db: Session, hero_id: int, limit: int = 5) -> List[BuildGuide]:
     """Получить гайды для конкретного героя"""
@@ -188,54 +392,259 @@ def get_guides_by_hero(db: Session, hero_id: int, limit: int = 5) -> List[BuildG
         .all()
     )
 
-def get_user_guides(db: Session, user_id: int, skip: int = 0, limit: int = 20) -> List[BuildGuide]:
+def get_user_guides(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> List[BuildGuide]:
     """Получить гайды пользователя"""
-    return (
-        db.query(BuildGuide)
-        .filter(BuildGuide.author_id == user_id)
-        .order_by(desc(BuildGuide.created_at))
-        .offset(skip)
+    query = db.query(BuildGuide).filter(BuildGuide.author_id == user_id)
+    return paginate(query, LATEST_ORDER, skip, limit, cursor).all()
+
+def _author_stats_select(author_ids: Optional[List[int]] = None):
+    """Статистика авторов по опубликованным гайдам — один запрос с группировкой"""
+    rated = BuildGuide.rating > 0
+    query = (
+        select(
+            BuildGuide.author_id,
+            func.count(BuildGuide.id),
+            func.coalesce(func.sum(BuildGuide.views), 0),
+            func.coalesce(func.sum(BuildGuide.likes), 0),
+            func.count(BuildGuide.id).filter(rated),
+            func.coalesce(func.sum(BuildGuide.rating).filter(rated), 0.0)
+        )
+        .where(BuildGuide.is_published == True)
+        .group_by(BuildGuide.author_id)
+    )
+    if author_ids is not None:
+        query = query.where(BuildGuide.author_id.in_(author_ids))
+    return query
+
+def refresh_author_stats(db: Session, author_ids: Optional[List[int]] = None):
+    """Пересчитать проекцию AuthorStats для авторов (для всех, если author_ids не задан)"""
+    if author_ids is not None and not author_ids:
+        return
+    table = AuthorStats.__table__
+    
+    # Авторы, у которых не осталось опубликованных гайдов, обнуляются
+    reset = update(table).values({column: 0 for column in AUTHOR_STATS_COLUMNS[1:]})
+    if author_ids is not None:
+        reset = reset.where(table.c.author_id.in_(author_ids))
+    db.execute(reset)
+    
+    stmt = dialect_insert(db, table)
+    db.execute(
+        stmt.from_select(AUTHOR_STATS_COLUMNS, _author_stats_select(author_ids))
+        .on_conflict_do_update(
+            index_elements=["author_id"],
+            set_={column: stmt.excluded[column] for column in AUTHOR_STATS_COLUMNS[1:]}
+        )
+    )
+
+def _refresh_guide_author(db: Session, guide_id: int):
+    author_id = db.query(BuildGuide.author_id).filter(BuildGuide.id == guide_id).scalar()
+    if author_id is not None:
+        refresh_author_stats(db, [author_id])
+
+def _add_author_counters(db: Session, column: str, deltas: Dict[int, int]):
+    """Прибавить просмотры или лайки гайдов к проекции их авторов (только опубликованные)"""
+    table = AuthorStats.__table__
+    author = (
+        select(BuildGuide.author_id)
+        .where(BuildGuide.id == bindparam("b_guide"), BuildGuide.is_published == True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(table)
+        .where(table.c.author_id == author)
+        .values({column: table.c[column] + bindparam("b_delta")})
+    )
+    db.execute(stmt, [{"b_guide": guide_id, "b_delta": delta} for guide_id, delta in deltas.items()])
+
+def _author_stats_dict(stats: Optional[AuthorStats]) -> dict:
+    if stats is None:
+        return {"guides_count": 0, "total_views": 0, "total_likes": 0, "average_rating": 0.0}
+    average = stats.rating_total / stats.rated_guides if stats.rated_guides else 0.0
+    return {
+        "guides_count": stats.guides_count,
+        "total_views": stats.total_views,
+        "total_likes": stats.total_likes,
+        "average_rating": round(float(average), 2)
+    }
+
+def get_author_stats(db: Session, author_id: int) -> Optional[dict]:
+    """Статистика автора по опубликованным гайдам (None, если пользователя нет)"""
+    row = (
+        db.query(User.id, AuthorStats)
+        .outerjoin(AuthorStats, AuthorStats.author_id == User.id)
+        .filter(User.id == author_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return _author_stats_dict(row[1])
+
+def get_authors_stats(db: Session, author_ids: List[int]) -> Dict[int, dict]:
+    """Статистика нескольких авторов одним запросом"""
+    if not author_ids:
+        return {}
+    rows = db.query(AuthorStats).filter(AuthorStats.author_id.in_(author_ids)).all()
+    found = {stats.author_id: _author_stats_dict(stats) for stats in rows}
+    return {author_id: found.get(author_id, _author_stats_dict(None)) for author_id in author_ids}
+
+def get_top_authors(db: Session, by: str = "views", limit: int = 10) -> List[dict]:
+    """Лучшие авторы по просмотрам, лайкам, числу гайдов или рейтингу"""
+    rows = (
+        db.query(AuthorStats, User.username)
+        .join(User, User.id == AuthorStats.author_id)
+        .filter(AuthorStats.guides_count > 0)
+        .order_by(AUTHOR_ORDERS[by].desc(), AuthorStats.author_id.desc())
         .limit(limit)
         .all()
     )
+    return [
+        {"user_id": stats.author_id, "username": username, **_author_stats_dict(stats)}
+        for stats, username in rows
+    ]
 
-def search_guides(db: Session, query: str, limit: int = 10) -> List[BuildGuide]:
-    """Поиск гайдов по заголовку или описанию"""
-    return (
-        db.query(BuildGuide)
-        .filter(
-            BuildGuide.is_published == True,
-            BuildGuide.title.ilike(f"%{query}%") | BuildGuide.description.ilike(f"%{query}%")
+def recompute_leaderboard(db: Session) -> int:
+    """Пересчитать рейтинг авторов за один проход по опубликованным гайдам"""
+    now = datetime.now(timezone.utc)
+    scores: Dict[int, float] = defaultdict(float)
+    guides_count: Counter = Counter()
+    
+    guides = (
+        db.query(
+            BuildGuide.author_id, BuildGuide.views, BuildGuide.likes,
+            BuildGuide.rating, BuildGuide.rating_count, BuildGuide.created_at
         )
-        .order_by(desc(BuildGuide.rating))
+        .filter(BuildGuide.is_published == True)
+        .yield_per(5000)
+    )
+    for author_id, views, likes, rating, rating_count, created_at in guides:
+        if created_at.tzinfo is None:
+            # SQLite возвращает CURRENT_TIMESTAMP без зоны (UTC)
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        age_days = max((now - created_at).total_seconds(), 0) / 86400
+        points = (
+            LEADERBOARD_VIEW_WEIGHT * views
+            + LEADERBOARD_LIKE_WEIGHT * likes
+            + LEADERBOARD_RATING_WEIGHT * rating * (rating_count or 0)
+        )
+        scores[author_id] += points * 0.5 ** (age_days / LEADERBOARD_HALF_LIFE_DAYS)
+        guides_count[author_id] += 1
+    
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    
+    # Снимок заменяется в одной транзакции: читатели видят либо старый, либо новый
+    db.execute(delete(AuthorLeaderboard.__table__))
+    if ranked:
+        db.execute(insert(AuthorLeaderboard.__table__), [
+            {
+                "author_id": author_id,
+                "rank": rank,
+                "score": round(score, 4),
+                "guides_count": guides_count[author_id],
+                "computed_at": now
+            }
+            for rank, (author_id, score) in enumerate(ranked, start=1)
+        ])
+    db.commit()
+    return len(ranked)
+
+def get_leaderboard_computed_at(db: Session) -> Optional[datetime]:
+    """Время расчета текущего снимка рейтинга"""
+    return db.query(func.max(AuthorLeaderboard.computed_at)).scalar()
+
+def _leaderboard_entry(entry: AuthorLeaderboard, username: str) -> dict:
+    return {
+        "rank": entry.rank,
+        "user_id": entry.author_id,
+        "username": username,
+        "score": entry.score,
+        "guides_count": entry.guides_count
+    }
+
+def get_leaderboard(db: Session, skip: int = 0, limit: int = 20) -> List[dict]:
+    """Страница рейтинга авторов (диапазон по индексу rank)"""
+    rows = (
+        db.query(AuthorLeaderboard, User.username)
+        .join(User, User.id == AuthorLeaderboard.author_id)
+        .filter(AuthorLeaderboard.rank > skip)
+        .order_by(AuthorLeaderboard.rank)
         .limit(limit)
         .all()
     )
+    return [_leaderboard_entry(entry, username) for entry, username in rows]
+
+def get_leaderboard_entry(db: Session, user_id: int) -> Optional[dict]:
+    """Позиция автора в рейтинге или None, если автора в нем нет"""
+    row = (
+        db.query(AuthorLeaderboard, User.username)
+        .join(User, User.id == AuthorLeaderboard.author_id)
+        .filter(AuthorLeaderboard.author_id == user_id)
+        .first()
+    )
+    return _leaderboard_entry(*row) if row else None
+
+def _search_guides_query(db: Session, query: str, filters: Optional[GuideSearchFilters]):
+    search_query = db.query(BuildGuide).filter(BuildGuide.is_published == True)
+    if filters:
+        if filters.hero_id:
+            search_query = search_query.filter(BuildGuide.hero_id == filters.hero_id)
+        if filters.difficulty:
+            search_query = search_query.filter(BuildGuide.difficulty == filters.difficulty)
+        if filters.play_style:
+            search_query = search_query.filter(BuildGuide.play_style == filters.play_style)
+    return apply_search(db, "guide", search_query, query).order_by(desc(BuildGuide.rating))
+
+def search_guides(
+    db: Session,
+    query: str,
+    limit: int = 10,
+    filters: Optional[GuideSearchFilters] = None
+) -> List[BuildGuide]:
+    """Поиск гайдов по заголовку или описанию"""
+    return _search_guides_query(db, query, filters).limit(limit).all()
+
+def search_guides_page(
+    db: Session,
+    query: str,
+    filters: Optional[GuideSearchFilters] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> Tuple[List[BuildGuide], int]:
+    """Страница поиска гайдов и общее число найденных"""
+    return fetch_page(_search_guides_query(db, query, filters), skip, limit)
 
 def get_guide_stats(db: Session) -> dict:
     """Получить статистику по гайдам"""
-    total_guides = db.query(BuildGuide).count()
-    published_guides = db.query(BuildGuide).filter(BuildGuide.is_published == True).count()
-    
-    # Статистика по сложности
-    difficulty_stats = {}
-    difficulties = db.query(BuildGuide.difficulty, func.count(BuildGuide.id)).group_by(BuildGuide.difficulty).all()
-    for diff, count in difficulties:
-        difficulty_stats[diff] = count
+    # Все счетчики — один запрос с группировкой по сложности и стилю игры
+    count = func.count(BuildGuide.id)
+    groups = db.query(
+        BuildGuide.difficulty,
+        BuildGuide.play_style,
+        count,
+        count.filter(BuildGuide.is_published == True),
+        func.sum(BuildGuide.rating),
+        func.count(BuildGuide.rating)
+    ).group_by(BuildGuide.difficulty, BuildGuide.play_style).all()
     
-    # Статистика по стилю игры
-    play_style_stats = {}
-    styles = db.query(BuildGuide.play_style, func.count(BuildGuide.id)).group_by(BuildGuide.play_style).all()
-    for style, count in styles:
-        play_style_stats[style] = count
+    difficulty_stats: Dict[Optional[str], int] = {}
+    play_style_stats: Dict[Optional[str], int] = {}
+    for difficulty, play_style, total, *_ in groups:
+        difficulty_stats[difficulty] = difficulty_stats.get(difficulty, 0) + total
+        play_style_stats[play_style] = play_style_stats.get(play_style, 0) + total
     
-    # Средний рейтинг
-    avg_rating = db.query(func.avg(BuildGuide.rating)).scalar() or 0.0
+    rating_sum = sum(row[4] or 0 for row in groups)
+    rating_count = sum(row[5] for row in groups)
     
     return {
-        "total_guides": total_guides,
-        "published_guides": published_guides,
+        "total_guides": sum(row[2] for row in groups),
+        "published_guides": sum(row[3] for row in groups),
         "guides_by_difficulty": difficulty_stats,
         "guides_by_play_style": play_style_stats,
-        "avg_rating": float(avg_rating)
+        "avg_rating": float(rating_sum / rating_count) if rating_count else 0.0
     }
\ No newline at end of file
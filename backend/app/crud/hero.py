@@ -1,8 +1,16 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
-from typing import List, Optional
-from app.models import Hero, HeroCounter, HeroSynergy, BuildGuide
-from app.schemas.hero import HeroCreate, HeroUpdate
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, bindparam, distinct, exists, func, update
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from app.core import cache
+from app.core.database import dialect_insert
+from app.core.matchups import matchup_matrix
+from app.core.pagination import paginate
+from app.core.search import apply_search, document_changed, document_removed, fetch_page
+from app.models import Hero, HeroCounter, HeroSynergy, HeroStatSnapshot, HeroStatDaily, BuildGuide
+from app.crud.guide import GUIDES_ORDER
+from app.schemas.hero import HeroCreate, HeroUpdate, HeroStatSnapshotCreate
+from app.schemas.search import HeroSearchFilters
 
 def get_hero(db: Session, hero_id: int) -> Optional[Hero]:
     """Получить героя по ID"""
@@ -26,7 +34,7 @@ def get_heroes(
         query = query.filter(Hero.role == role)
     
     if search:
-        query = query.filter(Hero.name.ilike(f"%{search}%"))
+        query = apply_search(db, "hero", query, search)
     
     return query.offset(skip).limit(limit).all()
 
@@ -35,7 +43,10 @@ def create_hero(db: Session, hero: HeroCreate) -> Hero:
     db_hero = Hero(**hero.model_dump())
     db.add(db_hero)
     db.commit()
+    cache.invalidate("heroes")
+    matchup_matrix.invalidate()
     db.refresh(db_hero)
+    document_changed(db, "hero", db_hero)
     return db_hero
 
 def update_hero(db: Session, hero_id: int, hero_update: HeroUpdate) -> Optional[Hero]:
@@ -49,7 +60,10 @@ def update_hero(db: Session, hero_id: int, hero_update: HeroUpdate) -> Optional[
         setattr(db_hero, field, value)
     
     db.commit()
+    cache.invalidate("heroes")
+    matchup_matrix.invalidate()
     db.refresh(db_hero)
+    document_changed(db, "hero", db_hero)
     return db_hero
 
 def delete_hero(db: Session, hero_id: int) -> bool:
@@ -60,27 +74,210 @@ def delete_hero(db: Session, hero_id: int) -> bool:
     
     db.delete(db_hero)
     db.commit()
+    cache.invalidate("heroes")
+    matchup_matrix.invalidate()
+    document_removed(db, "hero", hero_id)
     return True
 
+# Колонки, без которых героя нельзя создать (только обновить)
+HERO_REQUIRED_COLUMNS = {"name", "role", "specialty"}
+
+def upsert_heroes(db: Session, rows: List[Dict[str, Any]]) -> Tuple[int, int, int]:
+    """Пакетно создать или обновить героев по имени; возвращает (создано, обновлено, пропущено).
+
+    Полные строки с одинаковым набором колонок уходят одним INSERT ... ON
+    CONFLICT (name) DO UPDATE. Строки без role/specialty (например, только
+    свежие win/pick/ban rate) обновляют существующих героев одним пакетным
+    UPDATE; такие строки для неизвестных героев пропускаются.
+    """
+    # Одно имя дважды в одном INSERT ... ON CONFLICT недопустимо — берется последняя строка
+    by_name = {row["name"]: row for row in rows}
+    if not by_name:
+        return 0, 0, 0
+
+    existing = {
+        name for (name,) in db.query(Hero.name).filter(Hero.name.in_(list(by_name)))
+    }
+
+    upserts: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    updates: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    skipped = 0
+    for name, row in by_name.items():
+        columns = tuple(sorted(row))
+        if HERO_REQUIRED_COLUMNS <= row.keys():
+            upserts.setdefault(columns, []).append(row)
+        elif name in existing:
+            updates.setdefault(columns, []).append(row)
+        else:
+            skipped += 1
+
+    for columns, group in upserts.items():
+        insert = dialect_insert(db, Hero.__table__)
+        changes = {column: insert.excluded[column] for column in columns if column != "name"}
+        changes["updated_at"] = func.now()
+        db.execute(insert.values(group).on_conflict_do_update(index_elements=["name"], set_=changes))
+
+    for columns, group in updates.items():
+        statement = (
+            update(Hero.__table__)
+            .where(Hero.name == bindparam("_name"))
+            .values({
+                **{column: bindparam(column) for column in columns if column != "name"},
+                "updated_at": func.now()
+            })
+        )
+        db.execute(statement, [{**row, "_name": row["name"]} for row in group])
+
+    db.commit()
+    cache.invalidate("heroes")
+    matchup_matrix.invalidate()
+    # Пакетные INSERT/UPDATE идут мимо ORM — индексы поиска и автодополнения обновляются явно
+    for db_hero in db.query(Hero).filter(Hero.name.in_(list(by_name))):
+        document_changed(db, "hero", db_hero)
+    created = sum(1 for group in upserts.values() for row in group if row["name"] not in existing)
+    return created, len(by_name) - created - skipped, skipped
+
+STAT_FIELDS = ("win_rate", "pick_rate", "ban_rate")
+
+def _utc_day(moment: datetime) -> date:
+    return moment.astimezone(timezone.utc).date() if moment.tzinfo else moment.date()
+
+def _rollup(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Дневные агрегаты пакета замеров"""
+    days: Dict[Tuple[int, date], Dict[str, Any]] = {}
+    for row in sorted(rows, key=lambda row: row["captured_at"]):
+        key = (row["hero_id"], _utc_day(row["captured_at"]))
+        daily = days.setdefault(key, {"hero_id": key[0], "day": key[1], "samples": 0, "patch": None,
+                                      **{field: 0.0 for field in STAT_FIELDS}})
+        daily["samples"] += 1
+        daily["patch"] = row["patch"] or daily["patch"]
+        for field in STAT_FIELDS:
+            daily[field] += row[field]
+    for daily in days.values():
+        for field in STAT_FIELDS:
+            daily[field] /= daily["samples"]
+    return list(days.values())
+
+def ingest_hero_stats(db: Session, snapshots: List[HeroStatSnapshotCreate]) -> Dict[str, int]:
+    """Записать пакет замеров, обновить дневные агрегаты и текущие значения героев.
+
+    Уже загруженные замеры (тот же герой и время) и замеры неизвестных героев
+    пропускаются, поэтому повторная отправка пакета безопасна.
+    """
+    rows = [snapshot.model_dump() for snapshot in snapshots]
+    hero_ids = {row["hero_id"] for row in rows}
+    known = {hero_id for (hero_id,) in db.query(Hero.id).filter(Hero.id.in_(hero_ids))} if hero_ids else set()
+    valid = [row for row in rows if row["hero_id"] in known]
+    if not valid:
+        return {"received": len(rows), "ingested": 0, "skipped": len(rows)}
+
+    inserted = db.execute(
+        dialect_insert(db, HeroStatSnapshot.__table__)
+        .values(valid)
+        .on_conflict_do_nothing(index_elements=["hero_id", "captured_at"])
+        .returning(*(HeroStatSnapshot.__table__.c[column] for column in ("hero_id", "captured_at", "patch", *STAT_FIELDS)))
+    ).mappings().all()
+
+    if inserted:
+        # Средние за день сливаются с уже накопленными с весом по числу замеров
+        daily = HeroStatDaily.__table__
+        insert = dialect_insert(db, daily)
+        total = daily.c.samples + insert.excluded.samples
+        db.execute(insert.values(_rollup(inserted)).on_conflict_do_update(
+            index_elements=["hero_id", "day"],
+            set_={
+                "samples": total,
+                "patch": func.coalesce(insert.excluded.patch, daily.c.patch),
+                **{
+                    field: (daily.c[field] * daily.c.samples + insert.excluded[field] * insert.excluded.samples) / total
+                    for field in STAT_FIELDS
+                }
+            }
+        ))
+
+        # Текущие значения героя — последний замер, если позже него данных нет
+        latest: Dict[int, Any] = {}
+        for row in inserted:
+            if row["hero_id"] not in latest or row["captured_at"] > latest[row["hero_id"]]["captured_at"]:
+                latest[row["hero_id"]] = row
+        for hero_id, row in latest.items():
+            # Сравнение по полному времени: в тот же день мог быть загружен более поздний замер
+            newer = exists().where(and_(
+                HeroStatSnapshot.hero_id == hero_id,
+                HeroStatSnapshot.captured_at > row["captured_at"]
+            ))
+            db.execute(
+                update(Hero).where(Hero.id == hero_id, ~newer)
+                .values({field: row[field] for field in STAT_FIELDS})
+                .execution_options(synchronize_session=False)
+            )
+
+    db.commit()
+    cache.invalidate("heroes")
+    matchup_matrix.invalidate()
+    return {"received": len(rows), "ingested": len(inserted), "skipped": len(rows) - len(inserted)}
+
+def get_hero_stat_history(db: Session, hero_id: int, days: int = 30) -> List[HeroStatDaily]:
+    """Дневные агрегаты героя за последние days дней"""
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    return (
+        db.query(HeroStatDaily)
+        .filter(HeroStatDaily.hero_id == hero_id, HeroStatDaily.day >= since)
+        .order_by(HeroStatDaily.day)
+        .all()
+    )
+
+def get_hero_patch_stats(db: Session, hero_id: int, limit: int = 5) -> List[Dict[str, Any]]:
+    """Средние показатели героя за последние limit патчей (из дневных агрегатов)"""
+    samples = func.sum(HeroStatDaily.samples)
+    rows = (
+        db.query(
+            HeroStatDaily.patch,
+            samples.label("samples"),
+            *(
+                (func.sum(HeroStatDaily.__table__.c[field] * HeroStatDaily.samples) / samples).label(field)
+                for field in STAT_FIELDS
+            ),
+            func.min(HeroStatDaily.day).label("first_day"),
+            func.max(HeroStatDaily.day).label("last_day")
+        )
+        .filter(HeroStatDaily.hero_id == hero_id, HeroStatDaily.patch.isnot(None))
+        .group_by(HeroStatDaily.patch)
+        .order_by(func.max(HeroStatDaily.day).desc())
+        .limit(limit)
+        .all()
+    )
+    return [row._asdict() for row in rows]
+
 def get_hero_counters(db: Session, hero_id: int) -> List[HeroCounter]:
     """Получить контрпики для героя"""
-    return db.query(HeroCounter).filter(HeroCounter.hero_id == hero_id).all()
+    return (
+        db.query(HeroCounter)
+        .options(joinedload(HeroCounter.counter_hero))
+        .filter(HeroCounter.hero_id == hero_id)
+        .all()
+    )
 
 def get_hero_synergies(db: Session, hero_id: int) -> List[HeroSynergy]:
     """Получить союзников для героя"""
-    return db.query(HeroSynergy).filter(HeroSynergy.hero_id == hero_id).all()
-
-def get_hero_guides(db: Session, hero_id: int, skip: int = 0, limit: int = 20) -> List[BuildGuide]:
-    """Получить гайды для героя"""
     return (
-        db.query(BuildGuide)
-        .filter(BuildGuide.hero_id == hero_id, BuildGuide.is_published == True)
-        .order_by(BuildGuide.rating.desc())
-        .offset(skip)
-        .limit(limit)
+        db.query(HeroSynergy)
+        .options(joinedload(HeroSynergy.synergy_hero))
+        .filter(HeroSynergy.hero_id == hero_id)
         .all()
     )
 
+def get_hero_guides(
+    db: Session,
+    hero_id: int,
+    skip: int = 0,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> List[BuildGuide]:
+    """Получить гайды для героя"""
+    query = db.query(BuildGuide).filter(BuildGuide.hero_id == hero_id, BuildGuide.is_published == True)
+    return paginate(query, GUIDES_ORDER, skip, limit, cursor).all()
+
 def get_hero_roles(db: Session) -> List[str]:
     """Получить список всех ролей героев"""
     roles = db.query(distinct(Hero.role)).all()
@@ -88,20 +285,20 @@ def get_hero_roles(db: Session) -> List[str]:
 
 def get_heroes_stats(db: Session) -> dict:
     """Получить общую статистику по героям"""
-    total_heroes = db.query(Hero).count()
+    # Количество и суммы для средних — один запрос с группировкой по роли
+    roles = db.query(
+        Hero.role,
+        func.count(Hero.id),
+        func.sum(Hero.win_rate),
+        func.count(Hero.win_rate),
+        func.sum(Hero.pick_rate),
+        func.count(Hero.pick_rate)
+    ).group_by(Hero.role).all()
     
-    # Подсчет героев по ролям
-    roles_count = {}
-    roles = get_hero_roles(db)
-    for role in roles:
-        count = db.query(Hero).filter(Hero.role == role).count()
-        roles_count[role] = count
-    
-    # Средние показатели
-    avg_stats = db.query(
-        func.avg(Hero.win_rate),
-        func.avg(Hero.pick_rate)
-    ).first()
+    win_rate_sum = sum(row[2] or 0 for row in roles)
+    win_rate_count = sum(row[3] for row in roles)
+    pick_rate_sum = sum(row[4] or 0 for row in roles)
+    pick_rate_count = sum(row[5] for row in roles)
     
     # Самые популярные герои
     most_picked = (
@@ -120,22 +317,35 @@ def get_heroes_stats(db: Session) -> dict:
     )
     
     return {
-        "total_heroes": total_heroes,
-        "roles_count": roles_count,
-        "avg_win_rate": float(avg_stats[0]) if avg_stats[0] else 0.0,
-        "avg_pick_rate": float(avg_stats[1]) if avg_stats[1] else 0.0,
+        "total_heroes": sum(row[1] for row in roles),
+        "roles_count": {role: total for role, total, *_ in roles},
+        "avg_win_rate": float(win_rate_sum / win_rate_count) if win_rate_count else 0.0,
+        "avg_pick_rate": float(pick_rate_sum / pick_rate_count) if pick_rate_count else 0.0,
         "most_picked": [hero[0] for hero in most_picked],
         "highest_win_rate": [hero[0] for hero in highest_win_rate]
     }
 
-def search_heroes(db: Session, query: str, limit: int = 10) -> List[Hero]:
-    """Поиск героев по имени или специальности"""
-    return (
-        db.query(Hero)
-        .filter(
-            Hero.name.ilike(f"%{query}%") | 
-            Hero.specialty.ilike(f"%{query}%")
-        )
-        .limit(limit)
-        .all()
-    )
\ No newline at end of file
+def _search_heroes_query(db: Session, query: str, filters: Optional[HeroSearchFilters]):
+    search_query = db.query(Hero)
+    if filters and filters.role:
+        search_query = search_query.filter(Hero.role == filters.role)
+    return apply_search(db, "hero", search_query, query)
+
+def search_heroes(
+    db: Session,
+    query: str,
+    limit: int = 10,
+    filters: Optional[HeroSearchFilters] = None
+) -> List[Hero]:
+    """Поиск героев по имени, специальности или роли"""
+    return _search_heroes_query(db, query, filters).limit(limit).all()
+
+def search_heroes_page(
+    db: Session,
+    query: str,
+    filters: Optional[HeroSearchFilters] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> Tuple[List[Hero], int]:
+    """Страница поиска героев и общее число найденных"""
+    return fetch_page(_search_heroes_query(db, query, filters), skip, limit)
\ No newline at end of file
@@ -1,15 +1,22 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
+from sqlalchemy import bindparam, func, desc, update
+from typing import Dict, List, Optional
+from app.core import cache
+from app.core.pagination import KeysetOrder, paginate
+from app.core.search import apply_search, document_changed, document_removed
 from app.models import News
 from app.schemas.news import NewsCreate, NewsUpdate
 
+# Порядок сортировки для курсорной пагинации (app.core.pagination)
+NEWS_ORDER = KeysetOrder("news", News.created_at, News.id)
+
 def get_news(
     db: Session,
     skip: int = 0,
     limit: int = 20,
     category: Optional[str] = None,
-    featured: Optional[bool] = None
+    featured: Optional[bool] = None,
+    cursor: Optional[str] = None
 ) -> List[News]:
     """Получить новости с фильтрацией"""
     query = db.query(News)
@@ -20,7 +27,8 @@ def get_news(
     if featured is not None:
         query = query.filter(News.is_featured == featured)
     
-    return query.filter(News.is_published == True).order_by(desc(News.created_at)).offset(skip).limit(limit).all()
+    query = query.filter(News.is_published == True)
+    return paginate(query, NEWS_ORDER, skip, limit, cursor).all()
 
 def get_news_by_id(db: Session, news_id: int) -> Optional[News]:
     """Получить новость по ID"""
@@ -34,12 +42,14 @@ def create_news(db: Session, news: NewsCreate, author_id: int) -> News:
     db_news = News(**news_data)
     db.add(db_news)
     db.commit()
+    cache.invalidate("news")
     db.refresh(db_news)
+    document_changed(db, "news", db_news)
     return db_news
 
 def update_news(db: Session, news_id: int, news_update: NewsUpdate) -> Optional[News]:
     """Обновить новость"""
-    db_news = get_news(db=db, news_id=news_id)
+    db_news = get_news_by_id(db, news_id)
     if not db_news:
         return None
     
@@ -48,28 +58,37 @@ def update_news(db: Session, news_id: int, news_update: NewsUpdate) -> Optional[
         setattr(db_news, field, value)
     
     db.commit()
+    cache.invalidate("news")
     db.refresh(db_news)
+    document_changed(db, "news", db_news)
     return db_news
 
 def delete_news(db: Session, news_id: int) -> bool:
     """Удалить новость"""
-    db_news = get_news(db=db, news_id=news_id)
+    db_news = get_news_by_id(db, news_id)
     if not db_news:
         return False
     
     db.delete(db_news)
     db.commit()
+    cache.invalidate("news")
+    document_removed(db, "news", news_id)
     return True
 
-def increment_views(db: Session, news_id: int) -> bool:
-    """Увеличить счетчик просмотров"""
-    db_news = get_news(db=db, news_id=news_id)
-    if not db_news:
-        return False
+def increment_views(db: Session, counts: Dict[int, int]) -> int:
+    """Атомарно прибавить накопленные просмотры: views = views + n"""
+    if not counts:
+        return 0
     
-    db_news.views += 1
+    table = News.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(views=func.coalesce(table.c.views, 0) + bindparam("b_views"))
+    )
+    db.execute(stmt, [{"b_id": object_id, "b_views": n} for object_id, n in counts.items()])
     db.commit()
-    return True
+    return len(counts)
 
 def get_featured_news(db: Session, limit: int = 5) -> List[News]:
     """Получить рекомендуемые новости"""
@@ -81,15 +100,10 @@ def get_featured_news(db: Session, limit: int = 5) -> List[News]:
         .all()
     )
 
-def get_latest_news(db: Session, limit: int = 10) -> List[News]:
+def get_latest_news(db: Session, limit: int = 10, cursor: Optional[str] = None) -> List[News]:
     """Получить последние новости"""
-    return (
-        db.query(News)
-        .filter(News.is_published == True)
-        .order_by(desc(News.created_at))
-        .limit(limit)
-        .all()
-    )
+    query = db.query(News).filter(News.is_published == True)
+    return paginate(query, NEWS_ORDER, 0, limit, cursor).all()
 
 def get_news_categories(db: Session) -> List[str]:
     """Получить список категорий новостей"""
@@ -97,13 +111,9 @@ def get_news_categories(db: Session) -> List[str]:
     return [cat[0] for cat in categories if cat[0]]
 
 def search_news(db: Session, query: str, limit: int = 10) -> List[News]:
-    """Поиск новостей по заголовку или содержанию"""
+    """Поиск новостей по заголовку, анонсу или содержанию"""
     return (
-        db.query(News)
-        .filter(
-            News.is_published == True,
-            News.title.ilike(f"%{query}%") | News.content.ilike(f"%{query}%")
-        )
+        apply_search(db, "news", db.query(News).filter(News.is_published == True), query)
         .order_by(desc(News.created_at))
         .limit(limit)
         .all()
@@ -111,19 +121,19 @@ def search_news(db: Session, query: str, limit: int = 10) -> List[News]:
 
 def get_news_stats(db: Session) -> dict:
     """Получить статистику по новостям"""
-    total_news = db.query(News).count()
-    published_news = db.query(News).filter(News.is_published == True).count()
-    featured_news = db.query(News).filter(News.is_featured == True).count()
-    
-    # Статистика по категориям
-    category_stats = {}
-    categories = db.query(News.category, func.count(News.id)).group_by(News.category).all()
-    for cat, count in categories:
-        if cat:
-            category_stats[cat] = count
+    # Все счетчики — один запрос с группировкой по категории
+    count = func.count(News.id)
+    categories = db.query(
+        News.category,
+        count,
+        count.filter(News.is_published == True),
+        count.filter(News.is_featured == True),
+        func.sum(News.views),
+        func.count(News.views)
+    ).group_by(News.category).all()
     
-    # Среднее количество просмотров
-    avg_views = db.query(func.avg(News.views)).scalar() or 0.0
+    views_sum = sum(row[4] or 0 for row in categories)
+    views_count = sum(row[5] for row in categories)
     
     # Самые популярные новости
     most_popular = (
@@ -135,10 +145,10 @@ def get_news_stats(db: Session) -> dict:
     )
     
     return {
-        "total_news": total_news,
-        "published_news": published_news,
-        "featured_news": featured_news,
-        "news_by_category": category_stats,
-        "avg_views": float(avg_views),
+        "total_news": sum(row[1] for row in categories),
+        "published_news": sum(row[2] for row in categories),
+        "featured_news": sum(row[3] for row in categories),
+        "news_by_category": {category: total for category, total, *_ in categories if category},
+        "avg_views": float(views_sum / views_count) if views_count else 0.0,
         "most_popular": [news[0] for news in most_popular]
     }
\ No newline at end of file
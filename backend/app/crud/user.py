@@ -1,10 +1,17 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime, timedelta
 from app.models import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.schemas.search import UserSearchFilters
+from app.core import cache
+from app.core.security import get_password_hash, invalidate_user_cache, verify_password
+from app.core.pagination import KeysetOrder, paginate
+from app.core.search import apply_search, document_changed, document_removed, fetch_page
+
+# Порядок сортировки для курсорной пагинации (app.core.pagination)
+USERS_ORDER = KeysetOrder("users", User.id, descending=False)
 
 def get_user(db: Session, user_id: int) -> Optional[User]:
     """Получить пользователя по ID"""
@@ -18,13 +25,13 @@ def get_user_by_username(db: Session, username: str) -> Optional[User]:
     """Получить пользователя по username"""
     return db.query(User).filter(User.username == username).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
+def get_users(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[User]:
     """Получить список пользователей"""
-    return db.query(User).offset(skip).limit(limit).all()
+    return paginate(db.query(User), USERS_ORDER, skip, limit, cursor).all()
 
-def create_user(db: Session, user: UserCreate) -> User:
-    """Создать нового пользователя"""
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+    """Создать нового пользователя (hashed_password — уже посчитанный хеш user.password)"""
+    hashed_password = hashed_password or get_password_hash(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -35,27 +42,38 @@ def create_user(db: Session, user: UserCreate) -> User:
     )
     db.add(db_user)
     db.commit()
+    cache.invalidate("users")
     db.refresh(db_user)
+    document_changed(db, "user", db_user)
     return db_user
 
-def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
-    """Обновить пользователя"""
+def update_user(
+    db: Session,
+    user_id: int,
+    user_update: UserUpdate,
+    hashed_password: Optional[str] = None
+) -> Optional[User]:
+    """Обновить пользователя (hashed_password — уже посчитанный хеш нового пароля)"""
     db_user = get_user(db, user_id)
     if not db_user:
         return None
     
     update_data = user_update.model_dump(exclude_unset=True)
+    usernames = {db_user.username, update_data.get("username") or db_user.username}
     
     # Если обновляется пароль, нужно его захешировать
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data["password"])
+        update_data["hashed_password"] = hashed_password or get_password_hash(update_data["password"])
         del update_data["password"]
     
     for field, value in update_data.items():
         setattr(db_user, field, value)
     
     db.commit()
+    cache.invalidate("users")
+    invalidate_user_cache(*usernames)
     db.refresh(db_user)
+    document_changed(db, "user", db_user)
     return db_user
 
 def delete_user(db: Session, user_id: int) -> bool:
@@ -64,8 +82,12 @@ def delete_user(db: Session, user_id: int) -> bool:
     if not db_user:
         return False
     
+    username = db_user.username
     db.delete(db_user)
     db.commit()
+    cache.invalidate("users")
+    invalidate_user_cache(username)
+    document_removed(db, "user", user_id)
     return True
 
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
@@ -79,46 +101,46 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
 
 
 def get_user_stats(db: Session) -> dict:
-    """Получить статистику пользователей"""
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
-    content_creators = db.query(User).filter(User.role == "Content Creator").count()
-    moderators = db.query(User).filter(User.role == "Moderator").count()
-    admins = db.query(User).filter(User.role == "Admin").count()
-    
-    # Новые пользователи за сегодня
-    today = datetime.now().date()
-    new_users_today = db.query(User).filter(
-        func.date(User.created_at) == today
-    ).count()
-    
-    # Новые пользователи за неделю
+    """Получить статистику пользователей (один агрегирующий запрос)"""
+    # Диапазон по created_at вместо func.date(created_at) — по нему работает индекс
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     week_ago = datetime.now() - timedelta(days=7)
-    new_users_this_week = db.query(User).filter(
-        User.created_at >= week_ago
-    ).count()
-    
-    return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "content_creators": content_creators,
-        "moderators": moderators,
-        "admins": admins,
-        "new_users_today": new_users_today,
-        "new_users_this_week": new_users_this_week
-    }
-
-def search_users(db: Session, query: str, limit: int = 10) -> List[User]:
-    """Поиск пользователей"""
-    return (
-        db.query(User)
-        .filter(
-            User.username.ilike(f"%{query}%") |
-            User.ign.ilike(f"%{query}%")
-        )
-        .limit(limit)
-        .all()
-    )
+    count = func.count(User.id)
+    stats = db.query(
+        count.label("total_users"),
+        count.filter(User.is_active == True).label("active_users"),
+        count.filter(User.role == "Content Creator").label("content_creators"),
+        count.filter(User.role == "Moderator").label("moderators"),
+        count.filter(User.role == "Admin").label("admins"),
+        count.filter(User.created_at >= today).label("new_users_today"),
+        count.filter(User.created_at >= week_ago).label("new_users_this_week")
+    ).one()
+    return stats._asdict()
+
+def _search_users_query(db: Session, query: str, filters: Optional[UserSearchFilters]):
+    search_query = db.query(User)
+    if filters and filters.role:
+        search_query = search_query.filter(User.role == filters.role)
+    return apply_search(db, "user", search_query, query)
+
+def search_users(
+    db: Session,
+    query: str,
+    limit: int = 10,
+    filters: Optional[UserSearchFilters] = None
+) -> List[User]:
+    """Поиск пользователей по username или IGN"""
+    return _search_users_query(db, query, filters).limit(limit).all()
+
+def search_users_page(
+    db: Session,
+    query: str,
+    filters: Optional[UserSearchFilters] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> Tuple[List[User], int]:
+    """Страница поиска пользователей и общее число найденных"""
+    return fetch_page(_search_users_query(db, query, filters), skip, limit)
 
 def get_users_by_role(db: Session, role: str, skip: int = 0, limit: int = 20) -> List[User]:
     """Получить пользователей по роли"""
@@ -137,7 +159,10 @@ def verify_user(db: Session, user_id: int) -> bool:
         return False
     
     user.is_verified = True
+    username = user.username
     db.commit()
+    cache.invalidate("users")
+    invalidate_user_cache(username)
     return True
 
 def deactivate_user(db: Session, user_id: int) -> bool:
@@ -147,7 +172,10 @@ def deactivate_user(db: Session, user_id: int) -> bool:
         return False
     
     user.is_active = False
+    username = user.username
     db.commit()
+    cache.invalidate("users")
+    invalidate_user_cache(username)
     return True
 
 def activate_user(db: Session, user_id: int) -> bool:
@@ -157,7 +185,10 @@ def activate_user(db: Session, user_id: int) -> bool:
         return False
     
     user.is_active = True
+    username = user.username
     db.commit()
+    cache.invalidate("users")
+    invalidate_user_cache(username)
     return True
 
 def change_user_role(db: Session, user_id: int, new_role: str) -> bool:
@@ -167,5 +198,8 @@ def change_user_role(db: Session, user_id: int, new_role: str) -> bool:
         return False
     
     user.role = new_role
+    username = user.username
     db.commit()
+    cache.invalidate("users")
+    invalidate_user_cache(username)
     return True
\ No newline at end of file
@@ -1,8 +1,17 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
+from app.core.database import get_pool_status
+from app.core.autocomplete import autocomplete_index
+from app.core.hashing import hashing_pool
+from app.core.leaderboard import leaderboard
+from app.core.matchups import matchup_matrix
+from app.core.security import get_current_admin_user
+from app.core.stats import stats_registry
+from app.core.view_counter import view_counter
 from app.api.v1 import heroes, guides, users, auth, search, news
+from app.crud import guide as guide_crud, hero as hero_crud, news as news_crud, user as user_crud
 
 app = FastAPI(
     title="Mobile Legends Community API",
@@ -19,6 +28,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Курсор следующей страницы (app.core.pagination) должен быть доступен фронтенду
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Mount static files
@@ -32,6 +43,33 @@ app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
 app.include_router(news.router, prefix="/api/v1/news", tags=["news"])
 
+# Пакетная запись буферизованных просмотров
+view_counter.register("guide", guide_crud.increment_views)
+view_counter.register("news", news_crud.increment_views)
+
+# Предвычисленные сводки /stats/overview
+stats_registry.register("heroes", "heroes", hero_crud.get_heroes_stats)
+stats_registry.register("guides", "guides", guide_crud.get_guide_stats)
+stats_registry.register("news", "news", news_crud.get_news_stats)
+stats_registry.register("users", "users", user_crud.get_user_stats)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    view_counter.start()
+    await autocomplete_index.start()
+    await matchup_matrix.start()
+    await stats_registry.start()
+    await leaderboard.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await view_counter.stop()
+    await autocomplete_index.stop()
+    await matchup_matrix.stop()
+    await stats_registry.stop()
+    await leaderboard.stop()
+    hashing_pool.shutdown()
+
 @app.get("/api/health")
 async def health_check():
     return {
@@ -41,6 +79,13 @@ async def health_check():
         "message": "Mobile Legends Community Platform is running"
     }
 
+@app.get("/api/metrics", dependencies=[Depends(get_current_admin_user)])
+async def metrics():
+    return {
+        "db_pool": get_pool_status(),
+        "password_hashing": hashing_pool.snapshot()
+    }
+
 @app.get("/")
 async def root():
     return {
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, JSON, Text, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, JSON, Text, Float, Date, DateTime, Boolean, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
+from app.core import trending
 from app.core.database import Base
 
+# Условие частичных индексов: почти все публичные запросы читают только опубликованное
+PUBLISHED_ONLY = {"postgresql_where": text("is_published"), "sqlite_where": text("is_published")}
+
 class User(Base):
     __tablename__ = "users"
     
@@ -13,7 +17,7 @@ class User(Base):
     ign = Column(String(100))  # In-Game Name
     current_rank = Column(String(50))  # Warrior, Elite, Master, etc.
     main_heroes = Column(JSON)  # List of main hero IDs
-    role = Column(String(50), default="User")  # User, Content Creator, Moderator, Admin
+    role = Column(String(50), default="User", index=True)  # User, Content Creator, Moderator, Admin
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -29,7 +33,7 @@ class Hero(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), unique=True, index=True, nullable=False)
-    role = Column(String(50), nullable=False)  # Tank, Assassin, Mage, Marksman, Support, Fighter
+    role = Column(String(50), nullable=False, index=True)  # Tank, Assassin, Mage, Marksman, Support, Fighter
     specialty = Column(String(100), nullable=False)
     lane = Column(JSON)  # ['EXP', 'Gold', 'Mid', 'Jungle', 'Roam']
     
@@ -96,6 +100,17 @@ class Emblem(Base):
 
 class BuildGuide(Base):
     __tablename__ = "build_guides"
+    __table_args__ = (
+        # Списки и курсорная пагинация (app.core.pagination): (фильтр, ключ сортировки, id)
+        Index("ix_build_guides_hero_rating_published", "hero_id", text("rating DESC"), text("id DESC"), **PUBLISHED_ONLY),
+        Index("ix_build_guides_rating_published", text("rating DESC"), text("id DESC"), **PUBLISHED_ONLY),
+        Index("ix_build_guides_trending_day_published", text("trending_day DESC"), text("id DESC"), **PUBLISHED_ONLY),
+        Index("ix_build_guides_trending_week_published", text("trending_week DESC"), text("id DESC"), **PUBLISHED_ONLY),
+        Index("ix_build_guides_created_published", text("created_at DESC"), text("id DESC"), **PUBLISHED_ONLY),
+        Index("ix_build_guides_author_created_id", "author_id", "created_at", "id"),
+        # Фильтры поиска гайдов (app.schemas.search.GuideSearchFilters)
+        Index("ix_build_guides_difficulty_style_published", "difficulty", "play_style", **PUBLISHED_ONLY),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     hero_id = Column(Integer, ForeignKey("heroes.id"), nullable=False)
@@ -112,10 +127,14 @@ class BuildGuide(Base):
     tags = Column(JSON)  # ["meta", "off-meta", "rank-specific"]
     
     # Статистика
-    views = Column(Integer, default=0)
-    likes = Column(Integer, default=0)
-    rating = Column(Float, default=0.0)
+    views = Column(Integer, default=0, nullable=False)
+    likes = Column(Integer, default=0, nullable=False)
+    rating = Column(Float, default=0.0, nullable=False)
     rating_count = Column(Integer, default=0)
+    rating_sum = Column(Integer, default=0)  # сумма оценок для инкрементального среднего
+    # Затухающая популярность за сутки/неделю в логарифмической шкале (app.core.trending)
+    trending_day = Column(Float, default=lambda: trending.initial_score("trending_day"), server_default="0", nullable=False)
+    trending_week = Column(Float, default=lambda: trending.initial_score("trending_week"), server_default="0", nullable=False)
     
     is_published = Column(Boolean, default=False)
     version = Column(String(20), default="1.0")
@@ -128,9 +147,13 @@ class BuildGuide(Base):
     author = relationship("User", back_populates="guides")
     comments = relationship("Comment", back_populates="guide")
     ratings = relationship("GuideRating", back_populates="guide")
+    liked_by = relationship("GuideLike", back_populates="guide", passive_deletes=True)
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index("ix_comments_guide_approved_created_id", "guide_id", "is_approved", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     guide_id = Column(Integer, ForeignKey("build_guides.id"), nullable=False)
@@ -151,6 +174,9 @@ class Comment(Base):
 
 class GuideRating(Base):
     __tablename__ = "guide_ratings"
+    __table_args__ = (
+        UniqueConstraint("guide_id", "user_id", name="uq_guide_ratings_guide_user"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     guide_id = Column(Integer, ForeignKey("build_guides.id"), nullable=False)
@@ -164,6 +190,56 @@ class GuideRating(Base):
     guide = relationship("BuildGuide", back_populates="ratings")
     user = relationship("User")
 
+class GuideLike(Base):
+    __tablename__ = "guide_likes"
+    __table_args__ = (
+        UniqueConstraint("guide_id", "user_id", name="uq_guide_likes_guide_user"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    guide_id = Column(Integer, ForeignKey("build_guides.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    guide = relationship("BuildGuide", back_populates="liked_by")
+    user = relationship("User")
+
+class AuthorStats(Base):
+    """Проекция статистики автора по опубликованным гайдам.
+
+    Просмотры и лайки прибавляются инкрементально, остальное пересчитывается
+    одним агрегирующим запросом при публикации, удалении и оценке гайда.
+    """
+    __tablename__ = "author_stats"
+    __table_args__ = (
+        Index("ix_author_stats_views", text("total_views DESC"), text("author_id DESC")),
+        Index("ix_author_stats_likes", text("total_likes DESC"), text("author_id DESC")),
+    )
+    
+    author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    guides_count = Column(Integer, default=0, nullable=False)
+    total_views = Column(Integer, default=0, nullable=False)
+    total_likes = Column(Integer, default=0, nullable=False)
+    # Для среднего рейтинга: гайды с оценкой и сумма их рейтингов
+    rated_guides = Column(Integer, default=0, nullable=False)
+    rating_total = Column(Float, default=0.0, nullable=False)
+
+class AuthorLeaderboard(Base):
+    """Снимок рейтинга авторов; пересчитывается периодически целиком"""
+    __tablename__ = "author_leaderboard"
+    __table_args__ = (
+        # Страница рейтинга — диапазон по rank, позиция автора — поиск по PK
+        Index("ix_author_leaderboard_rank", "rank", unique=True),
+    )
+    
+    author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    guides_count = Column(Integer, nullable=False)
+    computed_at = Column(DateTime(timezone=True), nullable=False)
+
 class HeroCounter(Base):
     __tablename__ = "hero_counters"
     
@@ -190,8 +266,47 @@ class HeroSynergy(Base):
     hero = relationship("Hero", foreign_keys=[hero_id], back_populates="synergies")
     synergy_hero = relationship("Hero", foreign_keys=[synergy_hero_id])
 
+class HeroStatSnapshot(Base):
+    """Сырые замеры win/pick/ban rate (временной ряд, только добавление)"""
+    __tablename__ = "hero_stat_snapshots"
+    __table_args__ = (
+        # Строки пишутся по возрастанию времени, поэтому BRIN по captured_at
+        # занимает несколько страниц и отсекает диапазоны не хуже B-tree
+        Index("ix_hero_stat_snapshots_captured_brin", "captured_at", postgresql_using="brin"),
+    )
+    
+    # Повторная загрузка того же замера не создает дубль
+    hero_id = Column(Integer, ForeignKey("heroes.id", ondelete="CASCADE"), primary_key=True)
+    captured_at = Column(DateTime(timezone=True), primary_key=True)
+    win_rate = Column(Float(precision=24), nullable=False)  # real: 4 байта на значение
+    pick_rate = Column(Float(precision=24), nullable=False)
+    ban_rate = Column(Float(precision=24), nullable=False)
+    patch = Column(String(20))
+
+class HeroStatDaily(Base):
+    """Дневные агрегаты замеров: из них строятся графики и сводки по патчам"""
+    __tablename__ = "hero_stat_daily"
+    
+    hero_id = Column(Integer, ForeignKey("heroes.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    samples = Column(Integer, nullable=False)
+    # Средние за день
+    win_rate = Column(Float, nullable=False)
+    pick_rate = Column(Float, nullable=False)
+    ban_rate = Column(Float, nullable=False)
+    patch = Column(String(20))  # патч последнего замера дня
+
 class News(Base):
     __tablename__ = "news"
+    __table_args__ = (
+        Index("ix_news_created_published", text("created_at DESC"), text("id DESC"), **PUBLISHED_ONLY),
+        Index("ix_news_category_created_published", "category", text("created_at DESC"), text("id DESC"), **PUBLISHED_ONLY),
+        Index(
+            "ix_news_featured_created_published", text("created_at DESC"),
+            postgresql_where=text("is_published AND is_featured"),
+            sqlite_where=text("is_published AND is_featured")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
@@ -63,6 +63,11 @@ class GuideResponse(GuideBase):
     class Config:
         from_attributes = True
 
+class TrendingGuideResponse(GuideResponse):
+    """Гайд в выдаче трендов; оценки в логарифмической шкале, сравнимы только между собой"""
+    trending_day: float
+    trending_week: float
+
 class GuideDetail(GuideResponse):
     """Детальная информация о гайде с дополнительными данными"""
     hero_name: Optional[str] = None
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 
 class HeroBase(BaseModel):
     name: str
@@ -71,6 +71,67 @@ class HeroCounterResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class HeroCounterPick(BaseModel):
+    """Кандидат в контрпики против набора вражеских героев"""
+    id: int
+    name: str
+    role: str
+    specialty: str
+    avatar_url: Optional[str] = None
+    score: float  # суммарное преимущество в п.п. винрейта
+    matchups: int  # против скольких врагов есть статистика
+
+class DraftRecommendRequest(BaseModel):
+    """Текущее состояние драфта"""
+    allies: List[int] = Field(default_factory=list, max_length=4)
+    enemies: List[int] = Field(default_factory=list, max_length=5)
+    bans: List[int] = Field(default_factory=list, max_length=10)
+    limit: int = Field(10, ge=1, le=50)
+
+class DraftCandidate(BaseModel):
+    """Кандидат на пик с составляющими оценки (в п.п. винрейта)"""
+    id: int
+    name: str
+    role: str
+    specialty: str
+    avatar_url: Optional[str] = None
+    score: float
+    counter: float
+    synergy: float
+    role_bonus: float
+    meta: float
+
+class HeroStatSnapshotCreate(BaseModel):
+    """Замер мета-статистики героя"""
+    hero_id: int
+    captured_at: datetime
+    win_rate: float = Field(..., ge=0, le=100)
+    pick_rate: float = Field(..., ge=0, le=100)
+    ban_rate: float = Field(..., ge=0, le=100)
+    patch: Optional[str] = Field(None, max_length=20)
+
+class HeroStatPoint(BaseModel):
+    """Дневной агрегат статистики героя"""
+    day: date
+    samples: int
+    win_rate: float
+    pick_rate: float
+    ban_rate: float
+    patch: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class HeroPatchStats(BaseModel):
+    """Средние показатели героя за патч"""
+    patch: str
+    samples: int
+    win_rate: float
+    pick_rate: float
+    ban_rate: float
+    first_day: date
+    last_day: date
+
 class HeroStats(BaseModel):
     total_heroes: int
     roles_count: Dict[str, int]
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class HeroSearchFilters(BaseModel):
+    """Фильтры поиска героев"""
+    role: Optional[str] = None
+
+class GuideSearchFilters(BaseModel):
+    """Фильтры поиска гайдов"""
+    hero_id: Optional[int] = None
+    difficulty: Optional[str] = None
+    play_style: Optional[str] = None
+
+class UserSearchFilters(BaseModel):
+    """Фильтры поиска пользователей"""
+    role: Optional[str] = None
@@ -41,6 +41,10 @@ class UserProfile(UserResponse):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -52,6 +56,23 @@ class PasswordResetConfirm(BaseModel):
     token: str
     new_password: str
 
+class AuthorStatsResponse(BaseModel):
+    """Статистика автора по опубликованным гайдам"""
+    user_id: int
+    username: Optional[str] = None
+    guides_count: int
+    total_views: int
+    total_likes: int
+    average_rating: float
+
+class LeaderboardEntry(BaseModel):
+    """Место автора в рейтинге"""
+    rank: int
+    user_id: int
+    username: str
+    score: float
+    guides_count: int
+
 class UserStats(BaseModel):
     total_users: int
     active_users: int
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Скрипт для проверки числа запросов горячих эндпоинтов: падает, если
+эндпоинт начал делать лишние запросы (N+1 от ленивых загрузок).
+
+Запросы идут через приложение (TestClient), поэтому учитывается все,
+что делает обработчик: проверки существования, загрузка связей при
+сериализации ответа. Для проверки создаются свои записи (по несколько
+комментариев и контрпиков, чтобы N+1 менял число запросов), после
+проверки они удаляются. Каждый эндпоинт сначала вызывается один раз
+для прогрева матриц контрпиков и кэшей, затем число запросов
+фиксируется на повторном вызове.
+"""
+
+import sys
+import uuid
+from typing import Any, Dict, List, Tuple
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.core.querylog import assert_num_queries
+from app.main import app
+from app.models import BuildGuide, Comment, Hero, HeroCounter, User
+
+# (название, URL с id из фикстуры, ожидаемое число запросов)
+PROBES: List[Tuple[str, str, int]] = [
+    ("гайды: детальная страница", "/api/v1/guides/{guide}", 1),
+    ("гайды: комментарии", "/api/v1/guides/{guide}/comments", 2),
+    ("герои: контрпики", "/api/v1/heroes/{hero}/counters", 0),
+]
+
+def create_fixture(db: Session) -> Dict[str, Any]:
+    """Герои, автор, гайд с комментариями и контрпики для проверки"""
+    suffix = uuid.uuid4().hex[:8]
+    heroes = [Hero(name=f"qc-{suffix}-{i}", role="Mage", specialty="Burst", lane=["Mid"]) for i in range(3)]
+    author = User(email=f"qc-{suffix}@example.com", username=f"qc-{suffix}", hashed_password="-")
+    db.add_all([*heroes, author])
+    db.flush()
+
+    guide = BuildGuide(hero_id=heroes[0].id, author_id=author.id, title=f"qc-{suffix}", is_published=True)
+    db.add(guide)
+    db.flush()
+    db.add_all([
+        Comment(guide_id=guide.id, author_id=author.id, content="qc", is_approved=True)
+        for _ in range(2)
+    ])
+    db.add_all([
+        HeroCounter(hero_id=heroes[0].id, counter_hero_id=hero.id, counter_type="strong_against", win_rate=55.0)
+        for hero in heroes[1:]
+    ])
+    db.commit()
+    return {
+        "hero": heroes[0].id,
+        "heroes": [hero.id for hero in heroes],
+        "guide": guide.id,
+        "user": author.id,
+    }
+
+def drop_fixture(db: Session, ids: Dict[str, Any]):
+    """Удалить записи, созданные для проверки"""
+    db.rollback()
+    db.query(HeroCounter).filter(HeroCounter.hero_id.in_(ids["heroes"])).delete(synchronize_session=False)
+    db.query(Comment).filter(Comment.guide_id == ids["guide"]).delete(synchronize_session=False)
+    db.query(BuildGuide).filter(BuildGuide.id == ids["guide"]).delete(synchronize_session=False)
+    db.query(Hero).filter(Hero.id.in_(ids["heroes"])).delete(synchronize_session=False)
+    db.query(User).filter(User.id == ids["user"]).delete(synchronize_session=False)
+    db.commit()
+
+def check_query_counts() -> bool:
+    """Вызвать эндпоинты и сверить число запросов с ожидаемым"""
+    db: Session = SessionLocal()
+    ids = None
+    failed = 0
+
+    try:
+        ids = create_fixture(db)
+        client = TestClient(app)
+        for name, url, expected in PROBES:
+            path = url.format(**ids)
+            client.get(path)
+            try:
+                with assert_num_queries(expected):
+                    response = client.get(path)
+                if response.status_code != 200:
+                    raise AssertionError(f"{path} returned {response.status_code}")
+                print(f"✅ {name}: {expected}")
+            except AssertionError as e:
+                failed += 1
+                print(f"❌ {name}")
+                print(f"   {e}")
+
+        print(f"\n📊 Проверено эндпоинтов: {len(PROBES)}, с лишними запросами: {failed}")
+        return failed == 0
+
+    except Exception as e:
+        print(f"❌ Ошибка проверки числа запросов: {e}")
+        return False
+    finally:
+        if ids is not None:
+            drop_fixture(db, ids)
+        db.close()
+
+if __name__ == "__main__":
+    print("🔢 Проверка числа запросов")
+    print("=" * 30)
+
+    if not check_query_counts():
+        sys.exit(1)
+
+    print("\n✅ Готово!")
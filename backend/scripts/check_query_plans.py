@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Скрипт для проверки планов CRUD-запросов: падает, если горячий запрос
+перестал использовать индекс и ушел в последовательное сканирование.
+
+Запускается на PostgreSQL после миграций. Планировщику запрещается
+seq scan (enable_seqscan = off), поэтому на маленькой тестовой базе он
+все равно выберет индекс, если подходящий индекс существует; оставшийся
+Seq Scan с фильтром или сортировкой означает, что индекса нет.
+"""
+
+import json
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal, engine
+from app.core.querylog import capture_queries
+from app.crud import guide as guide_crud, hero as hero_crud, news as news_crud, user as user_crud
+from app.models import BuildGuide, Hero, News, User
+
+# (название, вызов CRUD-функции); ids — существующие id из базы
+PROBES: List[Tuple[str, Callable[[Session, Dict[str, int]], Any]]] = [
+    ("гайды: список по рейтингу", lambda db, ids: guide_crud.get_guides(db)),
+    ("гайды: по герою", lambda db, ids: guide_crud.get_guides(db, hero_id=ids["hero"])),
+    ("гайды: тренды за сутки", lambda db, ids: guide_crud.get_trending_guides(db)),
+    ("гайды: тренды за неделю", lambda db, ids: guide_crud.get_trending_guides(db, window="week")),
+    ("гайды: последние", lambda db, ids: guide_crud.get_latest_guides(db)),
+    ("гайды: автора", lambda db, ids: guide_crud.get_user_guides(db, user_id=ids["user"])),
+    ("гайды: героя", lambda db, ids: hero_crud.get_hero_guides(db, hero_id=ids["hero"])),
+    ("гайды: комментарии", lambda db, ids: guide_crud.get_guide_comments(db, guide_id=ids["guide"])),
+    ("гайды: поиск", lambda db, ids: guide_crud.search_guides(db, "build")),
+    ("новости: список", lambda db, ids: news_crud.get_news(db)),
+    ("новости: по категории", lambda db, ids: news_crud.get_news(db, category="patch")),
+    ("новости: рекомендуемые", lambda db, ids: news_crud.get_featured_news(db)),
+    ("новости: последние", lambda db, ids: news_crud.get_latest_news(db)),
+    ("герои: по роли", lambda db, ids: hero_crud.get_heroes(db, role="Mage")),
+    ("герои: история статистики", lambda db, ids: hero_crud.get_hero_stat_history(db, hero_id=ids["hero"])),
+    ("герои: статистика по патчам", lambda db, ids: hero_crud.get_hero_patch_stats(db, hero_id=ids["hero"])),
+    ("пользователи: список", lambda db, ids: user_crud.get_users(db)),
+]
+
+def sample_ids(db: Session) -> Dict[str, int]:
+    """Id существующих записей (или 1 для пустой базы)"""
+    return {
+        "hero": db.query(Hero.id).limit(1).scalar() or 1,
+        "guide": db.query(BuildGuide.id).limit(1).scalar() or 1,
+        "user": db.query(User.id).limit(1).scalar() or 1,
+        "news": db.query(News.id).limit(1).scalar() or 1,
+    }
+
+def find_problems(node: Dict[str, Any]) -> List[str]:
+    """Seq Scan с фильтром или с сортировкой поверх него"""
+    problems = []
+    children = node.get("Plans", [])
+    if node["Node Type"] == "Seq Scan" and "Filter" in node:
+        problems.append(f"Seq Scan on {node['Relation Name']} (Filter: {node['Filter']})")
+    if node["Node Type"] == "Sort" and any(child["Node Type"] == "Seq Scan" for child in children):
+        problems.append(f"Sort ({', '.join(node.get('Sort Key', []))}) over Seq Scan")
+    for child in children:
+        problems.extend(find_problems(child))
+    return problems
+
+def explain(statement: str, parameters: Any) -> Dict[str, Any]:
+    """План запроса без seq scan, если это возможно"""
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = cursor.fetchone()[0]
+        connection.rollback()
+    finally:
+        connection.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+def check_query_plans() -> bool:
+    """Прогнать запросы и проверить их планы"""
+    if engine.dialect.name != "postgresql":
+        print("❌ Проверка планов работает только на PostgreSQL")
+        return False
+
+    db: Session = SessionLocal()
+    failed = 0
+
+    try:
+        ids = sample_ids(db)
+        for name, probe in PROBES:
+            with capture_queries(engine) as queries:
+                probe(db, ids)
+
+            problems = []
+            for query in queries:
+                if query.is_select:
+                    problems.extend(find_problems(explain(query.statement, query.parameters)))
+
+            if problems:
+                failed += 1
+                print(f"❌ {name}")
+                for problem in problems:
+                    print(f"   {problem}")
+            else:
+                print(f"✅ {name}")
+
+        print(f"\n📊 Проверено запросов: {len(PROBES)}, с seq scan: {failed}")
+        return failed == 0
+
+    except Exception as e:
+        print(f"❌ Ошибка проверки планов: {e}")
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("🔍 Проверка планов запросов")
+    print("=" * 30)
+
+    if not check_query_plans():
+        sys.exit(1)
+
+    print("\n✅ Готово!")
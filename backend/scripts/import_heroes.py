@@ -3,74 +3,171 @@
 Скрипт для импорта данных героев Mobile Legends
 """
 
+import argparse
+import csv
 import json
-import sys
 import os
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
+from app.crud.hero import upsert_heroes
 from app.models import Hero
 
-def import_heroes_data():
-    """Импорт данных героев из JSON файла"""
+DEFAULT_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'heroes.json')
+BATCH_SIZE = 500
+CHUNK_SIZE = 64 * 1024
+
+# Колонка героя -> путь во вложенной записи файла (плоские ключи тоже принимаются)
+NESTED_FIELDS = {
+    'durability': ('stats', 'durability'),
+    'offense': ('stats', 'offense'),
+    'control': ('stats', 'control'),
+    'difficulty': ('stats', 'difficulty'),
+    'passive_skill': ('skills', 'passive'),
+    'first_skill': ('skills', 'first'),
+    'second_skill': ('skills', 'second'),
+    'ultimate_skill': ('skills', 'ultimate'),
+    'image_url': ('images', 'main'),
+    'avatar_url': ('images', 'avatar'),
+    'win_rate': ('meta_stats', 'win_rate'),
+    'pick_rate': ('meta_stats', 'pick_rate'),
+    'ban_rate': ('meta_stats', 'ban_rate'),
+}
+HERO_COLUMNS = {
+    column.name for column in Hero.__table__.columns
+    if column.name not in ('id', 'created_at', 'updated_at')
+}
+CSV_NUMBERS = {'durability': int, 'offense': int, 'control': int, 'difficulty': int,
+               'win_rate': float, 'pick_rate': float, 'ban_rate': float}
+
+def iter_json_array(f: TextIO) -> Iterator[Dict[str, Any]]:
+    """Элементы JSON-массива по одному, без загрузки всего файла"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Пропустить пробелы, открывающую скобку и запятые между элементами
+        while position < len(buffer):
+            char = buffer[position]
+            if char.isspace() or (started and char == ','):
+                position += 1
+            elif not started and char == '[':
+                started = True
+                position += 1
+            else:
+                break
+
+        if position < len(buffer):
+            if not started:
+                raise ValueError('Ожидался JSON-массив героев')
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+                yield item
+                continue
+            except json.JSONDecodeError:
+                # Элемент оборвался на границе чанка — дочитать файл
+                if eof:
+                    raise
+
+        if eof:
+            raise ValueError('Неожиданный конец JSON-массива')
+        chunk = f.read(CHUNK_SIZE)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+def iter_ndjson(f: TextIO) -> Iterator[Dict[str, Any]]:
+    """Один герой на строку (NDJSON / JSON Lines)"""
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+def _csv_value(column: str, value: str) -> Any:
+    if value == '':
+        return None
+    if column in CSV_NUMBERS:
+        return CSV_NUMBERS[column](value)
+    if column == 'lane':
+        return [lane.strip() for lane in value.split('|') if lane.strip()]
+    if value[0] in '{[':
+        return json.loads(value)
+    return value
+
+def iter_csv(f: TextIO) -> Iterator[Dict[str, Any]]:
+    """Плоские строки CSV: колонки героя, lane через '|', JSON в навыках и цене"""
+    for row in csv.DictReader(f):
+        yield {
+            column: _csv_value(column, value)
+            for column, value in row.items() if column in HERO_COLUMNS
+        }
+
+READERS = {'json': iter_json_array, 'ndjson': iter_ndjson, 'jsonl': iter_ndjson, 'csv': iter_csv}
+
+def hero_row(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Колонки героя из записи файла; отсутствующие в записи поля не трогаются"""
+    row = {key: value for key, value in data.items() if key in HERO_COLUMNS}
+    for column, (section, key) in NESTED_FIELDS.items():
+        nested = data.get(section)
+        if isinstance(nested, dict) and key in nested:
+            row[column] = nested[key]
+    return row
+
+def batches(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def import_heroes_data(path: Optional[str] = None, file_format: Optional[str] = None, batch_size: int = BATCH_SIZE):
+    """Потоковый импорт героев из JSON, NDJSON или CSV с пакетным upsert"""
+    heroes_file = path or DEFAULT_FILE
+    if not os.path.exists(heroes_file):
+        print(f"❌ Файл {heroes_file} не найден")
+        print("Создайте файл backend/data/heroes.json с данными героев")
+        return False
+
+    file_format = file_format or os.path.splitext(heroes_file)[1].lstrip('.').lower()
+    if file_format not in READERS:
+        print(f"❌ Неизвестный формат: {file_format} (поддерживаются: {', '.join(READERS)})")
+        return False
+
     db: Session = SessionLocal()
-    
+    created_count = 0
+    updated_count = 0
+    skipped_count = 0
+    started = time.perf_counter()
+
     try:
-        # Путь к файлу с данными героев
-        heroes_file = os.path.join(os.path.dirname(__file__), '..', 'data', 'heroes.json')
-        
-        if not os.path.exists(heroes_file):
-            print("❌ Файл heroes.json не найден")
-            print("Создайте файл backend/data/heroes.json с данными героев")
-            return False
-        
-        with open(heroes_file, 'r', encoding='utf-8') as f:
-            heroes_data = json.load(f)
-        
-        imported_count = 0
-        skipped_count = 0
-        
-        for hero_data in heroes_data:
-            # Проверить, существует ли уже герой с таким именем
-            existing_hero = db.query(Hero).filter(Hero.name == hero_data['name']).first()
-            if existing_hero:
-                print(f"⚠️  Герой {hero_data['name']} уже существует, пропускаем")
-                skipped_count += 1
-                continue
-            
-            # Создать нового героя
-            hero = Hero(
-                name=hero_data['name'],
-                role=hero_data['role'],
-                specialty=hero_data['specialty'],
-                lane=hero_data.get('lane', []),
-                durability=hero_data.get('stats', {}).get('durability'),
-                offense=hero_data.get('stats', {}).get('offense'),
-                control=hero_data.get('stats', {}).get('control'),
-                difficulty=hero_data.get('stats', {}).get('difficulty'),
-                passive_skill=hero_data.get('skills', {}).get('passive'),
-                first_skill=hero_data.get('skills', {}).get('first'),
-                second_skill=hero_data.get('skills', {}).get('second'),
-                ultimate_skill=hero_data.get('skills', {}).get('ultimate'),
-                release_date=hero_data.get('release_date'),
-                price=hero_data.get('price'),
-                image_url=hero_data.get('images', {}).get('main'),
-                avatar_url=hero_data.get('images', {}).get('avatar'),
-                win_rate=hero_data.get('meta_stats', {}).get('win_rate', 0.0),
-                pick_rate=hero_data.get('meta_stats', {}).get('pick_rate', 0.0),
-                ban_rate=hero_data.get('meta_stats', {}).get('ban_rate', 0.0)
-            )
-            
-            db.add(hero)
-            imported_count += 1
-            print(f"✅ Импортирован герой: {hero_data['name']}")
-        
-        db.commit()
-        print(f"\n🎉 Импорт завершен!")
-        print(f"📊 Импортировано: {imported_count} героев")
-        print(f"⚠️  Пропущено: {skipped_count} героев")
-        
+        with open(heroes_file, 'r', encoding='utf-8', newline='') as f:
+            rows = (hero_row(data) for data in READERS[file_format](f))
+            for number, batch in enumerate(batches(rows, batch_size), start=1):
+                created, updated, skipped = upsert_heroes(db, batch)
+                created_count += created
+                updated_count += updated
+                skipped_count += skipped
+                elapsed = time.perf_counter() - started
+                print(f"📦 Пакет {number}: {len(batch)} строк, всего {created_count + updated_count} ({(created_count + updated_count) / elapsed:.0f} строк/с)")
+
+        elapsed = time.perf_counter() - started
+        total = created_count + updated_count
+        print(f"\n🎉 Импорт завершен за {elapsed:.2f} с!")
+        print(f"📊 Создано: {created_count} героев")
+        print(f"🔄 Обновлено: {updated_count} героев")
+        if skipped_count:
+            print(f"⚠️  Пропущено: {skipped_count} (новые герои без role/specialty)")
+        print(f"⚡ Скорость: {total / elapsed if elapsed else total:.0f} героев/с")
+
         return True
-        
+
     except Exception as e:
         print(f"❌ Ошибка импорта: {e}")
         db.rollback()
@@ -207,8 +304,14 @@ if __name__ == "__main__":
     print("🎮 Импорт данных героев Mobile Legends")
     print("=" * 50)
     
+    parser = argparse.ArgumentParser(description="Импорт героев из JSON, NDJSON или CSV")
+    parser.add_argument("path", nargs="?", help="файл с героями (по умолчанию data/heroes.json)")
+    parser.add_argument("--format", choices=sorted(READERS), help="формат файла (по умолчанию по расширению)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="героев в одном INSERT")
+    args = parser.parse_args()
+
     # Попробовать импортировать из файла, если не получится - создать примеры
-    if not import_heroes_data():
+    if not import_heroes_data(args.path, args.format, args.batch_size):
         print("\n📝 Создание примеров героев для тестирования...")
         create_sample_heroes()
     
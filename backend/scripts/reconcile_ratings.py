@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Скрипт для сверки агрегатов оценок гайдов с таблицей guide_ratings
+"""
+
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.crud.guide import reconcile_guide_ratings
+
+def reconcile_ratings():
+    """Пересчитать rating_sum, rating_count и rating одним пакетом"""
+    db: Session = SessionLocal()
+    
+    try:
+        updated = reconcile_guide_ratings(db)
+        print(f"✅ Исправлено гайдов: {updated}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Ошибка сверки оценок: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    print("⭐ Сверка рейтингов гайдов")
+    print("=" * 30)
+    
+    reconcile_ratings()
+    
+    print("\n✅ Готово!")
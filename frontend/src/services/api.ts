@@ -1,8 +1,10 @@
-import axios, { AxiosInstance, AxiosResponse } from 'axios';
+import axios, { AxiosInstance, AxiosResponse, InternalAxiosRequestConfig } from 'axios';
 import { Hero, BuildGuide, User, News, SearchResponse, AuthResponse, LoginRequest, RegisterRequest } from '@/types';
 
 class ApiService {
   private api: AxiosInstance;
+  // Один запрос обновления на все параллельные 401
+  private refreshing: Promise<string> | null = null;
 
   constructor() {
     this.api = axios.create({
@@ -22,19 +24,57 @@ class ApiService {
       return config;
     });
 
-    // Обработка ошибок
+    // Обработка ошибок: при 401 один раз обновляем токен и повторяем запрос
     this.api.interceptors.response.use(
       (response) => response,
-      (error) => {
-        if (error.response?.status === 401) {
-          localStorage.removeItem('access_token');
-          window.location.href = '/login';
+      async (error) => {
+        const original = error.config as (InternalAxiosRequestConfig & { _retry?: boolean }) | undefined;
+        // 401 от входа и самого обновления — неверные данные, а не истекший токен
+        const isTokenRequest = original?.url === '/auth/login' || original?.url === '/auth/refresh';
+        if (error.response?.status !== 401 || !original || isTokenRequest) {
+          return Promise.reject(error);
         }
+
+        const refreshToken = localStorage.getItem('refresh_token');
+        if (!original._retry && refreshToken) {
+          original._retry = true;
+          try {
+            const accessToken = await this.refreshAccessToken(refreshToken);
+            original.headers.Authorization = `Bearer ${accessToken}`;
+            return this.api(original);
+          } catch {
+            // Сессия отозвана или refresh-токен истек — нужен повторный вход
+          }
+        }
+
+        localStorage.removeItem('access_token');
+        localStorage.removeItem('refresh_token');
+        window.location.href = '/login';
         return Promise.reject(error);
       }
     );
   }
 
+  private refreshAccessToken(refreshToken: string): Promise<string> {
+    if (!this.refreshing) {
+      this.refreshing = this.refreshToken(refreshToken).then(
+        (tokens) => {
+          this.refreshing = null;
+          localStorage.setItem('access_token', tokens.access_token);
+          if (tokens.refresh_token) {
+            localStorage.setItem('refresh_token', tokens.refresh_token);
+          }
+          return tokens.access_token;
+        },
+        (error) => {
+          this.refreshing = null;
+          throw error;
+        }
+      );
+    }
+    return this.refreshing;
+  }
+
   // Heroes API
   async getHeroes(params?: {
     skip?: number;
@@ -200,8 +240,8 @@ class ApiService {
     return response.data;
   }
 
-  async refreshToken(): Promise<AuthResponse> {
-    const response: AxiosResponse<AuthResponse> = await this.api.post('/auth/refresh');
+  async refreshToken(refreshToken: string): Promise<AuthResponse> {
+    const response: AxiosResponse<AuthResponse> = await this.api.post('/auth/refresh', { refresh_token: refreshToken });
     return response.data;
   }
 
@@ -9,7 +9,7 @@ interface AuthContextType {
   isLoading: boolean;
   login: (credentials: LoginRequest) => Promise<void>;
   register: (userData: RegisterRequest) => Promise<void>;
-  logout: () => void;
+  logout: () => Promise<void>;
   updateUser: (userData: Partial<User>) => Promise<void>;
 }
 
@@ -51,6 +51,9 @@ export function AuthProvider({ children }: AuthProviderProps) {
       
       // Сохраняем токен
       localStorage.setItem('access_token', response.access_token);
+      if (response.refresh_token) {
+        localStorage.setItem('refresh_token', response.refresh_token);
+      }
       
       // Получаем данные пользователя
       const userData = await apiService.getCurrentUser();
@@ -87,8 +90,15 @@ export function AuthProvider({ children }: AuthProviderProps) {
     }
   };
 
-  const logout = () => {
+  const logout = async () => {
+    try {
+      // Отзыв сессии на сервере: refresh-токен перестает действовать
+      await apiService.logout();
+    } catch (error) {
+      console.error('Logout request failed:', error);
+    }
     localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
     setUser(null);
     toast.success('Вы вышли из системы');
   };
@@ -204,6 +204,7 @@ export interface RegisterRequest {
 
 export interface AuthResponse {
   access_token: string;
+  refresh_token?: string;
   token_type: string;
 }
 